@@ -69,6 +69,8 @@ constants = ConstantCatalog([
     Constant('attack_zero_hit', "Enemy AI attacks even if Hit is 0", bool, True, 'ai'),
     Constant('attack_zero_dam', "Enemy AI attacks even if Damage is 0", bool, True, 'ai'),
     Constant('zero_move', "Show Movement as 0 if AI does not move", bool, False, 'ai'),
+    Constant('ai_hook_cache', "AI remembers item and skill hook results while thinking", bool, False, 'ai'),
+    Constant('ai_thread', "AI thinks on its own thread, between frames too", bool, False, 'ai'),
     Constant('game_nid', "Game Unique Identifier", str, "LT", 'title'),
     Constant('title', "Game Title", str, "Lex Talionis Game", 'title'),
     Constant('title_particles', "Display particle effect on title screen", bool, True, 'title_screen'),
@@ -857,6 +857,7 @@ class EventProperties(QWidget):
             self.current.trigger = cur_val
         else:
             self.current.trigger = cur_val
+        self._data.reindex(self.current)
         self.window.update_list()
 
     def level_nid_changed(self, idx):
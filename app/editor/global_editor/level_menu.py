@@ -96,7 +96,7 @@ class LevelModel(DragDropCollectionModel):
             level = self._data[index.row()]
             res = RESOURCES.tilemaps.get(level.tilemap)
             if res:
-                pix = tile_model.create_tilemap_pixmap(res)
+                pix = tile_model.get_tilemap_thumbnail(res)
                 img = QIcon(pix)
                 return img
         return None
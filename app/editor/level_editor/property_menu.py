@@ -193,6 +193,7 @@ class PropertiesMenu(QWidget):
         for event in DB.events:
             if event.level_nid == old_nid:
                 event.level_nid = new_nid
+                DB.events.update_nid(event, event.nid, set_nid=False)
 
     def title_changed(self, text):
         self.current.name = text
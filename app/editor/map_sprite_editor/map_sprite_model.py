@@ -13,6 +13,7 @@ from app.data.database import DB
 from app.extensions.custom_gui import DeletionDialog
 from app.editor.settings import MainSettingsController
 from app.editor.base_database_gui import ResourceCollectionModel
+from app.editor.thumbnails import THUMBNAILS, file_key
 import app.editor.utilities as editor_utilities
 from app.utilities import str_utils
 
@@ -42,6 +43,14 @@ def get_basic_icon(pixmap, num, active=False, team='player'):
     pixmap = QPixmap.fromImage(one_frame)
     return pixmap
 
+def get_map_sprite_thumbnail(map_sprite, num, active=False, team='player') -> QPixmap:
+    def make():
+        if not map_sprite.standing_pixmap:
+            map_sprite.standing_pixmap = QPixmap(map_sprite.stand_full_path)
+        return get_basic_icon(map_sprite.standing_pixmap, num, active, team)
+    key = file_key(map_sprite.stand_full_path), num, active, team, DB.constants.value('dark_sprites')
+    return THUMBNAILS.get('map_sprite', (map_sprite.nid, active, team), key, make)
+
 class MapSpriteModel(ResourceCollectionModel):
     def data(self, index, role):
         if not index.isValid():
@@ -52,14 +61,9 @@ class MapSpriteModel(ResourceCollectionModel):
             return text
         elif role == Qt.DecorationRole:
             map_sprite = self._data[index.row()]
-            if not map_sprite.standing_pixmap:
-                map_sprite.standing_pixmap = QPixmap(map_sprite.stand_full_path)
-            if not map_sprite.moving_pixmap:
-                map_sprite.moving_pixmap = QPixmap(map_sprite.move_full_path)
-            pixmap = map_sprite.standing_pixmap
             # num = TIMER.passive_counter.count
             num = 0
-            pixmap = get_basic_icon(pixmap, num, index == self.window.view.currentIndex())
+            pixmap = get_map_sprite_thumbnail(map_sprite, num, index == self.window.view.currentIndex())
             if pixmap:
                 return QIcon(pixmap)
         return None
@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap, QIcon
+from PyQt5.QtGui import QPixmap, QIcon, QImageReader
 
 import os, glob, time
 
@@ -12,6 +12,18 @@ from app.resources.resources import RESOURCES
 
 from app.editor.settings import MainSettingsController
 from app.editor.base_database_gui import ResourceCollectionModel
+from app.editor.thumbnails import THUMBNAILS, file_key
+
+def get_panorama_thumbnail(panorama, num) -> QPixmap:
+    """
+    Frame num of the panorama, small enough to fit its icon
+    """
+    path = panorama.get_all_paths()[num]
+    size = QImageReader(path).size()
+    # Only worth keeping on disk if it had to be scaled down
+    larger = size.width() > WINWIDTH or size.height() > WINHEIGHT
+    return THUMBNAILS.get('panorama', (panorama.nid, num), file_key(path),
+                          lambda: QPixmap(path), (WINWIDTH, WINHEIGHT), disk=larger)
 
 class PanoramaModel(ResourceCollectionModel):
     def data(self, index, role):
@@ -23,13 +35,11 @@ class PanoramaModel(ResourceCollectionModel):
             return text
         elif role == Qt.DecorationRole:
             panorama = self._data[index.row()]
-            if not panorama.pixmaps:
-                for path in panorama.get_all_paths():
-                    panorama.pixmaps.append(QPixmap(path))
-            if not panorama.pixmaps:
+            num_frames = len(panorama.get_all_paths())
+            if not num_frames:
                 return None
-            counter = int(time.time() * 1000 // 125) % len(panorama.pixmaps)
-            pixmap = panorama.pixmaps[counter]
+            counter = int(time.time() * 1000 // 125) % num_frames
+            pixmap = get_panorama_thumbnail(panorama, counter)
             if pixmap:
                 # pixmap = pixmap.scaled(240, 160)
                 return QIcon(pixmap)
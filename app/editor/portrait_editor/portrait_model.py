@@ -15,6 +15,7 @@ from app.editor.base_database_gui import ResourceCollectionModel
 from app.editor.settings import MainSettingsController
 from app.utilities import str_utils
 import app.editor.utilities as editor_utilities
+from app.editor.thumbnails import THUMBNAILS, file_key
 
 def auto_frame_portrait(portrait: Portrait):
     width, height = 32, 16
@@ -52,6 +53,14 @@ def auto_frame_portrait(portrait: Portrait):
     portrait.blinking_offset = best_blink_pos
     portrait.smiling_offset = best_mouth_pos
 
+def get_chibi_thumbnail(portrait: Portrait) -> QPixmap:
+    def make():
+        if not portrait.pixmap:
+            portrait.pixmap = QPixmap(portrait.full_path)
+        chibi = portrait.pixmap.copy(96, 16, 32, 32)
+        return QPixmap.fromImage(editor_utilities.convert_colorkey(chibi.toImage()))
+    return THUMBNAILS.get('portrait', portrait.nid, file_key(portrait.full_path), make)
+
 class PortraitModel(ResourceCollectionModel):
     def data(self, index, role):
         if not index.isValid():
@@ -62,11 +71,7 @@ class PortraitModel(ResourceCollectionModel):
             return text
         elif role == Qt.DecorationRole:
             portrait = self._data[index.row()]
-            if not portrait.pixmap:
-                portrait.pixmap = QPixmap(portrait.full_path)
-            pixmap = portrait.pixmap
-            chibi = pixmap.copy(96, 16, 32, 32)
-            chibi = QPixmap.fromImage(editor_utilities.convert_colorkey(chibi.toImage()))
+            chibi = get_chibi_thumbnail(portrait)
             return QIcon(chibi)
         elif role == Qt.EditRole:
             portrait = self._data[index.row()]
@@ -35,8 +35,8 @@ class SaveViewer(Dialog):
         try:
             save_loc = self.save_box.edit.currentText()
             meta_loc = save_loc + 'meta'
-            with open(save_loc, 'rb') as fp:
-                s_dict = pickle.load(fp)
+            from app.engine import save
+            s_dict = save.read_save(save_loc)
             with open(meta_loc, 'rb') as fp:
                 meta_dict = pickle.load(fp)
         except Exception as e:
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import logging
+from collections import Counter
+
+from PyQt5.QtCore import Qt, QStandardPaths
+from PyQt5.QtGui import QPixmap
+
+# Bump whenever the thumbnails are drawn differently,
+# so the ones already on disk aren't used anymore
+VERSION = 1
+# Once the thumbnails on disk take up more than this many bytes, the ones
+# used least recently are deleted until they take up PRUNE_TO of it
+MAX_SIZE = 64 * 1024 * 1024
+PRUNE_TO = 0.75
+
+def file_key(path) -> tuple:
+    """
+    Identifies a source file by its path, size and last modified time,
+    so a thumbnail made from it is remade once it changes
+    """
+    try:
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+    except (OSError, TypeError):
+        return path, None, None
+
+def content_key(*parts) -> str:
+    """
+    A hash of whatever a thumbnail is made from
+    """
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+class ThumbnailCache():
+    """
+    Keeps the icons shown in the editor's resource lists as small PNGs on
+    disk, so opening a project doesn't have to draw every one of them again.
+    Each thumbnail is stored under a hash of what it was made from (the
+    source files' paths, sizes and modified times, or the content itself),
+    so changing the source makes a new thumbnail instead of using the old.
+    They are only made when a list first asks for them, which it only
+    does for the items it shows.
+    Old thumbnails are never asked for again once their source changes,
+    so the directory is kept under max_size by deleting the thumbnails
+    used least recently (reading one from disk marks it as used).
+    """
+    def __init__(self, directory=None, max_size=MAX_SIZE):
+        self._directory = directory
+        self.max_size = max_size
+        # Bytes on disk, found the first time a thumbnail is saved
+        self.size = None
+        self.memory = {}  # (kind, nid) -> (key, QPixmap)
+        # memory, disk or made
+        self.counts = Counter()
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            location = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation)
+            self._directory = os.path.join(location, 'Lex Talionis', 'thumbnails') if location else ''
+        return self._directory
+
+    def get_path(self, kind, key) -> str:
+        return os.path.join(self.directory, kind, key + '.png')
+
+    def get(self, kind: str, nid: str, key: tuple, make, max_size=None, disk=True) -> QPixmap:
+        """
+        The thumbnail for the resource nid, made by make() the first time
+        it is asked for with this key, and scaled down to fit within
+        max_size (width, height) if it is larger.
+        Without disk, it is only kept in memory, for thumbnails that
+        would take as long to read back as to make
+        """
+        entry = self.memory.get((kind, nid))
+        if entry and entry[0] == key:
+            self.counts['memory'] += 1
+            return entry[1]
+
+        path = self.get_path(kind, content_key(VERSION, kind, key, max_size)) if disk and self.directory else None
+        pixmap = QPixmap(path) if path and os.path.exists(path) else None
+        if pixmap and not pixmap.isNull():
+            self.counts['disk'] += 1
+            self.touch(path)
+        else:
+            self.counts['made'] += 1
+            pixmap = make()
+            if pixmap and not pixmap.isNull():
+                if max_size and (pixmap.width() > max_size[0] or pixmap.height() > max_size[1]):
+                    pixmap = pixmap.scaled(max_size[0], max_size[1], Qt.KeepAspectRatio, Qt.SmoothTransformation)
+                if path:
+                    self.save(pixmap, path)
+        self.memory[(kind, nid)] = (key, pixmap)
+        return pixmap
+
+    def save(self, pixmap, path):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written alongside first, so a half written thumbnail is never read
+            temp_path = path + '.tmp'
+            if pixmap.save(temp_path, 'PNG'):
+                os.replace(temp_path, path)
+                if self.size is None:
+                    self.size = self.get_size()
+                else:
+                    self.size += os.path.getsize(path)
+                if self.size > self.max_size:
+                    self.prune(int(self.max_size * PRUNE_TO))
+        except OSError as e:
+            logging.warning("Could not save thumbnail %s: %s", path, e)
+
+    def touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def get_files(self) -> list:
+        """
+        (last used, size, path) of every thumbnail on disk
+        """
+        files = []
+        for root, _, fns in os.walk(self.directory):
+            for fn in fns:
+                path = os.path.join(root, fn)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, stat.st_size, path))
+        return files
+
+    def get_size(self) -> int:
+        return sum(size for _, size, _ in self.get_files())
+
+    def prune(self, max_size):
+        """
+        Deletes the thumbnails used least recently, until
+        the rest take up no more than max_size bytes
+        """
+        files = sorted(self.get_files())
+        self.size = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if self.size <= max_size:
+                break
+            try:
+                os.remove(path)
+                self.size -= size
+            except OSError as e:
+                logging.warning("Could not delete thumbnail %s: %s", path, e)
+
+    def forget(self, kind, nid=None):
+        """
+        Forgets the thumbnails of that kind (or just the one for nid)
+        held in memory, so they are checked against their source again
+        """
+        for memory_kind, memory_nid in list(self.memory):
+            if memory_kind == kind and (nid is None or memory_nid == nid):
+                del self.memory[(memory_kind, memory_nid)]
+
+THUMBNAILS = ThumbnailCache()
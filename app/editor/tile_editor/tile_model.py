@@ -15,6 +15,7 @@ from app.editor.base_database_gui import ResourceCollectionModel
 from app.extensions.custom_gui import DeletionDialog
 from app.editor.tilemap_editor import MapEditor
 from app.editor.settings import MainSettingsController
+from app.editor.thumbnails import THUMBNAILS, file_key, content_key
 
 from app.utilities import str_utils
 
@@ -90,6 +91,7 @@ class TileSetModel(ResourceCollectionModel):
                     if tile_sprite.tileset_nid == tileset_nid:
                         # Delete all places that tileset is used
                         del layer.sprite_grid[coord]
+        forget_tilemap_thumbnails()
 
     def on_nid_changed(self, old_nid, new_nid):
         # What uses tilesets
@@ -102,6 +104,7 @@ class TileSetModel(ResourceCollectionModel):
                 for coord, tile_sprite in layer.sprite_grid.items():
                     if tile_sprite.tileset_nid == old_nid:
                         tile_sprite.tileset_nid = new_nid
+        forget_tilemap_thumbnails()
 
 def create_tilemap_pixmap(tilemap):
     base_layer = tilemap.layers.get('base')
@@ -127,11 +130,33 @@ def create_tilemap_pixmap(tilemap):
     tilemap.pixmap = QPixmap.fromImage(image)
     return tilemap.pixmap
 
+# Tilemap nid -> what its thumbnail is made from, so the
+# tiles aren't gone through again every time it is drawn
+_tilemap_keys = {}
+
+def get_tilemap_key(tilemap) -> tuple:
+    if tilemap.nid not in _tilemap_keys:
+        base_layer = tilemap.layers.get('base')
+        tiles = sorted((coord, tile_sprite.tileset_nid, tuple(tile_sprite.tileset_position))
+                       for coord, tile_sprite in base_layer.sprite_grid.items())
+        tilesets = sorted({tile[1] for tile in tiles})
+        _tilemap_keys[tilemap.nid] = (tilemap.width, tilemap.height, content_key(tiles),
+                                      tuple(file_key(RESOURCES.tilesets.get(nid).full_path)
+                                            for nid in tilesets if RESOURCES.tilesets.get(nid)))
+    return _tilemap_keys[tilemap.nid]
+
+def get_tilemap_thumbnail(tilemap) -> QPixmap:
+    return THUMBNAILS.get('tilemap', tilemap.nid, get_tilemap_key(tilemap),
+                          lambda: create_tilemap_pixmap(tilemap), (96, 96))
+
+def forget_tilemap_thumbnails():
+    """
+    Call after changing the tiles of any tilemap
+    """
+    _tilemap_keys.clear()
+    THUMBNAILS.forget('tilemap')
+
 class TileMapModel(ResourceCollectionModel):
-    def __init__(self, data, window):
-        super().__init__(data, window)
-        for tilemap in self._data:
-            create_tilemap_pixmap(tilemap)
 
     def data(self, index, role):
         if not index.isValid():
@@ -142,7 +167,7 @@ class TileMapModel(ResourceCollectionModel):
             return text
         elif role == Qt.DecorationRole:
             tilemap = self._data[index.row()]
-            pixmap = tilemap.pixmap
+            pixmap = get_tilemap_thumbnail(tilemap)
             if pixmap:
                 return QIcon(pixmap)
         return None
@@ -152,7 +177,7 @@ class TileMapModel(ResourceCollectionModel):
         new_tilemap = TileMapPrefab(new_nid)
         map_editor = MapEditor(self.window, new_tilemap)
         map_editor.exec_()
-        create_tilemap_pixmap(new_tilemap)
+        forget_tilemap_thumbnails()
         RESOURCES.tilemaps.append(new_tilemap)
         self.layoutChanged.emit()
 
@@ -172,6 +197,7 @@ class TileMapModel(ResourceCollectionModel):
             else:
                 return
         super().delete(idx)
+        forget_tilemap_thumbnails()
 
     def on_nid_changed(self, old_nid, new_nid):
         # What uses tilemaps
@@ -179,3 +205,4 @@ class TileMapModel(ResourceCollectionModel):
         for level in DB.levels:
             if level.tilemap == old_nid:
                 level.tilemap = new_nid
+        forget_tilemap_thumbnails()
@@ -86,7 +86,7 @@ class TileMapDatabase(TileTab):
         if current_tilemap:
             map_editor = MapEditor(self, current_tilemap)
             map_editor.exec_()
-            tile_model.create_tilemap_pixmap(current_tilemap)
+            tile_model.forget_tilemap_thumbnails()
 
 def get_tilesets() -> tuple:
     window = SingleResourceEditor(TileSetDatabase, ["tilesets"])
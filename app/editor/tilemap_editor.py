@@ -9,7 +9,7 @@ from PyQt5.QtWidgets import QSplitter, QFrame, QVBoxLayout, QDialogButtonBox, \
 from PyQt5.QtCore import Qt, QRect, QDateTime
 from PyQt5.QtGui import QImage, QPainter, QPixmap, QIcon, QColor, QPen
 
-from app.constants import TILEWIDTH, TILEHEIGHT, WINWIDTH, WINHEIGHT
+from app.constants import TILEWIDTH, TILEHEIGHT, WINWIDTH, WINHEIGHT, AUTOTILE_FRAMES
 from app.resources.resources import RESOURCES
 from app.resources.tiles import LayerGrid
 from app.data.database import DB
@@ -54,6 +54,239 @@ def draw_tilemap(tilemap, autotile_fps=29):
     painter.end()
     return image
 
+def get_autotile_frame(autotile_fps=29):
+    """
+    Which autotile frame TileSet.get_pixmap would draw right now
+    """
+    if not autotile_fps:
+        return None
+    autotile_wait = int(autotile_fps * 16.66)
+    return (QDateTime.currentMSecsSinceEpoch() // autotile_wait) % AUTOTILE_FRAMES
+
+class LayerCache():
+    """
+    Keeps each layer of the tilemap drawn in its own image, along with the
+    terrain and grid lines drawn over it, so the MapEditorView doesn't have
+    to redraw the whole tilemap every tick. Painting, filling or erasing
+    tiles only redraws those tiles (through dirty_tiles), and only the
+    autotiles are drawn again when they turn over to their next frame.
+    Autotiles are left out of the layer images and drawn over them instead.
+
+    Anything that changes tiles or terrain in place must call dirty_tiles
+    or dirty_terrain. Resizing the tilemap, swapping out its layers, and
+    changing which layers are visible or a tileset's images are noticed
+    on their own.
+    """
+    def __init__(self):
+        self.tilemap = None
+        self.reset()
+
+    def set_tilemap(self, tilemap):
+        self.tilemap = tilemap
+        self.reset()
+
+    def reset(self):
+        self.size = None
+        self.tilesets = {}  # Nid -> the images and autotiles drawn from
+        self.layer_images = {}  # Layer -> (sprite grid it was drawn from, QImage)
+        self.autotiles = {}  # Layer -> {coord: tile_sprite}
+        self.dirty = {}  # Layer -> set of coords to redraw
+        self.image = None
+        self.image_key = None
+        self.changed = set()  # Coords to draw again in the image
+        self.terrain_image = None
+        self.terrain_key = None
+        self.gridline_image = None
+
+    def dirty_tiles(self, layer, coords):
+        self.dirty.setdefault(layer, set()).update(coords)
+
+    def dirty_terrain(self):
+        self.terrain_key = None
+
+    def create_image(self):
+        image = QImage(self.tilemap.width * TILEWIDTH,
+                       self.tilemap.height * TILEHEIGHT,
+                       QImage.Format_ARGB32_Premultiplied)
+        image.fill(QColor(0, 0, 0, 0))
+        return image
+
+    def check(self):
+        """
+        Throws out whatever was drawn from a tilemap or tileset
+        that has changed since
+        """
+        size = self.tilemap.width, self.tilemap.height
+        if size != self.size or any(self.get_tileset_key(nid) != key for nid, key in self.tilesets.items()):
+            self.reset()
+            self.size = size
+        for layer in list(self.layer_images):
+            if layer not in self.tilemap.layers or self.layer_images[layer][0] is not layer.sprite_grid:
+                del self.layer_images[layer]
+                self.autotiles.pop(layer, None)
+                self.dirty.pop(layer, None)
+                self.image_key = None
+
+    def get_tileset_key(self, nid):
+        tileset = RESOURCES.tilesets.get(nid)
+        if tileset:
+            return tileset.pixmap, tileset.autotile_pixmap, tileset.autotiles
+        return None
+
+    def get_tileset(self, tile_sprite):
+        tileset = RESOURCES.tilesets.get(tile_sprite.tileset_nid)
+        if not tileset:
+            logging.warning("Could not find tileset %s" % tile_sprite.tileset_nid)
+            return None
+        if not tileset.pixmap:
+            tileset.set_pixmap(QPixmap(tileset.full_path))
+        if not tileset.autotile_pixmap:
+            tileset.set_autotile_pixmap(QPixmap(tileset.autotile_full_path))
+        if tileset.nid not in self.tilesets:
+            self.tilesets[tileset.nid] = self.get_tileset_key(tileset.nid)
+        return tileset
+
+    def draw_tile(self, painter, layer, coord):
+        """
+        Draws the tile at coord into the layer's image,
+        or remembers it as an autotile to draw over it
+        """
+        self.autotiles[layer].pop(coord, None)
+        tile_sprite = layer.sprite_grid.get(coord)
+        tileset = self.get_tileset(tile_sprite) if tile_sprite else None
+        if not tileset:
+            return
+        if tile_sprite.tileset_position in tileset.autotiles and tileset.autotile_pixmap:
+            self.autotiles[layer][coord] = tile_sprite
+        else:
+            pix = tileset.get_pixmap(tile_sprite.tileset_position, autotile_fps=0)
+            if pix:
+                painter.drawPixmap(coord[0] * TILEWIDTH, coord[1] * TILEHEIGHT, pix)
+
+    def update_layer(self, layer):
+        if layer not in self.layer_images:
+            image = self.create_image()
+            self.layer_images[layer] = (layer.sprite_grid, image)
+            self.autotiles[layer] = {}
+            self.dirty.pop(layer, None)
+            self.image_key = None
+            coords = list(layer.sprite_grid)
+        elif self.dirty.get(layer):
+            image = self.layer_images[layer][1]
+            coords = self.dirty.pop(layer)
+            self.changed |= coords
+        else:
+            return
+        painter = QPainter()
+        painter.begin(image)
+        for coord in coords:
+            # Clear out whatever was there before
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+            painter.fillRect(coord[0] * TILEWIDTH, coord[1] * TILEHEIGHT, TILEWIDTH, TILEHEIGHT, QColor(0, 0, 0, 0))
+            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+            self.draw_tile(painter, layer, coord)
+        painter.end()
+
+    def get_image(self, autotile_fps=29) -> QImage:
+        """
+        The visible layers drawn together, kept until a tile changes or the
+        autotiles turn over. Copy it before drawing on it
+        """
+        self.check()
+        layers = [layer for layer in self.tilemap.layers if layer.visible]
+        for layer in layers:
+            self.update_layer(layer)
+        has_autotiles = any(self.autotiles[layer] for layer in layers)
+        key = layers, get_autotile_frame(autotile_fps) if has_autotiles else None
+        if self.image and key == self.image_key:
+            if self.changed:
+                self.draw_changed(layers, autotile_fps)
+            return self.image
+
+        self.image = self.create_image()
+        self.image_key = key
+        self.changed.clear()
+        ms = QDateTime.currentMSecsSinceEpoch()
+        painter = QPainter()
+        painter.begin(self.image)
+        for layer in layers:
+            painter.drawImage(0, 0, self.layer_images[layer][1])
+            for coord, tile_sprite in self.autotiles[layer].items():
+                self.draw_autotile(painter, coord, tile_sprite, ms, autotile_fps)
+        painter.end()
+        return self.image
+
+    def draw_autotile(self, painter, coord, tile_sprite, ms, autotile_fps):
+        tileset = RESOURCES.tilesets.get(tile_sprite.tileset_nid)
+        pix = tileset.get_pixmap(tile_sprite.tileset_position, ms, autotile_fps)
+        if pix:
+            painter.drawPixmap(coord[0] * TILEWIDTH, coord[1] * TILEHEIGHT, pix)
+
+    def draw_changed(self, layers, autotile_fps):
+        """
+        Draws only the tiles that have changed into the image again
+        """
+        ms = QDateTime.currentMSecsSinceEpoch()
+        painter = QPainter()
+        painter.begin(self.image)
+        for coord in self.changed:
+            rect = QRect(coord[0] * TILEWIDTH, coord[1] * TILEHEIGHT, TILEWIDTH, TILEHEIGHT)
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+            painter.fillRect(rect, QColor(0, 0, 0, 0))
+            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+            for layer in layers:
+                painter.drawImage(rect, self.layer_images[layer][1], rect)
+                tile_sprite = self.autotiles[layer].get(coord)
+                if tile_sprite:
+                    self.draw_autotile(painter, coord, tile_sprite, ms, autotile_fps)
+        painter.end()
+        self.changed.clear()
+
+    def get_terrain_image(self, alpha) -> QImage:
+        """
+        The terrain of the topmost visible layer with terrain at each coord
+        """
+        self.check()
+        key = alpha, [(layer, layer.visible, layer.terrain_grid) for layer in self.tilemap.layers]
+        if self.terrain_image and key == self.terrain_key:
+            return self.terrain_image
+
+        self.terrain_image = self.create_image()
+        self.terrain_key = key
+        painter = QPainter()
+        painter.begin(self.terrain_image)
+        explored_coords = set()
+        for layer in reversed(self.tilemap.layers):
+            if layer.visible:
+                for coord, terrain_nid in layer.terrain_grid.items():
+                    # Don't draw the one's below...
+                    if coord in explored_coords:
+                        continue
+                    explored_coords.add(coord)
+                    terrain = DB.terrain.get(terrain_nid)
+                    if terrain:
+                        color = terrain.color
+                        write_color = QColor(color[0], color[1], color[2])
+                        write_color.setAlpha(alpha)
+                        painter.fillRect(coord[0] * TILEWIDTH, coord[1] * TILEHEIGHT, TILEWIDTH, TILEHEIGHT, write_color)
+        painter.end()
+        return self.terrain_image
+
+    def get_gridline_image(self) -> QImage:
+        self.check()
+        if self.gridline_image:
+            return self.gridline_image
+        self.gridline_image = self.create_image()
+        painter = QPainter()
+        painter.begin(self.gridline_image)
+        painter.setPen(QPen(QColor(0, 0, 0, 128), 1, Qt.DotLine))
+        for x in range(self.tilemap.width):
+            painter.drawLine(x * TILEWIDTH, 0, x * TILEWIDTH, self.tilemap.height * TILEHEIGHT)
+        for y in range(self.tilemap.height):
+            painter.drawLine(0, y * TILEHEIGHT, self.tilemap.width * TILEWIDTH, y * TILEHEIGHT)
+        painter.end()
+        return self.gridline_image
+
 class PaintTool(IntEnum):
     NoTool = 0
     Brush = 1
@@ -89,6 +322,8 @@ class MapEditorView(QGraphicsView):
         self.draw_autotiles = True
         self.draw_gridlines = True
 
+        self.layer_cache = LayerCache()
+
         timer.get_timer().tick_elapsed.connect(self.tick)
 
     def tick(self):
@@ -97,6 +332,7 @@ class MapEditorView(QGraphicsView):
 
     def set_current(self, current):
         self.tilemap = current
+        self.layer_cache.set_tilemap(current)
         self.update_view()
 
     def clear_scene(self):
@@ -114,18 +350,15 @@ class MapEditorView(QGraphicsView):
 
     def get_map_image(self):
         if self.draw_autotiles:
-            image = draw_tilemap(self.tilemap, autotile_fps=self.tilemap.autotile_fps)
+            image = self.layer_cache.get_image(autotile_fps=self.tilemap.autotile_fps)
         else:
-            image = draw_tilemap(self.tilemap, autotile_fps=0)
+            image = self.layer_cache.get_image(autotile_fps=0)
+        image = image.copy()
         painter = QPainter()
         painter.begin(image)
         # Draw grid lines
         if self.draw_gridlines:
-            painter.setPen(QPen(QColor(0, 0, 0, 128), 1, Qt.DotLine))
-            for x in range(self.tilemap.width):
-                painter.drawLine(x * TILEWIDTH, 0, x * TILEWIDTH, self.tilemap.height * TILEHEIGHT)
-            for y in range(self.tilemap.height):
-                painter.drawLine(0, y * TILEHEIGHT, self.tilemap.width * TILEWIDTH, y * TILEHEIGHT)
+            painter.drawImage(0, 0, self.layer_cache.get_gridline_image())
 
         # Draw cursor...
         if not self.window.terrain_mode:
@@ -147,20 +380,7 @@ class MapEditorView(QGraphicsView):
             painter = QPainter()
             painter.begin(self.working_image)
             alpha = self.window.terrain_painter_menu.get_alpha()
-            explored_coords = set()
-            for layer in reversed(self.tilemap.layers):
-                if layer.visible:
-                    for coord, terrain_nid in layer.terrain_grid.items():
-                        # Don't draw the one's below...
-                        if coord in explored_coords:
-                            continue
-                        explored_coords.add(coord)
-                        terrain = DB.terrain.get(terrain_nid)
-                        if terrain:
-                            color = terrain.color
-                            write_color = QColor(color[0], color[1], color[2])
-                            write_color.setAlpha(alpha)
-                            painter.fillRect(coord[0] * TILEWIDTH, coord[1] * TILEHEIGHT, TILEWIDTH, TILEHEIGHT, write_color)
+            painter.drawImage(0, 0, self.layer_cache.get_terrain_image(alpha))
             painter.end()
 
     def show_map(self):
@@ -237,6 +457,7 @@ class MapEditorView(QGraphicsView):
         if self.tilemap.check_bounds(tile_pos):
             current_nid = self.window.terrain_painter_menu.get_current_nid()
             current_layer.terrain_grid[tile_pos] = current_nid
+            self.layer_cache.dirty_terrain()
 
     def paint_tile(self, tile_pos):
         current_layer = self.get_current_layer()
@@ -249,6 +470,7 @@ class MapEditorView(QGraphicsView):
                         tileset_nid = tile_sprite.tileset_nid
                         pos = tile_sprite.tileset_position
                         current_layer.set_sprite(true_pos, tileset_nid, pos)
+                        self.layer_cache.dirty_tiles(current_layer, [true_pos])
                     # else:
                     #     current_layer.erase_sprite(true_pos)
         else:
@@ -260,18 +482,21 @@ class MapEditorView(QGraphicsView):
                     true_pos = tile_pos[0] + rel_coord[0], tile_pos[1] + rel_coord[1]
                     if self.tilemap.check_bounds(true_pos):
                         current_layer.set_sprite(true_pos, tileset.nid, coord)
+                        self.layer_cache.dirty_tiles(current_layer, [true_pos])
 
     def erase_terrain(self, tile_pos):
         current_layer = self.get_current_layer()
 
         if self.tilemap.check_bounds(tile_pos):
             current_layer.erase_terrain(tile_pos)
+            self.layer_cache.dirty_terrain()
 
     def erase_tile(self, tile_pos):
         current_layer = self.get_current_layer()
 
         if self.tilemap.check_bounds(tile_pos):
             current_layer.erase_sprite(tile_pos)
+            self.layer_cache.dirty_tiles(current_layer, [tile_pos])
 
     def flood_fill_terrain(self, tile_pos):
         if not self.tilemap.check_bounds(tile_pos):
@@ -311,6 +536,7 @@ class MapEditorView(QGraphicsView):
         for coord in coords_to_replace:
             current_nid = self.window.terrain_painter_menu.get_current_nid()
             current_layer.terrain_grid[coord] = current_nid
+        self.layer_cache.dirty_terrain()
 
     def flood_fill_tile(self, tile_pos):
         if not self.tilemap.check_bounds(tile_pos):
@@ -380,6 +606,7 @@ class MapEditorView(QGraphicsView):
                     if (new_coord_x, new_coord_y) in coords:
                         current_layer.set_sprite(
                             (x, y), tileset_nid, (new_coord_x, new_coord_y))
+                        self.layer_cache.dirty_tiles(current_layer, [(x, y)])
 
     def mousePressEvent(self, event):
         scene_pos = self.mapToScene(event.pos())
@@ -668,6 +895,7 @@ class MapEditor(QDialog):
         idx = current_layer_index.row()
         current_layer = self.current.layers[idx]
         current_layer.terrain_grid.clear()
+        self.view.layer_cache.dirty_terrain()
 
     def get_tileset_coords(self):
         return self.tileset_menu.current_tileset, self.tileset_menu.get_selection_coords()
@@ -5,7 +5,7 @@ from app.constants import TILEWIDTH, TILEHEIGHT
 from app.data.database import DB
 
 from app.engine import banner, static_random, unit_funcs, equations, \
-    skill_system, item_system, item_funcs, particles, aura_funcs
+    skill_system, item_system, item_funcs, particles, aura_funcs, hook_cache
 from app.engine.objects.unit import UnitObject
 from app.engine.objects.item import ItemObject
 from app.engine.objects.skill import SkillObject
@@ -2173,6 +2173,7 @@ def do(action):
     from app.engine.game_state import game
     game.action_log.action_depth += 1
     action.do()
+    hook_cache.clear()
     game.action_log.action_depth -= 1
     if game.action_log.record and game.action_log.action_depth <= 0:
         game.action_log.append(action)
@@ -2181,6 +2182,7 @@ def do(action):
 def execute(action):
     game.action_log.action_depth += 1
     action.execute()
+    hook_cache.clear()
     game.action_log.action_depth -= 1
     if game.action_log.record and game.action_log.action_depth <= 0:
         game.action_log.append(action)
@@ -2189,6 +2191,7 @@ def execute(action):
 def reverse(action):
     game.action_log.action_depth += 1
     action.reverse()
+    hook_cache.clear()
     game.action_log.action_depth -= 1
     if game.action_log.record and game.action_log.action_depth <= 0:
         game.action_log.hard_remove(action)
@@ -0,0 +1,178 @@
+import glob
+import os
+import pickle
+
+from app.utilities import str_utils
+from app.data.database import DB
+
+from app.engine.objects.unit import UnitObject
+from app.engine.objects.item import ItemObject
+from app.engine.objects.skill import SkillObject
+from app.events.regions import Region
+from app.engine.game_state import game
+import app.engine.action as Action
+
+import logging
+
+# The action log is saved to a journal file next to the save files.
+# Each save appends only the actions that are new since the last save
+# (or that the turnwheel has run since then), and the save file keeps
+# the journal's name and how many bytes of it belong to that save.
+#
+# The journal is a series of pickled lists of records. Records are tuples:
+#   (SCHEMA, schema_id, class_name, attribute_names)
+#   (TRUNCATE, num_actions) -- drops the actions after the first num_actions
+#   (schema_id, value, value, ...) -- an action
+# Values are stored as is, unless they are a tuple, a list, or refer
+# to a game object, in which case they are (tag, payload)
+SCHEMA = -1
+TRUNCATE = -2
+
+GENERIC, UNIT, ITEM, SKILL, REGION, LIST, ACTION = range(7)
+
+def get_journal_name() -> str:
+    game_nid = str(DB.constants.value('game_nid'))
+    journals = glob.glob('saves/' + game_nid + '-action_log-*.plog')
+    nids = [fn.split('-')[-1][:-5] for fn in journals]
+    unique_nid = str_utils.get_next_int('0', nids)
+    return 'saves/' + game_nid + '-action_log-' + unique_nid + '.plog'
+
+class ActionJournal():
+    def __init__(self, fn):
+        self.fn = fn
+        self.size = 0
+        # Key: (class_name, attribute_names), Value: schema_id
+        self.schemas = {}
+        self.schema_list = []
+        # The actions the journal currently holds, in order
+        self.written = []
+        # Actions from this index on may have changed since they were written
+        self.first_changed = 0
+
+    def touch(self, action_index):
+        """
+        Called when an action is run again (by the turnwheel),
+        since that can change what it stores
+        """
+        self.first_changed = min(self.first_changed, action_index)
+
+    def write(self, actions) -> int:
+        """
+        Appends whatever is needed to make the journal hold actions.
+        Returns the new size of the journal
+        """
+        keep = min(len(self.written), len(actions), self.first_changed)
+        for idx in range(keep):
+            if self.written[idx] is not actions[idx]:
+                keep = idx
+                break
+
+        num_schemas = len(self.schema_list)
+        records = []
+        if keep < len(self.written):
+            records.append((TRUNCATE, keep))
+        for action in actions[keep:]:
+            records.append(self._encode_action(action, records))
+
+        if records:
+            try:
+                data = pickle.dumps(records)
+            except TypeError as e:
+                # Something that can't be pickled got into an action. Leave the journal as it was
+                logging.error("Could not save the action log: %s", e)
+                for key in self.schema_list[num_schemas:]:
+                    del self.schemas[key]
+                del self.schema_list[num_schemas:]
+                return self.size
+            with open(self.fn, 'ab') as fp:
+                fp.write(data)
+            self.size += len(data)
+        self.written = list(actions)
+        self.first_changed = len(actions)
+        return self.size
+
+    def _encode_action(self, action, records) -> tuple:
+        key = (action.__class__.__name__, tuple(action.__dict__))
+        schema_id = self.schemas.get(key)
+        if schema_id is None:
+            schema_id = self.schemas[key] = len(self.schema_list)
+            self.schema_list.append(key)
+            records.append((SCHEMA, schema_id) + key)
+        return (schema_id, ) + tuple(self._encode(value, records) for value in action.__dict__.values())
+
+    def _encode(self, value, records):
+        if isinstance(value, UnitObject):
+            return (UNIT, value.nid)
+        elif isinstance(value, ItemObject):
+            return (ITEM, value.uid)
+        elif isinstance(value, SkillObject):
+            return (SKILL, value.uid)
+        elif isinstance(value, Region):
+            return (REGION, value.nid)
+        elif isinstance(value, list):
+            return (LIST, [self._encode(v, records) for v in value])
+        elif isinstance(value, Action.Action):
+            # Nested actions aren't in the log themselves, so they are stored in place
+            return (ACTION, self._encode_action(value, records))
+        elif isinstance(value, tuple):
+            return (GENERIC, value)
+        return value
+
+    def _decode_action(self, record):
+        class_name, attribute_names = self.schema_list[record[0]]
+        cls = getattr(Action, class_name)
+        action = cls.__new__(cls)
+        for name, value in zip(attribute_names, record[1:]):
+            setattr(action, name, self._decode(value))
+        return action
+
+    def _decode(self, value):
+        if not isinstance(value, tuple):
+            return value
+        tag, payload = value
+        if tag == GENERIC:
+            return payload
+        elif tag == UNIT:
+            return game.get_unit(payload)
+        elif tag == ITEM:
+            return game.get_item(payload)
+        elif tag == SKILL:
+            return game.get_skill(payload)
+        elif tag == REGION:
+            return game.get_region(payload)
+        elif tag == LIST:
+            return [self._decode(v) for v in payload]
+        elif tag == ACTION:
+            return self._decode_action(payload)
+
+    @classmethod
+    def read(cls, fn, size):
+        """
+        Returns the journal and the actions in its first size bytes.
+        The journal is None if more was written to it after that,
+        since appending to it would then mix up two different games
+        """
+        self = cls(fn)
+        actions = []
+        if not os.path.exists(fn):
+            if not size:
+                # Nothing was written to it yet, so there was nothing to find
+                return self, actions
+            logging.error("Could not find action log %s, so the turnwheel can't go back before now", fn)
+            return None, actions
+        with open(fn, 'rb') as fp:
+            while fp.tell() < size:
+                for record in pickle.load(fp):
+                    if record[0] == SCHEMA:
+                        self.schemas[record[2:]] = record[1]
+                        self.schema_list.append(record[2:])
+                    elif record[0] == TRUNCATE:
+                        del actions[record[1]:]
+                    else:
+                        actions.append(self._decode_action(record))
+            self.size = fp.tell()
+        if os.path.getsize(fn) != self.size:
+            return None, actions
+        self.written = list(actions)
+        self.first_changed = len(actions)
+        return self, actions
@@ -3,8 +3,9 @@ import math
 
 from app.data.database import DB
 from app.engine import (action, combat_calcs, engine, equations, evaluate,
-                        item_funcs, item_system, line_of_sight, pathfinding,
-                        skill_system, target_system)
+                        hook_cache, item_funcs, item_system, line_of_sight,
+                        pathfinding, skill_system, target_system)
+from app.engine.ai_thread import AI_THREAD
 from app.engine.combat import interaction
 from app.engine.game_state import game
 from app.engine.movement import MovementManager
@@ -69,6 +70,9 @@ class AIController():
         change = False
         if not self.move_ai_complete:
             if self.think():
+                if self.goal_target:
+                    # Load the fight's animations while moving into place
+                    interaction.prefetch_animation(self.unit, self.goal_item, self.goal_target, self.goal_position)
                 change = self.move()
                 self.move_ai_complete = True
         elif not self.attack_ai_complete:
@@ -182,7 +186,34 @@ class AIController():
         return valid_moves
 
     def think(self):
-        time = engine.get_time()
+        if not DB.constants.value('ai_thread'):
+            return self.think_for(engine.get_time())
+        if not AI_THREAD.running():
+            if self.think_for(engine.get_time()):
+                return True
+            # Keep thinking on the AI thread, in between frames too
+            AI_THREAD.start(lambda: self.think_for(engine.get_true_time()))
+            return False
+        if AI_THREAD.done:
+            AI_THREAD.finish()
+            return True
+        return False
+
+    def think_for(self, time) -> bool:
+        """
+        Thinks until half a frame after time
+        """
+        if not DB.constants.value('ai_hook_cache'):
+            return self._think(time)
+        # Nothing changes the units outside of actions and test moves
+        # while thinking, so their hooks can be memoized
+        hook_cache.enable()
+        try:
+            return self._think(time)
+        finally:
+            hook_cache.disable()
+
+    def _think(self, time):
         success = False
         self.did_something = False
         orig_pos = self.unit.position
@@ -336,6 +367,15 @@ class PrimaryAI():
             self.get_all_valid_targets()
             self.possible_moves = self.get_possible_moves()
             logging.info(self.possible_moves)
+            self.enemy_positions = {u.position for u in game.units if u.position and skill_system.check_enemy(self.unit, u)}
+            # Which targets run will try from each move with this item, in order
+            self.targets_at = {}
+            for target_index, target in enumerate(self.valid_targets):
+                for move in self.get_moves(target_index):
+                    self.targets_at.setdefault(move, []).append(target)
+            # Key: (move, target), Value: (utility, unit at target), or None if out of
+            # line of sight. Filled in a move at a time
+            self.utilities = {}
 
     def get_valid_targets(self, unit, item, valid_moves) -> list:
         item_range = item_funcs.get_range(unit, item)
@@ -364,17 +404,30 @@ class PrimaryAI():
             self.valid_targets = list(set(self.valid_targets))  # Only uniques
         logging.info("Valid Targets: %s", self.valid_targets)
 
-    def get_possible_moves(self) -> list:
-        if self.target_index < len(self.valid_targets) and self.item_index < len(self.items):
+    def get_possible_moves(self, target_index=None) -> list:
+        if target_index is None:
+            target_index = self.target_index
+        if target_index < len(self.valid_targets) and self.item_index < len(self.items):
             # Given an item and a target, find all positions in valid_moves that I can strike the target at.
             item = self.items[self.item_index]
-            target = self.valid_targets[self.target_index]
+            target = self.valid_targets[target_index]
             a = target_system.find_manhattan_spheres(item_funcs.get_range(self.unit, item), *target)
             b = set(self.valid_moves)
             return list(a & b)
         else:
             return []
 
+    def get_moves(self, target_index) -> list:
+        """
+        Returns the moves run will try to strike the target from
+        """
+        possible_moves = self.get_possible_moves(target_index)
+        # If too many legal targets, just try for the best move first
+        # Otherwise it spends way too long trying every possible position to strike from
+        if len(self.valid_targets) > 10 and possible_moves:
+            return [utils.farthest_away_pos(self.orig_pos, possible_moves, self.enemy_positions)]
+        return possible_moves
+
     def quick_move(self, move):
         game.leave(self.unit, test=True)
         self.unit.position = move
@@ -403,24 +456,15 @@ class PrimaryAI():
             # If too many legal targets, just try for the best move first
             # Otherwise it spends way too long trying every possible position to strike from
             if len(self.valid_targets) > 10:
-                enemy_positions = {u.position for u in game.units if u.position and skill_system.check_enemy(self.unit, u)}
-                move = utils.farthest_away_pos(self.orig_pos, self.possible_moves, enemy_positions)
+                move = utils.farthest_away_pos(self.orig_pos, self.possible_moves, self.enemy_positions)
             else:
                 move = self.possible_moves[self.move_index]
 
-            if self.unit.position != move:
-                self.quick_move(move)
-
-            # Check line of sight
-            line_of_sight_flag = True
-            if DB.constants.value('line_of_sight'):
-                max_item_range = max(item_funcs.get_range(self.unit, item))
-                valid_targets = line_of_sight.line_of_sight([move], [target], max_item_range)
-                if not valid_targets:
-                    line_of_sight_flag = False
-
-            if line_of_sight_flag:
-                self.determine_utility(move, target, item)
+            if (move, target) not in self.utilities:
+                self.forecast_move(move, item)
+            utility = self.utilities.get((move, target))
+            if utility:
+                self.choose(move, target, item, *utility)
             self.move_index += 1
             # If too many legal targets, do not bother with every possible move
             if len(self.valid_targets) > 10:
@@ -429,15 +473,42 @@ class PrimaryAI():
         # Not done yet
         return (False, self.best_target, self.best_position, self.best_item)
 
-    def determine_utility(self, move, target, item):
+    def forecast_move(self, move, item):
+        """
+        Moves to move once and works out the utility of every target
+        run will try from there with item, so it never has to come back
+        """
+        if self.unit.position != move:
+            self.quick_move(move)
+        targets = self.targets_at.get(move, [])
+        # Combat forecasts from here, by unit. Worked out together for every enemy
+        # that will be tried from here the first time one is needed
+        self.forecasts = {}
+        self.forecast_targets = [game.board.get_unit(target) for target in targets if target in self.behaviour_targets]
+        self.forecast_targets = [unit for unit in self.forecast_targets if unit and skill_system.check_enemy(self.unit, unit)]
+
+        # Check line of sight
+        if DB.constants.value('line_of_sight'):
+            max_item_range = max(item_funcs.get_range(self.unit, item))
+            valid_targets = line_of_sight.line_of_sight([move], targets, max_item_range)
+            for target in set(targets) - set(valid_targets):
+                self.utilities[(move, target)] = None
+            targets = valid_targets
+
+        for target in targets:
+            tp = self.determine_utility(move, target, item)
+            self.utilities[(move, target)] = (tp, game.board.get_unit(target))
+
+    def determine_utility(self, move, target, item) -> float:
         tp = 0
         main_target_pos, splash = item_system.splash(self.unit, item, target)
         if item_system.target_restrict(self.unit, item, main_target_pos, splash):
             tp = self.compute_priority(main_target_pos, splash, move, item)
+        return tp
 
-        unit = game.board.get_unit(target)
+    def choose(self, move, target, item, tp, unit):
         # Don't target self if I've already moved and I'm not targeting my new position
-        if unit is self.unit and target != self.unit.position:
+        if unit is self.unit and target != move:
             return
         if unit:
             name = unit.nid
@@ -480,8 +551,8 @@ class PrimaryAI():
                 tp += ai_priority
 
             if item_system.damage(self.unit, item):
-                accuracy = utils.clamp(combat_calcs.compute_hit(self.unit, target, item, target.get_weapon(), "attack")/100., 0, 1)
-                raw_damage = combat_calcs.compute_damage(self.unit, target, item, target.get_weapon(), "attack")
+                raw_damage, _, hit, _, _, _, _ = self.get_forecast(target, item)
+                accuracy = utils.clamp(hit/100., 0, 1)
                 lethality = utils.clamp(raw_damage / float(target.get_hp()), 0, 1)
                 ai_priority = 3 if lethality * accuracy >= 1 else lethality * accuracy
                 if skill_system.check_enemy(self.unit, target):
@@ -490,25 +561,32 @@ class PrimaryAI():
                     tp -= ai_priority
         return tp
 
+    def get_forecast(self, target, item) -> tuple:
+        """
+        Returns combat_calcs.forecast for item against target from the current move
+        """
+        if target not in self.forecasts:
+            targets = [target] + [unit for unit in self.forecast_targets if unit not in self.forecasts and unit is not target]
+            self.forecasts.update(zip(targets, combat_calcs.forecast(self.unit, item, targets)))
+        return self.forecasts[target]
+
     def default_priority(self, main_target, item, move):
         # Default method
         terms = []
         offense_term = 0
         defense_term = 1
 
-        raw_damage = combat_calcs.compute_damage(self.unit, main_target, item, main_target.get_weapon(), "attack")
-        crit_damage = combat_calcs.compute_damage(self.unit, main_target, item, main_target.get_weapon(), "attack", crit=True)
+        raw_damage, crit_damage, hit_comp, crit_comp, num_attacks, target_damage, target_accuracy = \
+            self.get_forecast(main_target, item)
 
         # Damage I do compared to target's current hp
         lethality = utils.clamp(raw_damage / float(main_target.get_hp()), 0, 1)
         crit_lethality = utils.clamp(crit_damage / float(main_target.get_hp()), 0, 1)
         # Accuracy
-        hit_comp = combat_calcs.compute_hit(self.unit, main_target, item, main_target.get_weapon(), "attack")
         if hit_comp:
             accuracy = utils.clamp(hit_comp/100., 0, 1)
         else:
             accuracy = 0
-        crit_comp = combat_calcs.compute_crit(self.unit, main_target, item, main_target.get_weapon(), "attack")
         if crit_comp:
             crit_accuracy = utils.clamp(crit_comp/100., 0, 1)
         else:
@@ -517,11 +595,9 @@ class PrimaryAI():
         # Determine if I would get countered
         # Even if I wouldn't get countered, check anyway how much damage I would take
         target_weapon = main_target.get_weapon()
-        target_damage = combat_calcs.compute_damage(main_target, self.unit, target_weapon, item, "defense")
         if not target_damage:
             target_damage = 0
         target_damage = utils.clamp(target_damage/main_target.get_hp(), 0, 1)
-        target_accuracy = combat_calcs.compute_hit(main_target, self.unit, target_weapon, item, "defense")
         if not target_accuracy:
             target_accuracy = 0
         target_accuracy = utils.clamp(target_accuracy/100., 0, 1)
@@ -530,7 +606,6 @@ class PrimaryAI():
             target_damage *= 0.3
             target_accuracy *= 0.3
 
-        num_attacks = combat_calcs.outspeed(self.unit, main_target, item, target_weapon, "attack")
         first_strike = lethality * accuracy if lethality >= 1 else 0
 
         if num_attacks > 1 and target_damage >= 1:
@@ -644,10 +719,14 @@ class SecondaryAI():
         movement_group = MovementManager.get_movement_group(self.unit)
         self.grid = game.board.get_grid(movement_group)
         self.pathfinder = \
-            pathfinding.AStar(self.unit.position, None, self.grid,
-                              game.tilemap.width, game.tilemap.height,
-                              self.unit.team, skill_system.pass_through(self.unit),
-                              DB.constants.value('ai_fog_of_war'))
+            pathfinding.Djikstra(self.unit.position, self.grid,
+                                 game.tilemap.width, game.tilemap.height,
+                                 self.unit.team, skill_system.pass_through(self.unit),
+                                 DB.constants.value('ai_fog_of_war'))
+        # One search out from the unit answers every target,
+        # redone only if the search is widened past where it reached
+        self.distance_field = None
+        self.distance_field_limit = None
 
         self.widen_flag = False  # Determines if we've widened our search
         self.reset()
@@ -712,17 +791,18 @@ class SecondaryAI():
         return False, None
 
     def get_path(self, goal_pos):
-        self.pathfinder.set_goal_pos(goal_pos)
-
         if self.behaviour.target == 'Event':
             adj_good_enough = False
         else:
             adj_good_enough = True
 
         limit = self.get_limit()
-        path = self.pathfinder.process(game.board, adj_good_enough=adj_good_enough, ally_block=False, limit=limit)
-        self.pathfinder.reset()
-        return path
+        # A path past limit + 1 would be cut off anyway,
+        # so the search doesn't need to go any further
+        if self.distance_field is None or self.distance_field_limit < limit:
+            self.distance_field = self.pathfinder.get_distance_field(game.board, limit + 1)
+            self.distance_field_limit = limit
+        return self.distance_field.get_path_to(goal_pos, adj_good_enough, limit)
 
     def default_priority(self, enemy):
         hp_max = equations.parser.hitpoints(enemy)
@@ -0,0 +1,73 @@
+"""
+Lets the AI think on a thread of its own when the ai_thread constant is set.
+On the main thread the AI only gets the first half of each frame to think
+in, and whatever the frame has left over once it is drawn is spent waiting
+for the next one. On its own thread it keeps thinking through that wait too.
+
+The AI decides by trying moves out on the real board (and by calling into
+item and skill hooks that read it), so the two threads never use the game
+at the same time: the main loop holds the lock while it updates and draws a
+frame, and the AI thread holds it while it thinks, at most a frame's worth
+at a time. So the AI decides exactly what it would on the main thread, and
+the main loop never waits on it for longer than it did before.
+"""
+import threading
+from contextlib import contextmanager
+
+class AIThread():
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Held by the main loop while it waits for the lock,
+        # so the AI thread can't keep taking it back in between steps
+        self.turnstile = threading.Lock()
+        self.thread = None
+        self.done = False
+        self.error = None
+
+    def running(self) -> bool:
+        return self.thread is not None
+
+    def start(self, think):
+        """
+        Calls think on the AI thread until it returns True
+        """
+        self.done = False
+        self.error = None
+        self.thread = threading.Thread(target=self.run, args=(think,), daemon=True)
+        self.thread.start()
+
+    def run(self, think):
+        while not self.done:
+            with self.turnstile:
+                pass
+            with self.lock:
+                try:
+                    self.done = think()
+                except Exception as e:
+                    self.error = e
+                    self.done = True
+
+    def finish(self):
+        """
+        Called on the main thread once done.
+        Raises whatever went wrong on the AI thread
+        """
+        self.thread.join()
+        self.thread = None
+        error, self.error = self.error, None
+        if error:
+            raise error
+
+    @contextmanager
+    def frame(self):
+        """
+        The main loop holds this while it updates and draws
+        """
+        with self.turnstile:
+            self.lock.acquire()
+        try:
+            yield
+        finally:
+            self.lock.release()
+
+AI_THREAD = AIThread()
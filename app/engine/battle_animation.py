@@ -10,41 +10,152 @@ from app.engine import engine, image_mods, item_system, item_funcs
 from app.resources.combat_anims import CombatAnimation, WeaponAnimation, EffectAnimation
 from app.resources.combat_palettes import Palette
 
+from collections import OrderedDict
 import logging
+import threading
 
 battle_anim_speed = 1
-battle_anim_registry = {}
+
+# Commands that start an effect animation from the effect named in their first value
+EFFECT_COMMANDS = ('effect', 'effect_with_offset', 'under_effect', 'under_effect_with_offset',
+                   'enemy_effect', 'enemy_effect_with_offset', 'enemy_under_effect')
+
+def load_full_image(anim_prefab, palette: Palette):
+    image_full_path = anim_prefab.full_path
+    anim_prefab.image = engine.image_load(image_full_path, convert=True)
+    colors = palette.colors.values()
+    if COLORKEY in colors:
+        engine.set_colorkey(anim_prefab.image, COLORKEY, rleaccel=True)
+    else:  # Effects can use 0, 0, 0 as their colorkey
+        engine.set_colorkey(anim_prefab.image, (0, 0, 0), rleaccel=True)
+    for frame in anim_prefab.frames:
+        frame.image = engine.subsurface(anim_prefab.image, frame.rect)
+
+class PaletteFrames():
+    """
+    Every frame of a weapon or effect animation in one palette,
+    and each flipped to face left the first time it is drawn that way
+    """
+    def __init__(self, anim_prefab, palette: Palette):
+        colors = palette.colors
+        conversion_dict = {(0, coord[0], coord[1]): (color[0], color[1], color[2]) for coord, color in colors.items()}
+        self.images = {}
+        self.flipped = {}
+        for frame in anim_prefab.frames:
+            self.images[frame.nid] = image_mods.color_convert(engine.copy_surface(frame.image), conversion_dict)
+
+    def get(self, frame_nid: str, right: bool):
+        if right:
+            return self.images[frame_nid]
+        image = self.flipped.get(frame_nid)
+        if not image:
+            image = engine.flip_horiz(self.images[frame_nid])
+            self.flipped[frame_nid] = image
+        return image
+
+    def get_pixels(self) -> int:
+        return sum(image.get_width() * image.get_height()
+                   for images in (self.images, self.flipped) for image in images.values())
+
+class FrameCache():
+    """
+    Shared by every battle animation, so fights between units that have
+    fought before don't need to palette swap their frames again.
+    Keeps at most max_pixels pixels of frames, and forgets
+    whichever animation was used longest ago first.
+
+    Animations can also be loaded ahead of time on a thread of their own
+    with prefetch. Getting frames waits for that to finish first
+    """
+    def __init__(self, max_pixels: int):
+        self.max_pixels = max_pixels
+        self.frames = OrderedDict()
+
+        self.prefetch_lock = threading.Lock()
+        self.prefetch_thread = None
+        self.pending = []
+
+    def get(self, anim_prefab, palette: Palette) -> PaletteFrames:
+        self.finish_prefetch()
+        return self._get(anim_prefab, palette)
+
+    def _get(self, anim_prefab, palette: Palette) -> PaletteFrames:
+        key = (anim_prefab, palette.nid)
+        frames = self.frames.get(key)
+        if frames:
+            self.frames.move_to_end(key)
+            return frames
+        # Load frames as images
+        if not anim_prefab.image and anim_prefab.frames:
+            load_full_image(anim_prefab, palette)
+        frames = PaletteFrames(anim_prefab, palette)
+        self.frames[key] = frames
+        self.evict()
+        return frames
+
+    def evict(self):
+        # Animations still in use keep their own frames, so this only forgets them
+        pixels = [frames.get_pixels() for frames in self.frames.values()]
+        total = sum(pixels)
+        for key, num_pixels in zip(list(self.frames.keys()), pixels):
+            if total <= self.max_pixels or len(self.frames) <= 1:
+                break
+            del self.frames[key]
+            total -= num_pixels
+
+    def clear(self):
+        self.finish_prefetch()
+        self.frames.clear()
+
+    def prefetch(self, anims: list):
+        """
+        Starts loading anims, a list of (animation prefab, palette),
+        instead of whatever was still waiting to be loaded
+        """
+        with self.prefetch_lock:
+            self.pending = list(anims)
+            if not self.prefetch_thread:
+                self.prefetch_thread = threading.Thread(target=self._prefetch, daemon=True)
+                self.prefetch_thread.start()
+
+    def _prefetch(self):
+        while True:
+            with self.prefetch_lock:
+                if not self.pending:
+                    self.prefetch_thread = None
+                    return
+                anim_prefab, palette = self.pending.pop(0)
+            self._get(anim_prefab, palette)
+
+    def cancel_prefetch(self):
+        """
+        Doesn't wait for the animation being loaded right now
+        """
+        with self.prefetch_lock:
+            self.pending.clear()
+
+    def finish_prefetch(self):
+        with self.prefetch_lock:
+            thread = self.prefetch_thread
+        if thread:
+            thread.join()
+
+# About 64 MB of frames
+FRAME_CACHE = FrameCache(16 * 1024 * 1024)
 
 class BattleAnimation():
     idle_poses = {'Stand', 'RangedStand', 'TransformStand'}
 
     @classmethod
     def get_anim(cls, combat_anim, weapon_anim, palette_name, palette, unit, item):
-        unique_hash = combat_anim.nid + '_' + weapon_anim.nid + '_' + palette_name + '_' + palette.nid
-        battle_anim = battle_anim_registry.get(unique_hash)
-        if battle_anim:
-            battle_anim.unit = unit
-            battle_anim.item = item
-            battle_anim.clear()
-        else:
-            battle_anim = cls(weapon_anim, palette_name, palette, unit, item)
-            battle_anim_registry[unique_hash] = battle_anim
-        return battle_anim
+        return cls(weapon_anim, palette_name, palette, unit, item)
 
     @classmethod
     def get_effect_anim(cls, effect, palette_name, palette, unit, item):
-        unique_hash = effect.nid + '_' + palette_name + '_' + palette.nid
-        child_effect = battle_anim_registry.get(unique_hash)
-        if child_effect:
-            image_directory = child_effect.image_directory
-            child_effect = cls(effect, palette_name, palette, unit, item, image_directory)
-        else:
-            child_effect = cls(effect, palette_name, palette, unit, item)
-            battle_anim_registry[unique_hash] = child_effect
-        return child_effect
+        return cls(effect, palette_name, palette, unit, item)
 
     def __init__(self, anim_prefab: WeaponAnimation, palette_name: str,
-                 palette: Palette, unit, item, image_directory: dict = None):
+                 palette: Palette, unit, item):
         self.anim_prefab = anim_prefab
         self.palette_name = palette_name
         self.current_palette = palette
@@ -55,15 +166,8 @@ class BattleAnimation():
         self._generate_missing_poses()
         self.current_pose = None
 
-        # Load frames as images
-        if not anim_prefab.image and anim_prefab.frames:
-            self.load_full_image()
-
-        # Apply palette to frames
-        if image_directory:
-            self.image_directory = image_directory
-        else:
-            self.apply_palette()
+        # Load frames as images and apply palette to them
+        self.apply_palette()
 
         self.clear()
 
@@ -135,25 +239,8 @@ class BattleAnimation():
         if 'Critical' not in self.poses and 'Attack' in self.poses:
             self.poses['Critical'] = self.poses['Attack']
 
-    def load_full_image(self):
-        # Only do load stuff if image does not exist already
-        image_full_path = self.anim_prefab.full_path
-        self.anim_prefab.image = engine.image_load(image_full_path, convert=True)
-        colors = self.current_palette.colors.values()
-        if COLORKEY in colors:
-            engine.set_colorkey(self.anim_prefab.image, COLORKEY, rleaccel=True)
-        else:  # Effects can use 0, 0, 0 as their colorkey
-            engine.set_colorkey(self.anim_prefab.image, (0, 0, 0), rleaccel=True)
-        for frame in self.anim_prefab.frames:
-            frame.image = engine.subsurface(self.anim_prefab.image, frame.rect)
-
     def apply_palette(self):
-        self.image_directory = {}
-        colors = self.current_palette.colors
-        conversion_dict = {(0, coord[0], coord[1]): (color[0], color[1], color[2]) for coord, color in colors.items()}
-        for frame in self.anim_prefab.frames:
-            converted_image = image_mods.color_convert(engine.copy_surface(frame.image), conversion_dict)
-            self.image_directory[frame.nid] = converted_image
+        self.frames = FRAME_CACHE.get(self.anim_prefab, self.current_palette)
 
     def pair(self, owner, partner_anim, right, at_range, entrance_frames=0, position=None, parent=None):
         self.owner = owner
@@ -265,22 +352,7 @@ class BattleAnimation():
     def get_effect(self, effect_nid: str, enemy: bool = False, pose=None) -> EffectAnimation:
         effect = RESOURCES.combat_effects.get(effect_nid)
         if effect:
-            # Determine effect's palette
-            effect_palette_names = [palette[0] for palette in effect.palettes]
-            effect_palette_nids = [palette[1] for palette in effect.palettes]
-
-            if self.current_palette.nid in effect_palette_nids:
-                palette = self.current_palette
-            elif self.palette_name in effect_palette_names:
-                idx = effect_palette_names.index(self.palette_name)
-                palette_nid = effect_palette_nids[idx]
-                palette = RESOURCES.combat_palettes.get(palette_nid)
-            elif effect.palettes:
-                first_palette_nid = effect.palettes[0][1]
-                palette = RESOURCES.combat_palettes.get(first_palette_nid)
-            else:  # Effect does not have a palette
-                palette = self.current_palette
-
+            palette = get_effect_palette(effect, self.palette_name, self.current_palette)
             child_effect = BattleAnimation.get_effect_anim(effect, self.palette_name, palette, self.unit, self.item)
             right = not self.right if enemy else self.right
             parent = self.parent.partner_anim if enemy else self.parent
@@ -500,14 +572,7 @@ class BattleAnimation():
             self.clear_all_effects()
 
         elif command.nid == 'spell':
-            if values[0]:
-                effect = values[0]
-            elif isinstance(self.item, str):
-                effect = self.item
-            elif self.unit and item_system.effect_animation(self.unit, self.item):
-                effect = item_system.effect_animation(self.unit, self.item)
-            else:
-                effect = self.item.nid
+            effect = get_spell_effect(values[0], self.unit, self.item)
             child_effect = self.get_effect(effect)
             if child_effect:
                 self.child_effects.append(child_effect)
@@ -699,9 +764,8 @@ class BattleAnimation():
             engine.blit(surf, image, offset, None, self.blend)
 
     def get_image(self, frame, shake, range_offset, pan_offset, static) -> tuple:
-        image = self.image_directory[frame.nid].copy()
-        if not self.right:
-            image = engine.flip_horiz(image)
+        # Shared with every other animation using these frames, so not to be drawn on
+        image = self.frames.get(frame.nid, self.right)
         offset = frame.offset
         # Handle offset (placement of the object on the screen)
         if self.lr_offset:
@@ -779,7 +843,48 @@ def get_palette(anim_prefab: CombatAnimation, unit) -> tuple:
     current_palette = RESOURCES.combat_palettes.get(palette_nid)
     return palette_name, current_palette
 
+def get_effect_palette(effect: EffectAnimation, palette_name: str, palette: Palette) -> Palette:
+    """
+    The palette an effect started by an animation in palette should use
+    """
+    effect_palette_names = [palette[0] for palette in effect.palettes]
+    effect_palette_nids = [palette[1] for palette in effect.palettes]
+
+    if palette.nid in effect_palette_nids:
+        return palette
+    elif palette_name in effect_palette_names:
+        idx = effect_palette_names.index(palette_name)
+        palette_nid = effect_palette_nids[idx]
+        return RESOURCES.combat_palettes.get(palette_nid)
+    elif effect.palettes:
+        first_palette_nid = effect.palettes[0][1]
+        return RESOURCES.combat_palettes.get(first_palette_nid)
+    else:  # Effect does not have a palette
+        return palette
+
+def get_spell_effect(effect_nid: str, unit, item) -> str:
+    if effect_nid:
+        return effect_nid
+    elif isinstance(item, str):
+        return item
+    elif unit and item_system.effect_animation(unit, item):
+        return item_system.effect_animation(unit, item)
+    else:
+        return item.nid
+
 def get_battle_anim(unit, item, distance=1, klass=None) -> BattleAnimation:
+    prefab = get_battle_anim_prefab(unit, item, distance, klass)
+    if not prefab:
+        return None
+    res, weapon_anim, palette_name, palette = prefab
+    battle_anim = BattleAnimation.get_anim(res, weapon_anim, palette_name, palette, unit, item)
+    return battle_anim
+
+def get_battle_anim_prefab(unit, item, distance=1, klass=None) -> tuple:
+    """
+    Returns the combat animation, weapon animation, palette name and palette
+    get_battle_anim would use, without loading any of them
+    """
     # Find the right combat animation
     if klass:
         class_obj = DB.classes.get(klass)
@@ -849,5 +954,51 @@ def get_battle_anim(unit, item, distance=1, klass=None) -> BattleAnimation:
                     logging.warning("Could not find spell animation for effect %s in weapon anim %s", effect, weapon_anim_nid)
                     return None
 
-    battle_anim = BattleAnimation.get_anim(res, weapon_anim, palette_name, palette, unit, item)
-    return battle_anim
+    return res, weapon_anim, palette_name, palette
+
+def get_effects(anim_prefab, palette_name: str, palette: Palette, unit, item) -> list:
+    """
+    Returns every effect animation anim_prefab could start, and the effects
+    those could start, as (effect animation, palette)
+    """
+    effects = []
+    seen = set()
+    to_check = [(anim_prefab, palette)]
+    while to_check:
+        prefab, prefab_palette = to_check.pop()
+        for pose in prefab.poses:
+            for command in pose.timeline:
+                if command.nid in EFFECT_COMMANDS:
+                    effect_nid = command.value[0]
+                elif command.nid == 'spell':
+                    effect_nid = get_spell_effect(command.value[0], unit, item)
+                else:
+                    continue
+                effect = RESOURCES.combat_effects.get(effect_nid)
+                if effect and effect.nid not in seen:
+                    seen.add(effect.nid)
+                    effect_palette = get_effect_palette(effect, palette_name, prefab_palette)
+                    effects.append((effect, effect_palette))
+                    to_check.append((effect, effect_palette))
+    return effects
+
+def prefetch(attacker, item, defender, def_item, distance=1):
+    """
+    Starts loading the battle animations of a fight between attacker and
+    defender, and every effect they could use, on a thread of their own,
+    instead of whatever fight was being loaded before
+    """
+    anims = []
+    for unit, unit_item in ((attacker, item), (defender, def_item)):
+        prefab = get_battle_anim_prefab(unit, unit_item, distance)
+        if not prefab:
+            # No animated fight to load, so the one before isn't needed either
+            FRAME_CACHE.cancel_prefetch()
+            return
+        res, weapon_anim, palette_name, palette = prefab
+        anims.append((weapon_anim, palette))
+        anims += get_effects(weapon_anim, palette_name, palette, unit, unit_item)
+    FRAME_CACHE.prefetch(anims)
+
+def cancel_prefetch():
+    FRAME_CACHE.cancel_prefetch()
@@ -1,11 +1,34 @@
+from array import array
+
 from app.constants import TILEWIDTH, TILEHEIGHT
 from app.utilities import utils
 
 from app.data.database import DB
 from app.engine.sprites import SPRITES
-from app.engine import engine, target_system, equations
+from app.engine import engine, target_system, equations, pathfinding, skill_system, item_funcs
 from app.engine.game_state import game
 
+class ThreatCache():
+    """
+    Everything one enemy unit contributes to the boundary, along with what
+    it was computed from, so it can tell when it needs to be recomputed.
+    Positions are stored as flat indices (x * height + y).
+    """
+    __slots__ = ['signature', 'region', 'blocked', 'terrain', 'attack', 'spell']
+
+    def __init__(self, signature, region, blocked, terrain, attack, spell):
+        # Everything about the unit itself that went into the result
+        self.signature = signature
+        # Every tile the movement search looked at. Only the blocking state
+        # and terrain of these tiles can change the unit's valid moves
+        self.region = region
+        # Which tiles in the region were blocked by another unit
+        self.blocked = blocked
+        # Terrain of each tile in the region, in the region's iteration order
+        self.terrain = terrain
+        self.attack = attack
+        self.spell = spell
+
 class BoundaryInterface():
     draw_order = ('all_spell', 'all_attack', 'spell', 'attack')
     enemy_teams = ('enemy', 'enemy2')
@@ -21,33 +44,51 @@ class BoundaryInterface():
         self.width = width
         self.height = height
         
-        # grid of sets. Each set contains the unit nids that are capable
-        # of attacking that spot
-        # The movement portion -- unit's have an area of influence
-        # If they move, they affect all other units in their area of influence
+        # Grid of counts. Each cell holds the number of units
+        # capable of attacking that spot
         self.grids = {'attack': self.init_grid(),
-                      'spell': self.init_grid(),
-                      'movement': self.init_grid()}
-        # Key: Unit NID, Value: list of positions where the unit is capable
-        # of attacking
-        self.dictionaries = {'attack': {},
-                             'spell': {},
-                             'movement': {}}
+                      'spell': self.init_grid()}
+        # Key: Unit NID, Value: ThreatCache
+        self.threats = {}
+        # Unit nids whose threat needs to be recomputed once the board settles
+        self.dirty = set()
+        # While deferred, threats are only marked dirty, and are
+        # recomputed all at once by release()
+        self.deferred = False
+        self.reset_deferred = False
 
         self.draw_flag = False
         self.all_on_flag = False
 
         self.displaying_units = set()
 
-        self.surf = None
+        # Counts of only the units the player can see, and of only the visible
+        # units that are being displayed. These are what actually get drawn
+        self.visible_grids = {'attack': self.init_grid(),
+                              'spell': self.init_grid()}
+        self.display_grids = {'attack': self.init_grid(),
+                              'spell': self.init_grid()}
+        self.visible_units = set()
+
+        # Whether the player can see each tile.
+        # Recomputed once whenever vision might have changed
+        self.vision = bytearray(b'\x01') * (width * height)
+        self.vision_fog = False
+        self.vision_dirty = True
+
+        # 'all' holds the all_spell and all_attack boundaries,
+        # 'unit' holds the spell and attack boundaries of the displayed units.
+        # Each is only redrawn on the tiles that changed since it was last drawn
+        self.surfs = {'all': None, 'unit': None}
+        self.tile_images = {'all': None, 'unit': None}
+        self.dirty_tiles = {'all': set(), 'unit': set()}
+
         self.fog_of_war_surf = None
+        self.fog_of_war_level = None
+        self.fog_of_war_dirty_tiles = set()
 
     def init_grid(self):
-        cells = []
-        for x in range(self.width):
-            for y in range(self.height):
-                cells.append(set())
-        return cells
+        return array('H', bytes(2 * self.width * self.height))
 
     def show(self):
         self.draw_flag = True
@@ -60,25 +101,29 @@ class BoundaryInterface():
 
     def toggle_unit(self, unit):
         if unit.nid in self.displaying_units:
-            self.displaying_units.discard(unit.nid)
+            self.reset_unit(unit)
         else:
             self.displaying_units.add(unit.nid)
-        self.surf = None
+            if unit.nid in self.visible_units:
+                self._count_display(self.threats[unit.nid], 1)
 
     def reset_unit(self, unit):
         if unit.nid in self.displaying_units:
+            if unit.nid in self.visible_units:
+                self._count_display(self.threats[unit.nid], -1)
             self.displaying_units.discard(unit.nid)
-            self.surf = None
 
     def reset_fog_of_war(self):
-        self.fog_of_war_surf = None
+        self.vision_dirty = True
 
-    def _set(self, positions, mode, nid):
-        grid = self.grids[mode]
-        self.dictionaries[mode][nid] = set()
-        for pos in positions:
-            grid[pos[0] * self.height + pos[1]].add(nid)
-            self.dictionaries[mode][nid].add(pos)
+    def get_positions(self, mode, nid) -> set:
+        """
+        Returns the set of positions the unit can attack with the mode ('attack' or 'spell')
+        """
+        threat = self.threats.get(nid)
+        if not threat:
+            return set()
+        return {divmod(idx, self.height) for idx in getattr(threat, mode)}
 
     def clear(self, mode=None):
         if mode:
@@ -86,85 +131,231 @@ class BoundaryInterface():
         else:
             modes = list(self.grids.keys())
         for m in modes:
-            for x in range(self.width):
-                for y in range(self.height):
-                    self.grids[m][x * self.height + y].clear()
-        self.surf = None
+            self.grids[m] = self.init_grid()
+            self.visible_grids[m] = self.init_grid()
+            self.display_grids[m] = self.init_grid()
+        if not mode:
+            self.threats.clear()
+            self.dirty.clear()
+            self.visible_units.clear()
+        self.surfs = {'all': None, 'unit': None}
         self.fog_of_war_surf = None
 
-    def _add_unit(self, unit):
-        valid_moves = target_system.get_valid_moves(unit, force=True)
-
+    def _get_signature(self, unit) -> tuple:
+        from app.engine.movement import MovementManager
+        guard = False
         if DB.constants.value('zero_move') and unit.ai and not unit.ai_group_active:
             ai_prefab = DB.ai.get(unit.ai)
-            guard = ai_prefab.guard_ai()
-            if guard:
-                valid_moves = {unit.position}
+            guard = bool(ai_prefab.guard_ai())
+        weapon_ranges = tuple(tuple(item_funcs.get_range(unit, item)) for item in target_system.get_all_weapons(unit))
+        spell_ranges = tuple(tuple(item_funcs.get_range(unit, item)) for item in target_system.get_all_spells(unit))
+        return (unit.position, unit.team, equations.parser.movement(unit),
+                MovementManager.get_movement_group(unit), bool(skill_system.pass_through(unit)),
+                guard, weapon_ranges, spell_ranges)
+
+    def _get_terrain(self, unit, region) -> tuple:
+        from app.engine.movement import MovementManager
+        grid = game.board.get_grid(MovementManager.get_movement_group(unit))
+        return tuple(grid[idx].cost if grid[idx].reachable else None for idx in region)
+
+    def _blocks(self, unit, idx, ignore=None) -> bool:
+        """
+        Whether the tile at idx stops the unit from moving through it,
+        just like the Djikstra search checks. If ignore is a unit, acts as if
+        that unit had already left the tile
+        """
+        teams = game.board.team_grid[idx]
+        if ignore and ignore in game.board.unit_grid[idx]:
+            teams = list(teams)
+            teams.remove(ignore.team)
+        if not teams or utils.compare_teams(unit.team, teams[0]):
+            return False
+        if skill_system.pass_through(unit):
+            return False
+        if unit.team == 'player' or DB.constants.value('ai_fog_of_war'):
+            if not game.board.in_vision(divmod(idx, self.height), unit.team):
+                return False
+        return True
+
+    def _add_unit(self, unit):
+        signature = self._get_signature(unit)
+        guard = signature[5]
+        if guard:
+            valid_moves = {unit.position}
+            region = frozenset()
+        else:
+            valid_moves = target_system.get_valid_moves(unit, force=True)
+            # The search looked at every tile it reached and every tile next to those.
+            # Tiles farther away than the unit's movement could never have been reached
+            height = self.height
+            neighbors = pathfinding.get_search_buffer(self.width * height).get_neighbors(self.width, height)
+            movement = signature[2]
+            ux, uy = unit.position
+            region = set()
+            for x, y in valid_moves:
+                idx = x * height + y
+                region.add(idx)
+                region.update(neighbors[idx])
+            region = frozenset(idx for idx in region if abs(idx // height - ux) + abs(idx % height - uy) <= movement)
+
+        blocked = frozenset(idx for idx in region if game.board.team_grid[idx] and self._blocks(unit, idx))
+        terrain = self._get_terrain(unit, region)
 
         valid_attacks = target_system.get_possible_attacks(unit, valid_moves)
         valid_spells = target_system.get_possible_spell_attacks(unit, valid_moves)
-        self._set(valid_attacks, 'attack', unit.nid)
-        self._set(valid_spells, 'spell', unit.nid)
+        attack = array('l', [x * self.height + y for x, y in valid_attacks])
+        spell = array('l', [x * self.height + y for x, y in valid_spells])
+        threat = self.threats[unit.nid] = ThreatCache(signature, region, blocked, terrain, attack, spell)
+        self._count(attack, self.grids['attack'], 1)
+        self._count(spell, self.grids['spell'], 1)
+        if self.vision[unit.position[0] * self.height + unit.position[1]]:
+            self.visible_units.add(unit.nid)
+            self._count_visible(unit.nid, threat, 1)
+        self.dirty.discard(unit.nid)
+
+    def _count(self, positions, grid, delta):
+        for idx in positions:
+            grid[idx] += delta
+
+    def _count_visible(self, nid, threat, delta):
+        for mode in ('attack', 'spell'):
+            self._count(getattr(threat, mode), self.visible_grids[mode], delta)
+        if nid in self.displaying_units:
+            self._count_display(threat, delta)
+        else:
+            self._mark(threat)
 
-        area_of_influence = target_system.find_manhattan_spheres(set(range(1, equations.parser.movement(unit) + 1)), *unit.position)
-        area_of_influence = {pos for pos in area_of_influence if self.check_bounds(pos)}
-        self._set(area_of_influence, 'movement', unit.nid)
+    def _count_display(self, threat, delta):
+        for mode in ('attack', 'spell'):
+            self._count(getattr(threat, mode), self.display_grids[mode], delta)
+        self._mark(threat)
 
-        self.surf = None
+    def _mark(self, threat):
+        for tiles in self.dirty_tiles.values():
+            tiles.update(threat.attack)
+            tiles.update(threat.spell)
 
     def _remove_unit(self, unit):
-        for mode, grid in self.grids.items():
-            if unit.nid in self.dictionaries[mode]:
-                for (x, y) in self.dictionaries[mode][unit.nid]:
-                    grid[x * self.height + y].discard(unit.nid)
-                # del self.dictionaries[mode][unit.nid]
-        self.surf = None
+        self._remove(unit.nid)
+
+    def _remove(self, nid):
+        threat = self.threats.pop(nid, None)
+        if threat:
+            self._count(threat.attack, self.grids['attack'], -1)
+            self._count(threat.spell, self.grids['spell'], -1)
+            if nid in self.visible_units:
+                self._count_visible(nid, threat, -1)
+                self.visible_units.discard(nid)
+        self.dirty.discard(nid)
+
+    def _is_valid(self, unit, threat) -> bool:
+        if threat.signature != self._get_signature(unit):
+            return False
+        if threat.terrain != self._get_terrain(unit, threat.region):
+            return False
+        team_grid = game.board.team_grid
+        for idx in threat.region:
+            if bool(team_grid[idx] and self._blocks(unit, idx)) != (idx in threat.blocked):
+                return False
+        return True
 
     def recalculate_unit(self, unit):
         if unit.team in self.enemy_teams:
             self._remove_unit(unit)
             if unit.position:
+                if self.deferred:
+                    self.dirty.add(unit.nid)
+                else:
+                    self._add_unit(unit)
+
+    def _invalidate(self, unit, ignore=None):
+        """
+        Marks every other unit whose movement depends on whether
+        the unit's tile is blocked, if that actually changed
+        """
+        x, y = unit.position
+        idx = x * self.height + y
+        for nid, threat in self.threats.items():
+            if nid == unit.nid or nid in self.dirty or idx not in threat.region:
+                continue
+            other_unit = game.get_unit(nid)
+            if self._blocks(other_unit, idx, ignore) != (idx in threat.blocked):
+                self.dirty.add(nid)
+
+    def update(self):
+        """
+        Recomputes every unit marked dirty
+        """
+        for nid in sorted(self.dirty):
+            unit = game.get_unit(nid)
+            self._remove(nid)
+            if unit and unit.position:
                 self._add_unit(unit)
+        self.dirty.clear()
+        self.vision_dirty = True
 
     def leave(self, unit):
+        # Called before the unit is removed from the board
         if unit.team in self.enemy_teams:
             self._remove_unit(unit)
 
         # Update ranges of other units that might be affected by my leaving
         if unit.position:
-            x, y = unit.position
-            other_units = {game.get_unit(nid) for nid in self.grids['movement'][x * self.height + y]}
-            other_units = {other_unit for other_unit in other_units if not utils.compare_teams(unit.team, other_unit.team)}
-
-            for other_unit in other_units:
-                self._remove_unit(other_unit)
-            for other_unit in other_units:
-                if other_unit.position:
-                    self._add_unit(other_unit)
+            self._invalidate(unit, ignore=unit)
 
     def arrive(self, unit):
+        # Called after the unit is placed on the board
         if unit.position:
             if unit.team in self.enemy_teams:
-                self._add_unit(unit)
+                self._remove_unit(unit)
+                if self.deferred:
+                    self.dirty.add(unit.nid)
+                else:
+                    self._add_unit(unit)
 
             # Update ranges of other units that might be affected by my arrival
-            x, y = unit.position
-            # print(self.grids['movement'][x * self.height + y])
-            other_units = {game.get_unit(nid) for nid in self.grids['movement'][x * self.height + y]}
-            other_units = {other_unit for other_unit in other_units if not utils.compare_teams(unit.team, other_unit.team)}
-
-            for other_unit in other_units:
-                self._remove_unit(other_unit)
-            for other_unit in other_units:
-                if other_unit.position:
-                    self._add_unit(other_unit)
+            self._invalidate(unit)
+        if not self.deferred:
+            self.update()
+
+    def defer(self):
+        """
+        Stops recomputing threats as units come and go, for when many
+        actions are about to be run at once (like the turnwheel does)
+        and only the board at the end of them matters
+        """
+        self.deferred = True
+
+    def release(self):
+        """
+        Recomputes every threat that changed while deferred
+        """
+        self.deferred = False
+        if self.reset_deferred:
+            self.reset_deferred = False
+            self.reset()
+        else:
+            self.update()
 
     # Called when map changes
     def reset(self):
-        self.clear()
+        if self.deferred:
+            self.reset_deferred = True
+            return
+        self.update()
+        for nid in list(self.threats):
+            if not game.get_unit(nid):
+                self._remove(nid)
+        los = DB.constants.value('line_of_sight')
         for unit in game.units:
+            threat = self.threats.get(unit.nid)
             if unit.position and unit.team in self.enemy_teams:
-                self._add_unit(unit)
+                if los or not threat or not self._is_valid(unit, threat):
+                    self._remove_unit(unit)
+                    self._add_unit(unit)
+            elif threat:
+                self._remove_unit(unit)
+        self.vision_dirty = True
 
     def toggle_all_enemy_attacks(self):
         if self.all_on_flag:
@@ -174,73 +365,116 @@ class BoundaryInterface():
 
     def show_all_enemy_attacks(self):
         self.all_on_flag = True
-        self.surf = None
 
     def clear_all_enemy_attacks(self):
         self.all_on_flag = False
-        self.surf = None
+
+    def _update_vision(self):
+        """
+        Recomputes which tiles the player can see, and from that,
+        which units' boundaries should be drawn
+        """
+        size = self.width * self.height
+        height = self.height
+        fog = bool(game.level_vars.get('_fog_of_war'))
+        if fog:
+            in_vision = game.board.in_vision
+            vision = bytearray(in_vision((idx // height, idx % height)) for idx in range(size))
+        else:
+            vision = bytearray(b'\x01') * size
+        if vision != self.vision:
+            old_vision = self.vision
+            self.fog_of_war_dirty_tiles.update(idx for idx in range(size) if vision[idx] != old_vision[idx])
+            self.vision = vision
+        self.vision_fog = fog
+        self.vision_dirty = False
+
+        for nid, threat in self.threats.items():
+            x, y = game.get_unit(nid).position
+            visible = bool(vision[x * height + y])
+            if visible and nid not in self.visible_units:
+                self.visible_units.add(nid)
+                self._count_visible(nid, threat, 1)
+            elif not visible and nid in self.visible_units:
+                self._count_visible(nid, threat, -1)
+                self.visible_units.discard(nid)
+
+    def _check_vision(self):
+        if self.dirty:
+            self.update()
+        if self.vision_dirty or self.vision_fog != bool(game.level_vars.get('_fog_of_war')):
+            self._update_vision()
 
     def draw(self, surf, full_size, cull_rect):
         if not self.draw_flag:
             return surf
 
-        if not self.surf:
-            self.surf = engine.create_surface(full_size, transparent=True)
-
-            for grid_name in self.draw_order:
-                # Check whether we can skip this boundary interface
-                if grid_name == 'attack' and not self.displaying_units:
-                    continue
-                elif grid_name == 'spell' and not self.displaying_units:
-                    continue
-                elif grid_name == 'all_attack' and not self.all_on_flag:
-                    continue
-                elif grid_name == 'all_spell' and not self.all_on_flag:
-                    continue
-
-                if grid_name == 'all_attack' or grid_name == 'attack':
-                    grid = self.grids['attack']
-                else:
-                    grid = self.grids['spell']
-
-                # Remove all units that we shouldn't be able to see from the boundary
-                # Fog of War application
-                if game.level_vars.get('_fog_of_war'):
-                    new_grid = []
-                    for cell in grid:
-                        new_grid.append({nid for nid in cell if game.board.in_vision(game.get_unit(nid).position)})
-                else:
-                    new_grid = grid
-
-                for y in range(self.height):
-                    for x in range(self.width):
-                        cell = new_grid[x * self.height + y]
-                        if cell:
-                            # Determine whether this tile should have a red display
-                            red_display = False
-                            for nid in cell:
-                                if nid in self.displaying_units:
-                                    red_display = True
-                                    break
-
-                            if grid_name == 'all_attack' and red_display:
-                                continue
-                            if grid_name == 'all_spell' and red_display:
-                                continue
-
-                            if grid_name == 'attack' and not red_display:
-                                continue
-                            if grid_name == 'spell' and not red_display:
-                                continue
-
-                            image = self.create_image(new_grid, x, y, grid_name)
-                            self.surf.blit(image, (x * TILEWIDTH, y * TILEHEIGHT))
-
-        im = engine.subsurface(self.surf, cull_rect)
-        surf.blit(im, (0, 0))
+        self._check_vision()
+
+        # Check whether we can skip each layer
+        if self.all_on_flag:
+            self._draw_layer('all', full_size)
+            surf.blit(engine.subsurface(self.surfs['all'], cull_rect), (0, 0))
+        if self.displaying_units:
+            self._draw_layer('unit', full_size)
+            surf.blit(engine.subsurface(self.surfs['unit'], cull_rect), (0, 0))
         return surf
 
-    def create_image(self, grid, x, y, grid_name):
+    def _draw_layer(self, layer, full_size):
+        size = self.width * self.height
+        dirty_tiles = self.dirty_tiles[layer]
+        if not self.surfs[layer]:
+            layer_surf = self.surfs[layer] = engine.create_surface(full_size, transparent=True)
+            images = self.tile_images[layer] = [(None, None)] * size
+            tiles = range(size)
+        elif dirty_tiles:
+            layer_surf = self.surfs[layer]
+            images = self.tile_images[layer]
+            # A tile's image also depends on its neighbors
+            neighbors = pathfinding.get_search_buffer(size).get_neighbors(self.width, self.height)
+            tiles = set(dirty_tiles)
+            for idx in dirty_tiles:
+                tiles.update(neighbors[idx])
+        else:
+            return
+        dirty_tiles.clear()
+
+        if layer == 'all':
+            grid_names = ('all_spell', 'all_attack')
+        else:
+            grid_names = ('spell', 'attack')
+        for idx in tiles:
+            key = self._get_tile_key(layer, idx)
+            if key == images[idx]:
+                continue
+            x, y = divmod(idx, self.height)
+            topleft = (x * TILEWIDTH, y * TILEHEIGHT)
+            if images[idx] != (None, None):
+                layer_surf.fill((0, 0, 0, 0), (topleft[0], topleft[1], TILEWIDTH, TILEHEIGHT))
+            for grid_name, image_idx in zip(grid_names, key):
+                if image_idx is not None:
+                    layer_surf.blit(self.create_image(grid_name, image_idx), topleft)
+            images[idx] = key
+
+    def _get_tile_key(self, layer, idx) -> tuple:
+        """
+        Returns which image each boundary, in draw order, should show on the tile
+        """
+        x, y = divmod(idx, self.height)
+        key = []
+        for mode in ('spell', 'attack'):
+            display_grid = self.display_grids[mode]
+            # The unit boundary is drawn over the all boundary instead
+            if layer == 'all':
+                grid = self.visible_grids[mode]
+                show = grid[idx] and not display_grid[idx]
+            else:
+                grid = display_grid
+                show = grid[idx]
+            key.append(self.get_edges(grid, x, y) if show else None)
+        return tuple(key)
+
+    def get_edges(self, grid, x, y) -> int:
         top_pos = (x, y - 1)
         left_pos = (x - 1, y)
         right_pos = (x + 1, y)
@@ -251,36 +485,42 @@ class BoundaryInterface():
         left = False
         right = False
 
-        if grid_name == 'all_attack' or grid_name == 'all_spell':
-            if self.check_bounds(top_pos) and grid[x * self.height + y - 1]:
-                top = True
-            if self.check_bounds(bottom_pos) and grid[x * self.height + y + 1]:
-                bottom = True
-            if self.check_bounds(left_pos) and grid[(x - 1) * self.height + y]:
-                left = True
-            if self.check_bounds(right_pos) and grid[(x + 1) * self.height + y]:
-                right = True
-        else:
-            top = any(nid in self.displaying_units for nid in grid[x * self.height + y - 1]) if self.check_bounds(top_pos) else False
-            left = any(nid in self.displaying_units for nid in grid[(x - 1) * self.height + y]) if self.check_bounds(left_pos) else False
-            right = any(nid in self.displaying_units for nid in grid[(x + 1) * self.height + y]) if self.check_bounds(right_pos) else False
-            bottom = any(nid in self.displaying_units for nid in grid[x * self.height + y + 1]) if self.check_bounds(bottom_pos) else False
-        idx = top*8 + left*4 + right*2 + bottom  # Binary logis to get correct index
+        if self.check_bounds(top_pos) and grid[x * self.height + y - 1]:
+            top = True
+        if self.check_bounds(bottom_pos) and grid[x * self.height + y + 1]:
+            bottom = True
+        if self.check_bounds(left_pos) and grid[(x - 1) * self.height + y]:
+            left = True
+        if self.check_bounds(right_pos) and grid[(x + 1) * self.height + y]:
+            right = True
+        return top*8 + left*4 + right*2 + bottom  # Binary logis to get correct index
+
+    def create_image(self, grid_name, idx):
         return engine.subsurface(self.modes[grid_name], (idx * TILEWIDTH, 0, TILEWIDTH, TILEHEIGHT))
 
     def draw_fog_of_war(self, surf, full_size, cull_rect):
-        if game.level_vars['_fog_of_war']:
-            if not self.fog_of_war_surf:
+        fog_level = game.level_vars['_fog_of_war']
+        if fog_level:
+            self._check_vision()
+            if not self.fog_of_war_surf or fog_level != self.fog_of_war_level:
                 self.fog_of_war_surf = engine.create_surface(full_size, transparent=True)
-                for y in range(self.height):
-                    for x in range(self.width):
-                        if not game.board.in_vision((x, y)):
-                            if game.level_vars['_fog_of_war'] == 2:
-                                image = self.fog_of_war_tile2
-                            else:    
-                                image = self.fog_of_war_tile1
-                            self.fog_of_war_surf.blit(image, (x * TILEWIDTH, y * TILEHEIGHT))
-                        
+                self.fog_of_war_level = fog_level
+                tiles = range(self.width * self.height)
+            else:
+                tiles = self.fog_of_war_dirty_tiles
+            if fog_level == 2:
+                image = self.fog_of_war_tile2
+            else:
+                image = self.fog_of_war_tile1
+            # Only the tiles whose vision changed need to be redrawn
+            for idx in tiles:
+                x, y = divmod(idx, self.height)
+                topleft = (x * TILEWIDTH, y * TILEHEIGHT)
+                self.fog_of_war_surf.fill((0, 0, 0, 0), (topleft[0], topleft[1], TILEWIDTH, TILEHEIGHT))
+                if not self.vision[idx]:
+                    self.fog_of_war_surf.blit(image, topleft)
+            self.fog_of_war_dirty_tiles.clear()
+
             im = engine.subsurface(self.fog_of_war_surf, cull_rect)
             surf.blit(im, (0, 0))
         return surf
@@ -289,9 +529,9 @@ class BoundaryInterface():
         for y in range(self.height):
             print("%02d|" % y, end="")
             for x in range(self.width):
-                cell = self.grids[mode][x * self.height + y]
-                if cell:
-                    print(' %s |' % ','.join(cell), end="")
+                count = self.grids[mode][x * self.height + y]
+                if count:
+                    print(' %2d  |' % count, end="")
                 else:
                     print('  -  |', end="")
             print('\n', end=""),
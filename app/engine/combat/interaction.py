@@ -13,22 +13,25 @@ from app.engine import config as cf
 from app.engine.objects.unit import UnitObject
 from app.engine.objects.item import ItemObject
 
+def animation_wanted(attacker: UnitObject, defender: UnitObject) -> bool:
+    return cf.SETTINGS['animation'] == 'Always' or \
+        (cf.SETTINGS['animation'] == 'Your Turn' and attacker.team == 'player') or \
+        (cf.SETTINGS['animation'] == 'Combat Only' and skill_system.check_enemy(attacker, defender))
+
+def get_distance(attacker_position: tuple, defender: UnitObject) -> int:
+    if attacker_position and defender.position:
+        return utils.calculate_distance(attacker_position, defender.position)
+    else:
+        return 1
+
 def has_animation(attacker: UnitObject, item: ItemObject, main_target: tuple) -> bool:
     defender: UnitObject = game.board.get_unit(main_target)
     if not defender:
         return False
 
-    def animation_wanted(attacker: UnitObject, defender: UnitObject) -> bool:
-        return cf.SETTINGS['animation'] == 'Always' or \
-            (cf.SETTINGS['animation'] == 'Your Turn' and attacker.team == 'player') or \
-            (cf.SETTINGS['animation'] == 'Combat Only' and skill_system.check_enemy(attacker, defender))
-
     toggle_anim = INPUT.is_pressed('START')
     if attacker is not defender and animation_wanted(attacker, defender) != toggle_anim:
-        if attacker.position and defender.position:
-            distance = utils.calculate_distance(attacker.position, defender.position)
-        else:
-            distance = 1
+        distance = get_distance(attacker.position, defender)
         attacker_anim = battle_animation.get_battle_anim(attacker, item, distance)
         def_item = defender.get_weapon()
         defender_anim = battle_animation.get_battle_anim(defender, def_item, distance)
@@ -36,6 +39,19 @@ def has_animation(attacker: UnitObject, item: ItemObject, main_target: tuple) ->
 
     return False
 
+def prefetch_animation(attacker: UnitObject, item: ItemObject, main_target: tuple, position: tuple = None):
+    """
+    Starts loading the battle animations attacking main_target would use
+    in the background, if the fight would be animated.
+    position is where the attacker will attack from, if not where it is now
+    """
+    defender: UnitObject = game.board.get_unit(main_target)
+    if defender and attacker is not defender and animation_wanted(attacker, defender):
+        distance = get_distance(position or attacker.position, defender)
+        battle_animation.prefetch(attacker, item, defender, defender.get_weapon(), distance)
+    else:
+        battle_animation.cancel_prefetch()
+
 def engage(attacker: UnitObject, positions: list, main_item: ItemObject, skip: bool = False, script: list = None):
     """
     Builds the correct combat controller for this interaction
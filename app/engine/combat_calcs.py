@@ -297,6 +297,28 @@ def defense_speed(unit, item, item_to_avoid=None):
     speed += skill_system.modify_defense_speed(unit, item_to_avoid)
     return speed
 
+def get_triangle(unit, target, item, def_item) -> tuple:
+    """
+    Returns the weapon triangle bonuses between unit and target:
+    unit's advantage and disadvantage, then target's
+    """
+    return (compute_advantage(unit, target, item, def_item),
+            compute_advantage(unit, target, item, def_item, False),
+            compute_advantage(target, unit, def_item, item),
+            compute_advantage(target, unit, def_item, item, False))
+
+def get_support_bonuses(unit, target, mode) -> list:
+    # Three Houses style support bonus (only works on attack)
+    if mode in ('attack', 'splash'):
+        # Attacker's bonus
+        support_rank_bonuses, support_allies = get_support_rank_bonus(unit, target)
+        return support_rank_bonuses
+    if mode == 'defense':
+        # Attacker's bonus, taken away
+        support_rank_bonuses, support_allies = get_support_rank_bonus(target, unit)
+        return support_rank_bonuses
+    return []
+
 def compute_hit(unit, target, item, def_item, mode):
     if not item:
         return None
@@ -305,36 +327,38 @@ def compute_hit(unit, target, item, def_item, mode):
     if hit is None:
         return 10000
 
+    return hit_against(hit, unit, target, item, def_item, mode,
+                       get_triangle(unit, target, item, def_item), get_support_bonuses(unit, target, mode))
+
+def hit_against(hit, unit, target, item, def_item, mode, triangle, support_bonuses):
+    """
+    The rest of compute_hit, once unit's accuracy is known
+    """
     # Handles things like effective accuracy
     hit += item_system.dynamic_accuracy(unit, item, target, mode)
     
     # Weapon Triangle
     triangle_bonus = 0
-    adv = compute_advantage(unit, target, item, def_item)
-    disadv = compute_advantage(unit, target, item, def_item, False)
+    adv, disadv, target_adv, target_disadv = triangle
     if adv:
         triangle_bonus += int(adv.accuracy)
     if disadv:
         triangle_bonus += int(disadv.accuracy)
 
-    adv = compute_advantage(target, unit, def_item, item)
-    disadv = compute_advantage(target, unit, def_item, item, False)
-    if adv:
-        triangle_bonus -= int(adv.avoid)
-    if disadv:
-        triangle_bonus -= int(disadv.avoid)
+    if target_adv:
+        triangle_bonus -= int(target_adv.avoid)
+    if target_disadv:
+        triangle_bonus -= int(target_disadv.avoid)
     hit += triangle_bonus
 
     # Three Houses style support bonus (only works on attack)
     if mode in ('attack', 'splash'):
         # Attacker's accuracy bonus
-        support_rank_bonuses, support_allies = get_support_rank_bonus(unit, target)
-        for bonus in support_rank_bonuses:
+        for bonus in support_bonuses:
             hit += float(bonus.accuracy)
     if mode == 'defense':
         # Attacker's avoid bonus
-        support_rank_bonuses, support_allies = get_support_rank_bonus(target, unit)
-        for bonus in support_rank_bonuses:
+        for bonus in support_bonuses:
             hit -= float(bonus.avoid)
     hit = int(hit)
 
@@ -353,36 +377,38 @@ def compute_crit(unit, target, item, def_item, mode):
     if crit is None:
         return None
 
+    return crit_against(crit, unit, target, item, def_item, mode,
+                        get_triangle(unit, target, item, def_item), get_support_bonuses(unit, target, mode))
+
+def crit_against(crit, unit, target, item, def_item, mode, triangle, support_bonuses):
+    """
+    The rest of compute_crit, once unit's crit accuracy is known
+    """
     # Handles things like effective accuracy
     crit += item_system.dynamic_crit_accuracy(unit, item, target, mode)
     
     # Weapon Triangle
     triangle_bonus = 0
-    adv = compute_advantage(unit, target, item, def_item)
-    disadv = compute_advantage(unit, target, item, def_item, False)
+    adv, disadv, target_adv, target_disadv = triangle
     if adv:
         triangle_bonus += int(adv.crit)
     if disadv:
         triangle_bonus += int(disadv.crit)
 
-    adv = compute_advantage(target, unit, def_item, item)
-    disadv = compute_advantage(target, unit, def_item, item, False)
-    if adv:
-        triangle_bonus -= int(adv.dodge)
-    if disadv:
-        triangle_bonus -= int(disadv.dodge)
+    if target_adv:
+        triangle_bonus -= int(target_adv.dodge)
+    if target_disadv:
+        triangle_bonus -= int(target_disadv.dodge)
     crit += triangle_bonus
 
     # Three Houses style support bonus (only works on attack)
     if mode in ('attack', 'splash'):
         # Attacker's crit bonus
-        support_rank_bonuses, support_allies = get_support_rank_bonus(unit, target)
-        for bonus in support_rank_bonuses:
+        for bonus in support_bonuses:
             crit += float(bonus.crit)
     if mode == 'defense':
         # Attacker's dodge bonus
-        support_rank_bonuses, support_allies = get_support_rank_bonus(target, unit)
-        for bonus in support_rank_bonuses:
+        for bonus in support_bonuses:
             crit -= float(bonus.dodge)
     crit = int(crit)
 
@@ -401,37 +427,39 @@ def compute_damage(unit, target, item, def_item, mode, crit=False):
     if might is None:
         return None
 
+    return damage_against(might, unit, target, item, def_item, mode,
+                          get_triangle(unit, target, item, def_item), get_support_bonuses(unit, target, mode), crit)
+
+def damage_against(might, unit, target, item, def_item, mode, triangle, support_bonuses, crit=False):
+    """
+    The rest of compute_damage, once unit's damage is known
+    """
     # Handles things like effective damage
     might += item_system.dynamic_damage(unit, item, target, mode)
     might += skill_system.dynamic_damage(unit, item, target, mode)
 
     # Weapon Triangle
     triangle_bonus = 0
-    adv = compute_advantage(unit, target, item, def_item)
-    disadv = compute_advantage(unit, target, item, def_item, False)
+    adv, disadv, target_adv, target_disadv = triangle
     if adv:
         triangle_bonus += int(adv.damage)
     if disadv:
         triangle_bonus += int(disadv.damage)
 
-    adv = compute_advantage(target, unit, def_item, item)
-    disadv = compute_advantage(target, unit, def_item, item, False)
-    if adv:
-        triangle_bonus -= int(adv.resist)
-    if disadv:
-        triangle_bonus -= int(disadv.resist)
+    if target_adv:
+        triangle_bonus -= int(target_adv.resist)
+    if target_disadv:
+        triangle_bonus -= int(target_disadv.resist)
     might += triangle_bonus
 
     # Three Houses style support bonus (only works on attack)
     if mode in ('attack', 'splash'):
         # Attacker's damage bonus
-        support_rank_bonuses, support_allies = get_support_rank_bonus(unit, target)
-        for bonus in support_rank_bonuses:
+        for bonus in support_bonuses:
             might += float(bonus.damage)
     if mode == 'defense':
         # Attacker's resist bonus
-        support_rank_bonuses, support_allies = get_support_rank_bonus(target, unit)
-        for bonus in support_rank_bonuses:
+        for bonus in support_bonuses:
             might -= float(bonus.resist)
     might = int(might)
 
@@ -459,36 +487,37 @@ def outspeed(unit, target, item, def_item, mode) -> bool:
 
     speed = attack_speed(unit, item)
 
+    return outspeed_against(speed, unit, target, item, def_item, mode,
+                            get_triangle(unit, target, item, def_item), get_support_bonuses(unit, target, mode))
+
+def outspeed_against(speed, unit, target, item, def_item, mode, triangle, support_bonuses) -> int:
+    """
+    The rest of outspeed, once unit's attack speed is known
+    """
     # Handles things like effective damage
     speed += item_system.dynamic_attack_speed(unit, item, target, mode)
 
     # Weapon Triangle
     triangle_bonus = 0
-
-    adv = compute_advantage(unit, target, item, def_item)
-    disadv = compute_advantage(unit, target, item, def_item, False)
+    adv, disadv, target_adv, target_disadv = triangle
     if adv:
         triangle_bonus += int(adv.attack_speed)
     if disadv:
         triangle_bonus += int(disadv.attack_speed)
 
-    adv = compute_advantage(target, unit, def_item, item)
-    disadv = compute_advantage(target, unit, def_item, item, False)
-    if adv:
-        triangle_bonus -= int(adv.defense_speed)
-    if disadv:
-        triangle_bonus -= int(disadv.defense_speed)
+    if target_adv:
+        triangle_bonus -= int(target_adv.defense_speed)
+    if target_disadv:
+        triangle_bonus -= int(target_disadv.defense_speed)
 
     # Three Houses style support bonus (only works on attack)
     if mode in ('attack', 'splash'):
         # Attacker's attack_speed bonus
-        support_rank_bonuses, support_allies = get_support_rank_bonus(unit, target)
-        for bonus in support_rank_bonuses:
+        for bonus in support_bonuses:
             speed += float(bonus.attack_speed)
     if mode == 'defense':
         # Attacker's defense_speed bonus
-        support_rank_bonuses, support_allies = get_support_rank_bonus(target, unit)
-        for bonus in support_rank_bonuses:
+        for bonus in support_bonuses:
             speed -= float(bonus.defense_speed)
     speed = int(speed)
 
@@ -499,6 +528,71 @@ def outspeed(unit, target, item, def_item, mode) -> bool:
 
     return 2 if speed >= equations.parser.speed_to_double(unit) else 1
 
+def forecast(unit, item, targets, mode='attack') -> list:
+    """
+    The combat forecast for unit using item on each of targets from where
+    unit is now, and for each target's counterattack with its weapon.
+    Returns a list of (damage, crit_damage, hit, crit, num_attacks,
+    counter_damage, counter_hit), the same as compute_damage, compute_hit,
+    compute_crit and outspeed would give, but what only depends on unit
+    and item is worked out once for all the targets, and the weapon triangle
+    and support bonuses once for each target
+    """
+    if not item:
+        return [(None, None, None, None, 1, compute_damage(target, unit, target.get_weapon(), item, 'defense'),
+                 compute_hit(target, unit, target.get_weapon(), item, 'defense')) for target in targets]
+
+    might = damage(unit, item)
+    hit = accuracy(unit, item)
+    crit = crit_accuracy(unit, item)
+    if item_system.can_double(unit, item) and not skill_system.no_double(unit):
+        speed = attack_speed(unit, item)
+    else:
+        speed = None
+
+    results = []
+    for target in targets:
+        def_item = target.get_weapon()
+        triangle = get_triangle(unit, target, item, def_item)
+        support_bonuses = get_support_bonuses(unit, target, mode)
+        if might is None:
+            damage_result = crit_damage_result = None
+        else:
+            damage_result = damage_against(might, unit, target, item, def_item, mode, triangle, support_bonuses)
+            crit_damage_result = damage_against(might, unit, target, item, def_item, mode, triangle, support_bonuses, crit=True)
+        if hit is None:
+            hit_result = 10000
+        else:
+            hit_result = hit_against(hit, unit, target, item, def_item, mode, triangle, support_bonuses)
+        if crit is None:
+            crit_result = None
+        else:
+            crit_result = crit_against(crit, unit, target, item, def_item, mode, triangle, support_bonuses)
+        if speed is None:
+            num_attacks = 1
+        else:
+            num_attacks = outspeed_against(speed, unit, target, item, def_item, mode, triangle, support_bonuses)
+
+        # The target counterattacking, which is the same pair the other way around
+        if def_item:
+            counter_triangle = triangle[2:] + triangle[:2]
+            if mode in ('attack', 'splash'):
+                counter_support_bonuses = support_bonuses
+            else:
+                counter_support_bonuses = get_support_bonuses(target, unit, 'defense')
+            counter_might = damage(target, def_item)
+            counter_damage = None if counter_might is None else \
+                damage_against(counter_might, target, unit, def_item, item, 'defense', counter_triangle, counter_support_bonuses)
+            counter_hit = accuracy(target, def_item)
+            counter_hit = 10000 if counter_hit is None else \
+                hit_against(counter_hit, target, unit, def_item, item, 'defense', counter_triangle, counter_support_bonuses)
+        else:
+            counter_damage = counter_hit = None
+
+        results.append((damage_result, crit_damage_result, hit_result, crit_result, num_attacks,
+                        counter_damage, counter_hit))
+    return results
+
 def compute_multiattacks(unit, target, item, mode):
     if not item:
         return None
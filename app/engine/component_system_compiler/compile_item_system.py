@@ -1,3 +1,5 @@
+import re
+
 # HOOK CATALOG
 # All false hooks are exclusive
 false_hooks = ('is_weapon', 'is_spell', 'is_accessory', 'equippable',
@@ -31,6 +33,26 @@ aesthetic_combat_hooks = ('battle_music', 'combat_effect')
 status_event_hooks = ('on_upkeep', 'on_endstep')
 
 exclusive_hooks = false_hooks + default_hooks
+# Only depend on the units and items passed in, so hook_cache can memoize them
+cached_hooks = false_hooks + default_hooks + simple_target_hooks + modify_hooks + dynamic_hooks
+
+def write_hook(compiled_item_system, func, hook):
+    """
+    Writes out the hook's function. Cached hooks are renamed to _hook
+    and put behind a function that checks hook_cache first
+    """
+    if hook in cached_hooks:
+        args = re.search(r'def %s\((.*)\):' % hook, func).group(1)
+        compiled_item_system.write(func.replace('def %s(' % hook, 'def _%s(' % hook, 1))
+        compiled_item_system.write('\n')
+        func = """
+def %s(%s):
+    if hook_cache.enabled:
+        return hook_cache.call('item_system.%s', _%s, %s)
+    return _%s(%s)""" \
+            % (hook, args, hook, hook, args, hook, args)
+    compiled_item_system.write(func)
+    compiled_item_system.write('\n')
 
 def compile_item_system():
     import os
@@ -56,8 +78,7 @@ def %s(unit, item):
             return component.%s(unit, item)
     return False""" \
             % (hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
 
     for hook in default_hooks:
         func = """
@@ -67,8 +88,7 @@ def %s(unit, item):
             return component.%s(unit, item)
     return Defaults.%s(unit, item)""" \
             % (hook, hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
 
     for hook in simple_target_hooks:
         func = """
@@ -79,8 +99,7 @@ def %s(unit, item, target):
             val += component.%s(unit, item, target)
     return val""" \
             % (hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
 
     for hook in target_hooks:
         func = """
@@ -91,8 +110,7 @@ def %s(playback, unit, item, target):
             val += component.%s(playback, unit, item, target)
     return val""" \
             % (hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
 
     for hook in modify_hooks:
         func = """
@@ -103,8 +121,7 @@ def %s(unit, item):
             val += component.%s(unit, item)
     return val""" \
             % (hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
 
     for hook in dynamic_hooks:
         func = """
@@ -115,8 +132,7 @@ def %s(unit, item, target, mode):
             val += component.%s(unit, item, target, mode)
     return val""" \
             % (hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
 
     for hook in event_hooks:
         func = """
@@ -129,8 +145,7 @@ def %s(unit, item):
             if component.defines('%s'):
                 component.%s(unit, item.parent_item)""" \
             % (hook, hook, hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
 
     for hook in combat_event_hooks:
         func = """
@@ -143,8 +158,7 @@ def %s(playback, unit, item, target, mode):
             if component.defines('%s'):
                 component.%s(playback, unit, item.parent_item, target, mode)""" \
             % (hook, hook, hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
 
     for hook in status_event_hooks:
         func = """
@@ -157,8 +171,7 @@ def %s(actions, playback, unit, item):
             if component.defines('%s'):
                 component.%s(actions, playback, unit, item.parent_item)""" \
             % (hook, hook, hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
 
     for hook in aesthetic_combat_hooks:
         func = """
@@ -168,5 +181,4 @@ def %s(unit, item, target, mode):
             return component.%s(unit, item, target, mode)
     return None""" \
             % (hook, hook, hook)
-        compiled_item_system.write(func)
-        compiled_item_system.write('\n')
+        write_hook(compiled_item_system, func, hook)
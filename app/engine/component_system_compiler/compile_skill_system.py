@@ -1,3 +1,5 @@
+import re
+
 # Takes in unit, returns False if not present
 # All default hooks are exclusive
 formula = ('damage_formula', 'resist_formula', 'accuracy_formula', 'avoid_formula',
@@ -34,6 +36,27 @@ combat_event_hooks = ('start_combat', 'cleanup_combat', 'end_combat', 'pre_comba
 subcombat_event_hooks = ('after_hit', 'after_take_hit', 'start_sub_combat', 'end_sub_combat')
 # Takes in unit, item
 item_event_hooks = ('on_add_item', 'on_remove_item', 'on_equip_item', 'on_unequip_item')
+# Only depend on the units and items passed in, so hook_cache can memoize them
+cached_hooks = default_behaviours + exclusive_behaviours + targeted_behaviours + item_behaviours + \
+    modify_hooks + dynamic_hooks + multiply_hooks
+
+def write_hook(compiled_skill_system, func, hook):
+    """
+    Writes out the hook's function. Cached hooks are renamed to _hook
+    and put behind a function that checks hook_cache first
+    """
+    if hook in cached_hooks:
+        args = re.search(r'def %s\((.*)\):' % hook, func).group(1)
+        compiled_skill_system.write(func.replace('def %s(' % hook, 'def _%s(' % hook, 1))
+        compiled_skill_system.write('\n')
+        func = """
+def %s(%s):
+    if hook_cache.enabled:
+        return hook_cache.call('skill_system.%s', _%s, %s)
+    return _%s(%s)""" \
+            % (hook, args, hook, hook, args, hook, args)
+    compiled_skill_system.write(func)
+    compiled_skill_system.write('\n')
 
 
 def compile_skill_system():
@@ -62,8 +85,7 @@ def %s(unit):
                     return component.%s(unit)
     return False""" \
             % (behaviour, behaviour, behaviour)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, behaviour)
 
     for behaviour in exclusive_behaviours:
         func = """
@@ -75,8 +97,7 @@ def %s(unit):
                     return component.%s(unit)
     return Defaults.%s(unit)""" \
             % (behaviour, behaviour, behaviour, behaviour)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, behaviour)
 
     for behaviour in targeted_behaviours:
         func = """
@@ -88,8 +109,7 @@ def %s(unit1, unit2):
                     return component.%s(unit1, unit2)
     return Defaults.%s(unit1, unit2)""" \
             % (behaviour, behaviour, behaviour, behaviour)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, behaviour)
 
     for behaviour in item_behaviours:
         func = """
@@ -101,8 +121,7 @@ def %s(unit, item):
                     return component.%s(unit, item)
     return Defaults.%s(unit, item)""" \
             % (behaviour, behaviour, behaviour, behaviour)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, behaviour)
 
     for hook in modify_hooks:
         func = """
@@ -115,8 +134,7 @@ def %s(unit, item):
                     val += component.%s(unit, item)
     return val""" \
             % (hook, hook, hook)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, hook)
 
     for hook in dynamic_hooks:
         func = """
@@ -129,8 +147,7 @@ def %s(unit, item, target, mode):
                     val += component.%s(unit, item, target, mode)
     return val""" \
             % (hook, hook, hook)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, hook)
 
     for hook in multiply_hooks:
         func = """
@@ -143,8 +160,7 @@ def %s(unit, item, target, mode):
                     val *= component.%s(unit, item, target, mode)
     return val""" \
             % (hook, hook, hook)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, hook)
 
     for hook in simple_event_hooks:
         func = """
@@ -155,8 +171,7 @@ def %s(unit):
                 if component.ignore_conditional or condition(skill, unit):
                     component.%s(unit)""" \
             % (hook, hook, hook)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, hook)
 
     for hook in combat_event_hooks:
         func = """
@@ -165,10 +180,10 @@ def %s(playback, unit, item, target, mode):
         for component in skill.components:
             if component.defines('%s'):
                 if component.ignore_conditional or condition(skill, unit):
-                    component.%s(playback, unit, item, target, mode)""" \
+                    component.%s(playback, unit, item, target, mode)
+                    hook_cache.clear()""" \
             % (hook, hook, hook)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, hook)
 
     for hook in subcombat_event_hooks:
         func = """
@@ -178,8 +193,7 @@ def %s(actions, playback, unit, item, target, mode):
             if component.defines('%s'):
                 component.%s(actions, playback, unit, item, target, mode)""" \
             % (hook, hook, hook)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, hook)
 
     for hook in item_event_hooks:
         func = """
@@ -189,5 +203,4 @@ def %s(unit, item):
             if component.defines('%s'):
                 component.%s(unit, item)""" \
             % (hook, hook, hook)
-        compiled_skill_system.write(func)
-        compiled_skill_system.write('\n')
+        write_hook(compiled_skill_system, func, hook)
@@ -1,5 +1,7 @@
 import random
 
+from app.engine import hook_cache
+
 class Defaults():
     @staticmethod
     def full_price(unit, item) -> int:
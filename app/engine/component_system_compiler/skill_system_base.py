@@ -1,3 +1,5 @@
+from app.engine import hook_cache
+
 class Defaults():
     @staticmethod
     def can_select(unit) -> bool:
@@ -141,6 +143,11 @@ def available(unit, item) -> bool:
     return True
 
 def stat_change(unit, stat_nid) -> int:
+    if hook_cache.enabled:
+        return hook_cache.call('skill_system.stat_change', _stat_change, unit, stat_nid)
+    return _stat_change(unit, stat_nid)
+
+def _stat_change(unit, stat_nid) -> int:
     bonus = 0
     for skill in unit.skills:
         for component in skill.components:
@@ -150,7 +157,27 @@ def stat_change(unit, stat_nid) -> int:
                     bonus += d.get(stat_nid, 0)
     return bonus
 
+def stat_changes(unit) -> dict:
+    """
+    Returns the bonus to every stat from all of the unit's skills at once
+    (the same as calling stat_change for each stat)
+    """
+    bonuses = {}
+    for skill in unit.skills:
+        for component in skill.components:
+            if component.defines('stat_change'):
+                if component.ignore_conditional or condition(skill, unit):
+                    d = component.stat_change(unit)
+                    for stat_nid, val in d.items():
+                        bonuses[stat_nid] = bonuses.get(stat_nid, 0) + val
+    return bonuses
+
 def growth_change(unit, stat_nid) -> int:
+    if hook_cache.enabled:
+        return hook_cache.call('skill_system.growth_change', _growth_change, unit, stat_nid)
+    return _growth_change(unit, stat_nid)
+
+def _growth_change(unit, stat_nid) -> int:
     bonus = 0
     for skill in unit.skills:
         for component in skill.components:
@@ -1,4 +1,4 @@
-from app.constants import WINHEIGHT
+from app.constants import WINWIDTH, WINHEIGHT
 from app.engine.sprites import SPRITES
 from app.engine.fonts import FONT
 from app.engine.sound import SOUNDTHREAD
@@ -9,6 +9,7 @@ from app.engine.input_manager import INPUT
 
 from app.engine.state import MapState
 from app.engine.game_state import game
+from app.engine.unit_sprite import TINT_CACHE
 from app.engine import engine, config
 
 class DebugState(MapState):
@@ -62,6 +63,9 @@ class DebugState(MapState):
         for idx, command in enumerate(reversed(self.commands[-self.num_back:])):
             FONT['text-white'].blit(command, surf, (0, WINHEIGHT - idx * 16 - 32))
         FONT['text-white'].blit(self.current_command, surf, (0, WINHEIGHT - 16))
+        # How well the map sprite tints are being reused
+        tints = 'Tints %d%% hit %d new' % (TINT_CACHE.hit_rate() * 100, TINT_CACHE.last_allocated)
+        FONT['text-white'].blit_right(tints, surf, (WINWIDTH, WINHEIGHT - 16))
         return surf
 
     def end(self):
@@ -13,8 +13,8 @@ def start(title, from_editor=False):
     icon = engine.image_load('favicon.ico')
     engine.set_icon(icon)
 
-    from app.engine import sprites
-    sprites.load_images()
+    # Sprites are loaded the first time they are asked for
+    from app.engine import sprites  # noqa: F401
 
     # Hack to get icon to show up in windows
     try:
@@ -48,6 +48,7 @@ def save_screenshot(raw_events: list, surf):
         engine.save_surface(surf, 'screenshots/LT_%s.bmp' % current_time)
 
 def run(game):
+    from app.engine.ai_thread import AI_THREAD
     from app.engine.sound import SOUNDTHREAD
     from app.engine.game_counters import ANIMATION_COUNTERS
     from app.engine.input_manager import INPUT
@@ -71,9 +72,10 @@ def run(game):
             break
         event = INPUT.process_input(raw_events)
 
-        surf, repeat = game.state.update(event, surf)
-        while repeat:  # Let's the game traverse through state chains
-            surf, repeat = game.state.update([], surf)
+        with AI_THREAD.frame():
+            surf, repeat = game.state.update(event, surf)
+            while repeat:  # Let's the game traverse through state chains
+                surf, repeat = game.state.update([], surf)
 
         SOUNDTHREAD.update(raw_events)
 
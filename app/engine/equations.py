@@ -1,19 +1,24 @@
-import re, functools
+import ast, re, functools, logging
+from collections import Counter
 
 from app.data.database import DB
 
 class Parser():
     def __init__(self):
         self.equations = {}
+        self.expressions = {}
+        self.sources = {}
         for equation in DB.equations.values():
             if equation.expression:
-                self.equations[equation.nid] = self.tokenize(equation.expression)
-        
+                self.sources[equation.nid] = self.tokenize(equation.expression)
+
         self.replacement_dict = self.create_replacement_dict()
 
-        for nid in list(self.equations.keys()):
-            expression = self.equations[nid]
-            self.fix(nid, expression, self.replacement_dict)
+        # Each equation becomes a single function with the equations it uses
+        # written into it, so nothing it needs is worked out more than once
+        self.evaluated = {nid: self.get_evaluated_names(tokens) for nid, tokens in self.sources.items()}
+        for nid in self.get_order():
+            self.compile(nid)
 
         # Now add these equations as local functions
         for nid in self.equations.keys():
@@ -27,10 +32,118 @@ class Parser():
         dic = {}
         for stat in DB.stats:
             dic[stat.nid] = ("(unit.stats['%s'] + unit.stat_bonus('%s'))" % (stat.nid, stat.nid))
-        for nid in self.equations.keys():
+        for nid in self.sources.keys():
             dic[nid] = ("equations['%s'](equations, unit)" % nid)
         return dic
 
+    def get_evaluated_names(self, tokens) -> set:
+        """
+        Returns the stats and equations the expression always works out.
+        Ones that are only worked out sometimes (in one branch of an if,
+        or after an and/or) are left out, and are not worked out ahead of time
+        """
+        try:
+            tree = ast.parse(''.join(tokens).strip(), mode='eval')
+        except SyntaxError:
+            return None  # fix will report it
+        names = set()
+        nodes = [tree.body]
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, ast.Name):
+                names.add(node.id)
+            elif isinstance(node, ast.IfExp):
+                nodes.append(node.test)
+            elif isinstance(node, ast.BoolOp):
+                nodes.append(node.values[0])
+            elif isinstance(node, ast.Compare):
+                nodes += [node.left, node.comparators[0]]
+            elif isinstance(node, (ast.Lambda, ast.GeneratorExp, ast.ListComp, ast.SetComp, ast.DictComp)):
+                continue
+            else:
+                nodes += ast.iter_child_nodes(node)
+        return names & set(self.replacement_dict)
+
+    def get_order(self) -> list:
+        """
+        Returns every equation after all the equations it uses.
+        Equations that end up using themselves are left for last,
+        and kept in self.cyclic
+        """
+        order = []
+        visiting = set()
+
+        def visit(nid) -> bool:
+            if nid in order:
+                return True
+            if nid in visiting:
+                return False
+            visiting.add(nid)
+            ok = all([visit(token) for token in set(self.sources[nid]) if token in self.sources])
+            visiting.discard(nid)
+            if ok:
+                order.append(nid)
+            return ok
+
+        for nid in self.sources.keys():
+            visit(nid)
+        self.cyclic = [nid for nid in self.sources.keys() if nid not in order]
+        for nid in self.cyclic:
+            logging.warning("Equation %s ends up using itself", nid)
+        return order + self.cyclic
+
+    def compile(self, nid):
+        """
+        Writes out equation nid as a single function. Each stat and equation
+        that it, or an equation it uses, always works out is worked out once
+        at the top and kept in a local variable
+        """
+        if nid in self.cyclic or self.evaluated[nid] is None:
+            self.fix(nid, self.sources[nid], self.replacement_dict)
+            return
+
+        hoisted = self.get_hoisted(nid)
+        # A stat that only comes up once can stay where it is
+        uses = Counter(token for n in [nid] + hoisted if n in self.sources for token in self.sources[n])
+        hoisted = [n for n in hoisted if n in self.sources or uses[n] > 1]
+        names = {}
+        lines = []
+        for n in hoisted:
+            if n in self.sources:
+                lines.append('    _%s = int(%s)' % (n, self.substitute(self.sources[n], names)))
+            else:
+                lines.append('    _%s = %s' % (n, self.replacement_dict[n]))
+            names[n] = '_%s' % n
+        lines.append('    return int(%s)' % self.substitute(self.sources[nid], names))
+        exec("def %s(equations, unit):\n%s" % (nid, '\n'.join(lines)), self.equations)
+
+    def get_hoisted(self, nid) -> list:
+        """
+        Returns the stats and equations to work out ahead of time for
+        equation nid: stats first, then each equation after the ones it uses
+        """
+        stats = set()
+        equations = []
+        seen = {nid}
+
+        def visit(n):
+            if n in seen or n in self.cyclic:
+                return
+            seen.add(n)
+            if n in self.sources:
+                for m in self.evaluated[n] or ():
+                    visit(m)
+                equations.append(n)
+            else:
+                stats.add(n)
+
+        for n in self.evaluated[nid]:
+            visit(n)
+        return sorted(stats) + equations
+
+    def substitute(self, tokens, names) -> str:
+        return ''.join(names.get(n) or self.replacement_dict.get(n, n) for n in tokens)
+
     def fix(self, lhs, rhs, dic):
         rhs = [dic.get(n, n) for n in rhs]
         rhs = ''.join(rhs)
@@ -44,13 +157,15 @@ class Parser():
 
     def get_expression(self, expr, unit):
         # For one time use
-        # Can't seem to be used with any sub equations
-        expr = self.tokenize(expr)
-        expr = [self.replacement_dict.get(n, n) for n in expr]
-        expr = ''.join(expr)
-        expr = 'int(%s)' % expr
-        equations = self.equations
-        return eval(expr)
+        # Compiled the first time, and kept by the expression
+        func = self.expressions.get(expr)
+        if not func:
+            tokens = self.tokenize(expr)
+            tokens = [self.replacement_dict.get(n, n) for n in tokens]
+            local = {}
+            exec("def expression(equations, unit): return int(%s)" % ''.join(tokens), globals(), local)
+            func = self.expressions[expr] = local['expression']
+        return func(self.equations, unit)
 
     def get_mana(self, unit):
         if hasattr(self, 'mana'):
@@ -1,4 +1,4 @@
-import random, re
+import functools, random, re
 
 from app.utilities import utils
 from app.data.database import DB
@@ -6,39 +6,58 @@ from app.data.database import DB
 import app.engine.config as cf
 from app.engine import engine, item_funcs, item_system, skill_system, combat_calcs, unit_funcs
 from app.engine.game_state import game
+from app.events import event_validators
 
 """
 Essentially just a repository that imports a lot of different things so that many different eval calls 
 will be accepted
 """
 
+def _check_pair(unit1, unit2, s1: str, s2: str) -> bool:
+    """
+    Determines whether two units are in combat with one another
+    """
+    if not unit1 or not unit2:
+        return False
+    return (unit1.nid == s1 and unit2.nid == s2) or (unit1.nid == s2 and unit2.nid == s1)
+
+def _check_default(unit1, unit2, s1: str, t1: tuple) -> bool:
+    """
+    Determines whether the default fight quote should be used
+    t1 contains the nids of units that have unique fight quotes
+    """
+    if not unit1 or not unit2:
+        return False
+    elif unit1.nid == s1 and unit2.team == 'player':
+        return unit2.nid not in t1
+    elif unit2.nid == s1 and unit1.team == 'player':
+        return unit1.nid not in t1
+    else:
+        return False
+
+# Names a condition can use, and which argument of evaluate they refer to
+local_args = {'unit': 0, 'unit1': 0, 'target': 1, 'unit2': 1, 'item': 2,
+              'position': 3, 'region': 4, 'mode': 5, 'skill': 6}
+local_helpers = {'check_pair': _check_pair, 'check_default': _check_default}
+
+@functools.lru_cache(maxsize=4096)
+def get_bindings(code) -> tuple:
+    """
+    Which locals a compiled condition actually refers to, so evaluate
+    only has to bind those
+    """
+    args = tuple((name, local_args[name]) for name in code.co_names if name in local_args)
+    helpers = tuple((name, local_helpers[name]) for name in code.co_names if name in local_helpers)
+    return args, helpers
+
 def evaluate(string: str, unit1=None, unit2=None, item=None, position=None, region=None, mode=None, skill=None) -> bool:
-    unit = unit1
-    target = unit2
-    
-    def check_pair(s1: str, s2: str) -> bool:
-        """
-        Determines whether two units are in combat with one another
-        """
-        if not unit1 or not unit2:
-            return False
-        return (unit1.nid == s1 and unit2.nid == s2) or (unit1.nid == s2 and unit2.nid == s1)
-
-    def check_default(s1: str, t1: tuple) -> bool:
-        """
-        Determines whether the default fight quote should be used
-        t1 contains the nids of units that have unique fight quotes
-        """
-        if not unit1 or not unit2:
-            return False
-        elif unit1.nid == s1 and unit2.team == 'player':
-            return unit2.nid not in t1
-        elif unit2.nid == s1 and unit1.team == 'player':
-            return unit1.nid not in t1
-        else:
-            return False
-
-    return eval(string)
+    code = event_validators.compile_condition(string)
+    args, helpers = get_bindings(code)
+    values = (unit1, unit2, item, position, region, mode, skill)
+    local_vars = {name: values[idx] for name, idx in args}
+    for name, helper in helpers:
+        local_vars[name] = functools.partial(helper, unit1, unit2)
+    return eval(code, globals(), local_vars)
 
 def eval_string(text: str) -> str:
     to_evaluate = re.findall(r'\{eval:[^{}]*\}', text)
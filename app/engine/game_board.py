@@ -1,3 +1,5 @@
+from array import array
+
 from app.data.database import DB
 
 from app.engine import target_system, line_of_sight
@@ -42,6 +44,12 @@ class GameBoard(object):
         self.height = tilemap.height
         self.mcost_grids = {}
 
+        # Line of sight for fog of war
+        # Key: (Position, Radius), Value: Indices of the tiles visible from that position
+        self.los_sources = {}
+        # Key: Team, Value: (Radius, Whether each tile is visible to that team)
+        self.los_vision = {}
+
         self.reset_grid(tilemap)
 
         # Keeps track of what team occupies which tile
@@ -50,10 +58,12 @@ class GameBoard(object):
         self.unit_grid = self.init_unit_grid()
 
         # Fog of War -- one for each team
+        # Each cell counts how many units of that team can see it
         self.fog_of_war_grids = {}
         for team in DB.teams:
-            self.fog_of_war_grids[team] = self.init_aura_grid()
+            self.fog_of_war_grids[team] = self.init_count_grid()
         self.fow_vantage_point = {}  # Unit: Position where the unit is that's looking
+        self.fow_vision = {}  # Unit: (Team, Indices of the tiles the unit can see)
 
         # For Auras
         self.aura_grid = self.init_aura_grid()
@@ -71,6 +81,8 @@ class GameBoard(object):
         for idx, mode in enumerate(DB.mcost.unit_types):
             self.mcost_grids[mode] = self.init_grid(mode, tilemap)
         self.opacity_grid = self.init_opacity_grid(tilemap)
+        self.los_sources.clear()
+        self.los_vision.clear()
 
     # For movement
     def init_grid(self, movement_group, tilemap):
@@ -127,20 +139,64 @@ class GameBoard(object):
         return None
 
     # Fog of war
+    def init_count_grid(self):
+        return array('H', bytes(2 * self.width * self.height))
+
     def update_fow(self, pos, unit, sight_range: int):
-        grid = self.fog_of_war_grids[unit.team]
-        # Remove the old vision
+        # Only the tiles that moved into or out of the unit's vision need to change
+        old_team, old_vision = self.fow_vision.pop(unit.nid, (None, ()))
+        new_vision = ()
         self.fow_vantage_point[unit.nid] = None
-        for cell in grid:
-            cell.discard(unit.nid)
-        # Add new vision
         if pos:
             self.fow_vantage_point[unit.nid] = pos
-            positions = target_system.find_manhattan_spheres(range(sight_range + 1), pos[0], pos[1])
-            positions = {pos for pos in positions if 0 <= pos[0] < self.width and 0 <= pos[1] < self.height}
-            for position in positions:
-                idx = position[0] * self.height + position[1]
-                grid[idx].add(unit.nid)
+            new_vision = target_system.get_sphere_indices(range(sight_range + 1), pos[0], pos[1], self.width, self.height)
+            self.fow_vision[unit.nid] = (unit.team, new_vision)
+
+        if old_team == unit.team:
+            old_vision, new_vision = set(old_vision), set(new_vision)
+            old_vision, new_vision = old_vision - new_vision, new_vision - old_vision
+        if old_team:
+            grid = self.fog_of_war_grids[old_team]
+            for idx in old_vision:
+                grid[idx] -= 1
+        grid = self.fog_of_war_grids[unit.team]
+        for idx in new_vision:
+            grid[idx] += 1
+
+    def reset_los_vision(self):
+        """
+        Called whenever a unit's position changes
+        """
+        self.los_vision.clear()
+
+    def get_los_source(self, pos, radius: int) -> list:
+        """
+        Returns the indices of every tile within radius of pos
+        that pos has line of sight to
+        """
+        visible = self.los_sources.get((pos, radius))
+        if visible is None:
+            visible = [pos[0] * self.height + pos[1]]
+            for x, y in target_system.find_manhattan_spheres(range(1, radius + 1), pos[0], pos[1]):
+                if 0 <= x < self.width and 0 <= y < self.height and line_of_sight.get_line(pos, (x, y)):
+                    visible.append(x * self.height + y)
+            self.los_sources[(pos, radius)] = visible
+        return visible
+
+    def get_los_vision(self, team: str, radius: int) -> bytearray:
+        """
+        Same as line_of_sight.simple_check for every tile at once
+        """
+        los_vision = self.los_vision.get(team)
+        if los_vision and los_vision[0] == radius:
+            return los_vision[1]
+        vision = bytearray(self.width * self.height)
+        for unit in game.units:
+            if unit.position and unit.team == team:
+                for idx in self.get_los_source(unit.position, radius):
+                    vision[idx] = 1
+        self.los_vision[team] = (radius, vision)
+        return vision
 
     def in_vision(self, pos, team='player') -> bool:
         if not game.level_vars.get('_fog_of_war'):
@@ -149,25 +205,15 @@ class GameBoard(object):
         if team == 'player':
             if DB.constants.value('fog_los'):
                 fog_of_war_radius = game.level_vars.get('_fog_of_war_radius', 0)
-                valid = line_of_sight.simple_check(pos, 'player', fog_of_war_radius)
-                if not valid:
+                if not self.get_los_vision('player', fog_of_war_radius)[idx]:
                     return False
-            player_grid = self.fog_of_war_grids['player']
-            if player_grid[idx]:
-                return True
-            other_grid = self.fog_of_war_grids['other']
-            if other_grid[idx]:
-                return True
+            return bool(self.fog_of_war_grids['player'][idx] or self.fog_of_war_grids['other'][idx])
         else:
             if DB.constants.value('fog_los'):
                 fog_of_war_radius = game.level_vars.get('_ai_fog_of_war_radius', game.level_vars.get('_fog_of_war_radius', 0))
-                valid = line_of_sight.simple_check(pos, team, fog_of_war_radius)
-                if not valid:
+                if not self.get_los_vision(team, fog_of_war_radius)[idx]:
                     return False
-            grid = self.fog_of_war_grids[team]
-            if grid[idx]:
-                return True
-        return False
+            return bool(self.fog_of_war_grids[team][idx])
 
     # Line of sight
     def init_opacity_grid(self, tilemap):
@@ -666,9 +666,11 @@ class GameState():
         # Set "test" to True when you are just testing what would happen by moving
         # to a position (generally used for AI)
         """
-        from app.engine import action, aura_funcs
+        from app.engine import action, aura_funcs, hook_cache
         if unit.position:
             logging.debug("Leave %s %s", unit.nid, unit.position)
+            self.board.reset_los_vision()
+            hook_cache.clear()
             # Auras
             for aura_data in game.board.get_auras(unit.position):
                 child_aura_uid, target = aura_data
@@ -706,6 +708,7 @@ class GameState():
             # Board
             if not test:
                 self.board.remove_unit(unit.position, unit)
+            hook_cache.clear()
 
     def arrive(self, unit, test=False):
         """
@@ -722,9 +725,11 @@ class GameState():
         # Set "test" to True when you are just testing what would happen by moving
         # to a position (generally used for AI)
         """
-        from app.engine import aura_funcs, skill_system
+        from app.engine import aura_funcs, hook_cache, skill_system
         if unit.position:
             logging.debug("Arrive %s %s", unit.nid, unit.position)
+            self.board.reset_los_vision()
+            hook_cache.clear()
             if not test:
                 self.board.set_unit(unit.position, unit)
             # Tiles
@@ -744,6 +749,7 @@ class GameState():
             # Boundary
             if not test:
                 self.boundary.arrive(unit)
+            hook_cache.clear()
 
     def add_terrain_status(self, unit, test):
         from app.engine import action, item_funcs
@@ -863,11 +869,8 @@ def load_level(level_nid, save_loc):
         game = GameState()
     else:
         game.clear()
-    import pickle
-
     from app.engine import save
-    with open(save_loc, 'rb') as fp:
-        s_dict = pickle.load(fp)
+    s_dict = save.read_save(save_loc)
     game.load_states(['turn_change'])
     game.build_new()
     game.load(s_dict)
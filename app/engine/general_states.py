@@ -12,7 +12,7 @@ from app.engine.game_state import game
 from app.engine import engine, action, menus, image_mods, \
     banner, save, phase, skill_system, target_system, item_system, \
     item_funcs, ui_view, info_menu, base_surf, gui, background, dialog, \
-    text_funcs, equations, evaluate, supports
+    text_funcs, equations, evaluate, supports, hook_cache, battle_animation
 from app.engine.combat import interaction
 from app.engine.selection_helper import SelectionHelper
 from app.engine.abilities import ABILITIES, PRIMARY_ABILITIES, OTHER_ABILITIES
@@ -1309,6 +1309,8 @@ class CombatTargetingState(MapState):
             game.highlight.display_possible_attacks(valid_attacks, light=True)
             game.highlight.display_possible_attacks(splash_positions)
             game.highlight.display_possible_attacks({game.cursor.position})
+        # So the fight can start right away if this target is chosen
+        interaction.prefetch_animation(self.cur_unit, self.item, game.cursor.position)
 
     def _engage_combat(self):
         if self.parent_item:  # For sequence item
@@ -1436,6 +1438,9 @@ class CombatTargetingState(MapState):
         game.highlight.remove_highlights()
         game.ui_view.reset_info()
 
+    def finish(self):
+        battle_animation.cancel_prefetch()
+
 class ItemTargetingState(MapState):
     name = 'item_targeting'
 
@@ -1714,6 +1719,8 @@ class AIState(MapState):
                 self.cur_unit = None
         else:
             logging.info("AI Phase complete")
+            hook_cache.log_counts()
+            hook_cache.reset_counts()
             game.ai.end_skip()
             game.ai.reset()
             self.cur_unit = None
@@ -0,0 +1,66 @@
+import logging
+from collections import Counter
+
+# Memoizes the results of the item_system and skill_system hooks listed in
+# component_system_compiler while enabled. Off by default -- the AI turns
+# it on while it thinks if the ai_hook_cache constant is set, since it asks
+# the same questions about the same units over and over each phase.
+# Anything that changes a unit's skills, items, stats, equipped weapon or
+# position must call clear(). Every action does, through action.do,
+# execute and reverse, and so do game.leave, game.arrive (even when
+# only testing a move), every step of a MovementManager or roam move,
+# UnitObject.equip, the skill_system combat hooks (which turn combat
+# conditions on and off) and phase changes.
+enabled = False
+_cache = {}
+# Goes up on every clear(), whether or not the cache is enabled, so
+# caches that are always on (like UnitObject's stat bonus snapshot)
+# can tell when to recompute
+generation = 0
+
+hits = Counter()
+misses = Counter()
+
+def enable():
+    global enabled
+    _cache.clear()
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+    _cache.clear()
+
+def clear():
+    global generation
+    generation += 1
+    if _cache:
+        _cache.clear()
+
+_missing = object()
+
+def call(name: str, func, *args):
+    key = (name, args)
+    val = _cache.get(key, _missing)
+    if val is _missing:
+        misses[name] += 1
+        val = _cache[key] = func(*args)
+    else:
+        hits[name] += 1
+    return val
+
+def get_counts() -> list:
+    """
+    Returns (name, hits, misses) for every hook that has been cached,
+    most hits first
+    """
+    names = set(hits) | set(misses)
+    return sorted(((name, hits[name], misses[name]) for name in names), key=lambda x: (-x[1], x[0]))
+
+def reset_counts():
+    hits.clear()
+    misses.clear()
+
+def log_counts():
+    for name, num_hits, num_misses in get_counts():
+        logging.debug("Hook cache %s: %d hits, %d misses", name, num_hits, num_misses)
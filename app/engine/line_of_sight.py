@@ -1,14 +1,27 @@
 from app.utilities import utils
-from enum import IntEnum
 
 from app.engine.game_state import game
 
-class Visibility(IntEnum):
-    Unknown = 0
-    Dark = 1
-    Lit = 2
+# Key: (start, end), Value: whether end can be seen from start
+# Only valid for the opacity grid it was traced on
+_line_cache = {}
+_line_cache_opacity = None
+MAX_CACHED_LINES = 2**18
 
 def get_line(start: tuple, end: tuple) -> bool:
+    global _line_cache_opacity
+    opacity_grid = game.board.opacity_grid
+    # GameBoard.reset_grid always makes a new opacity grid
+    if opacity_grid is not _line_cache_opacity or len(_line_cache) > MAX_CACHED_LINES:
+        _line_cache.clear()
+        _line_cache_opacity = opacity_grid
+    key = (start, end)
+    visible = _line_cache.get(key)
+    if visible is None:
+        visible = _line_cache[key] = trace_line(start, end)
+    return visible
+
+def trace_line(start: tuple, end: tuple) -> bool:
     if start == end:
         return True
     x1, y1 = start
@@ -79,24 +92,17 @@ def get_line(start: tuple, end: tuple) -> bool:
     return True
 
 def line_of_sight(source_pos: list, dest_pos: list, max_range: int) -> list:
-    all_tiles = {}
+    sources = set(source_pos)
+    lit_tiles = []
     for pos in dest_pos:
-        if pos in source_pos:
-            all_tiles[pos] = Visibility.Lit
-        else:
-            all_tiles[pos] = Visibility.Unknown
-
-    # Iterate over remaining tiles
-    for pos, vis in all_tiles.items():
-        if vis == Visibility.Unknown:
-            for s_pos in source_pos:
-                if utils.calculate_distance(pos, s_pos) <= max_range and get_line(s_pos, pos):
-                    all_tiles[pos] = Visibility.Lit
-                    break
-            else:
-                all_tiles[pos] = Visibility.Dark
-
-    lit_tiles = [pos for pos in dest_pos if all_tiles[pos] != Visibility.Dark]
+        if pos in sources:
+            lit_tiles.append(pos)
+            continue
+        x, y = pos
+        for s_pos in sources:
+            if abs(s_pos[0] - x) + abs(s_pos[1] - y) <= max_range and get_line(s_pos, pos):
+                lit_tiles.append(pos)
+                break
     return lit_tiles
 
 def simple_check(dest_pos: tuple, team: str, max_range: int) -> bool:
@@ -2,6 +2,7 @@ from app.constants import TILEWIDTH, TILEHEIGHT, WINWIDTH, WINHEIGHT
 
 from app.engine import engine
 from app.engine.game_state import game
+from app.engine.unit_sprite import TINT_CACHE
 
 class MapView():
     def __init__(self):
@@ -10,6 +11,7 @@ class MapView():
     def draw_units(self, surf, cull_rect, subsurface_rect=None):
         # Surf is always 240x160 WxH
         unit_surf = engine.copy_surface(self._unit_surf)
+        TINT_CACHE.start_frame()
 
         # Update all units except the cur unit
         update_units = [unit for unit in game.units if (unit.position or unit.sprite.fake_position)]
@@ -61,8 +63,8 @@ class MapView():
 
         map_image = game.tilemap.get_full_image(cull_rect)
 
-        surf = engine.copy_surface(map_image)
-        surf = surf.convert_alpha()
+        # convert_alpha makes a copy, so the tilemap's image isn't drawn on
+        surf = map_image.convert_alpha()
 
         surf = game.boundary.draw(surf, full_size, cull_rect)
         surf = game.boundary.draw_fog_of_war(surf, full_size, cull_rect)
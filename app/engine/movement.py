@@ -2,7 +2,7 @@ import logging
 
 import app.engine.config as cf
 from app.data.database import DB
-from app.engine import action, engine, equations, skill_system
+from app.engine import action, engine, equations, hook_cache, skill_system
 from app.engine.game_state import game
 from app.engine.sound import SOUNDTHREAD
 from app.utilities import utils
@@ -155,6 +155,9 @@ class MovementManager():
                         mcost = self.get_mcost(unit, new_position)
                         unit.movement_left -= mcost
                     unit.position = new_position
+                    # Bonuses that depend on where units are can change with every step
+                    hook_cache.clear()
+                    game.board.reset_los_vision()
                     # Handle camera following moving unit
                     # if not data.event:
                     if data.follow and not self.camera_follow:
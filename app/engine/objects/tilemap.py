@@ -1,3 +1,4 @@
+from collections import Counter
 from app.utilities.typing import NID
 from typing import List
 from app.constants import TILEWIDTH, TILEHEIGHT, AUTOTILE_FRAMES, COLORKEY
@@ -7,6 +8,23 @@ from app.resources.resources import RESOURCES
 
 from app.engine import engine, image_mods, particles
 
+# How get_full_image has drawn the map, so it can be compared against
+# building a new surface and compositing every layer every frame
+draw_counts = Counter()
+
+def get_draw_counts() -> dict:
+    """
+    frames: calls to get_full_image
+    rebuilt, scrolled, reused: how many of those recomposited the whole
+        image, only the strips the camera scrolled into view, or nothing
+    surfaces: new surfaces created (previously one every frame)
+    pixels: pixels composited (previously the whole image every frame)
+    """
+    return {name: draw_counts[name] for name in ('frames', 'rebuilt', 'scrolled', 'reused', 'surfaces', 'pixels')}
+
+def reset_draw_counts():
+    draw_counts.clear()
+
 class LayerObject():
     transition_speed = 333
 
@@ -58,9 +76,11 @@ class LayerObject():
 
     def quick_show(self):
         self.visible = True
+        self.parent.reset()
 
     def quick_hide(self):
         self.visible = False
+        self.parent.reset()
 
     def show(self):
         """
@@ -119,6 +139,9 @@ class TileMapObject(Prefab):
         self.width: int = 0
         self.height: int = 0
         self.nid: NID = None
+        # Composited images by autotile frame, each [image, cull rect it shows]
+        self._buffers = {}
+        self._layers_key = None
 
     @classmethod
     def from_prefab(cls, prefab):
@@ -210,26 +233,85 @@ class TileMapObject(Prefab):
         return None
 
     def get_full_image(self, cull_rect):
-        image = engine.create_surface((cull_rect[2], cull_rect[3]))
-        engine.set_colorkey(image, COLORKEY)
+        """
+        The layers composited together for the part of the map in cull_rect.
+        The image is kept for next time, one for each autotile frame, and
+        only recomposited where it has to be: all of it when a layer is
+        shown, hidden or fading, and only the newly exposed strips when the
+        camera scrolls. So don't draw on it -- copy it first.
+        """
+        draw_counts['frames'] += 1
+        layers_key = tuple((layer.visible, layer.state, layer.translucence if layer.state else None)
+                           for layer in self.layers)
+        if layers_key != self._layers_key:
+            # Every image has to be recomposited, but the surfaces can be drawn over
+            for buffer in self._buffers.values():
+                buffer[1] = None
+            self._layers_key = layers_key
+        autotile_key = tuple(layer.autotile_frame for layer in self.layers if layer.autotile_images)
+        x, y, width, height = cull_rect
+        buffer = self._buffers.get(autotile_key)
+
+        if not buffer or buffer[0].get_size() != (width, height):
+            image = engine.create_surface((width, height))
+            engine.set_colorkey(image, COLORKEY)
+            draw_counts['surfaces'] += 1
+            buffer = self._buffers[autotile_key] = [image, None]
+        image, last_rect = buffer
+        if last_rect == tuple(cull_rect):
+            draw_counts['reused'] += 1
+            return image
+        buffer[1] = tuple(cull_rect)
+
+        dx, dy = (x - last_rect[0], y - last_rect[1]) if last_rect else (width, height)
+        if abs(dx) < width and abs(dy) < height and self._in_bounds(cull_rect) and self._in_bounds(last_rect):
+            draw_counts['scrolled'] += 1
+            image.scroll(-dx, -dy)
+            if dx:
+                self._composite(image, cull_rect, (width - dx if dx > 0 else 0, 0, abs(dx), height))
+            if dy:
+                self._composite(image, cull_rect, (0, height - dy if dy > 0 else 0, width, abs(dy)))
+        else:
+            draw_counts['rebuilt'] += 1
+            self._composite(image, cull_rect, (0, 0, width, height))
+        return image
+
+    def _in_bounds(self, cull_rect) -> bool:
+        """
+        Whether all of cull_rect is on the map, so it can be drawn a strip at a time
+        """
+        return cull_rect[0] >= 0 and cull_rect[1] >= 0 and \
+            cull_rect[0] + cull_rect[2] <= self.width * TILEWIDTH and \
+            cull_rect[1] + cull_rect[3] <= self.height * TILEHEIGHT
+
+    def _composite(self, image, cull_rect, area):
+        """
+        Redraws area of the image (in its own coordinates) from the layers
+        """
+        draw_counts['pixels'] += area[2] * area[3]
+        rect = (cull_rect[0] + area[0], cull_rect[1] + area[1], area[2], area[3])
+        pos = (area[0], area[1])
+        image.fill((0, 0, 0), area)
         for layer in self.layers:
             if (layer.visible or layer.state == 'fade_out') and \
-                    layer.should_draw(cull_rect):
-                main_image = layer.get_image(cull_rect)
-                image.blit(main_image, (0, 0))
-                autotile_image = layer.get_autotile_image(cull_rect)
+                    layer.should_draw(rect):
+                main_image = layer.get_image(rect)
+                image.blit(main_image, pos)
+                autotile_image = layer.get_autotile_image(rect)
                 if autotile_image:
-                    image.blit(autotile_image, (0, 0))
-        return image
+                    image.blit(autotile_image, pos)
 
     def update(self):
+        # get_full_image notices fades and autotile frames changing by itself
         for layer in self.layers:
-            in_state = layer.update()
-            if in_state:
-                self.reset()
+            layer.update()
 
     def reset(self):
-        pass
+        """
+        Throws out the composited images, for when a layer changes
+        """
+        self._buffers.clear()
+        self._layers_key = None
 
     def save(self):
         s_dict = {}
@@ -3,8 +3,8 @@ from typing import Tuple
 from app.data.database import DB
 from app.data.difficulty_modes import GrowthOption
 from app.data.units import UnitPrefab
-from app.engine import (action, combat_calcs, equations, item_funcs,
-                        item_system, skill_system, unit_funcs)
+from app.engine import (action, combat_calcs, equations, hook_cache,
+                        item_funcs, item_system, skill_system, unit_funcs)
 from app.engine.game_state import game
 from app.utilities import utils
 from app.utilities.data import Prefab
@@ -25,6 +25,9 @@ class UnitObject(Prefab):
         self.generic: bool = None
         self.ai = None
         self.ai_group = None
+        # Bonus to each stat from skills, as of hook_cache.generation
+        self._stat_bonuses: dict = {}
+        self._stat_bonuses_generation: int = -1
 
     @classmethod
     def from_prefab(cls, prefab: UnitPrefab):
@@ -217,13 +220,16 @@ class UnitObject(Prefab):
         self.exp = int(utils.clamp(val, 0, 100))
 
     def stat_bonus(self, stat_nid):
-        return skill_system.stat_change(self, stat_nid)
+        if self._stat_bonuses_generation != hook_cache.generation:
+            self._stat_bonuses = skill_system.stat_changes(self)
+            self._stat_bonuses_generation = hook_cache.generation
+        return self._stat_bonuses.get(stat_nid, 0)
 
     def growth_bonus(self, stat_nid):
         return skill_system.growth_change(self, stat_nid)
 
     def get_stat(self, stat_nid):
-        return self.stats.get(stat_nid, 0) + skill_system.stat_change(self, stat_nid)
+        return self.stats.get(stat_nid, 0) + self.stat_bonus(stat_nid)
 
     def get_stat_cap(self, stat_nid):
         return DB.classes.get(self.klass).max_stats.get(stat_nid, 30)
@@ -340,6 +346,7 @@ class UnitObject(Prefab):
                 self.equipped_weapon = item
             item_system.on_equip_item(self, item)
             skill_system.on_equip_item(self, item)
+            hook_cache.clear()
 
     def unequip(self, item):
         if item_system.is_accessory(self, item):
@@ -348,6 +355,7 @@ class UnitObject(Prefab):
             self.equipped_weapon = None
         skill_system.on_unequip_item(self, item)
         item_system.on_unequip_item(self, item)
+        hook_cache.clear()
 
     def add_item(self, item):
         index = len(self.items)
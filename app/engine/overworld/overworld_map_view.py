@@ -64,8 +64,8 @@ class OverworldMapView():
 
         # cut out our base
         map_image = self.overworld.tilemap.get_full_image(cull_rect)
-        surf = engine.copy_surface(map_image)
-        surf = surf.convert_alpha()
+        # convert_alpha makes a copy, so the tilemap's image isn't drawn on
+        surf = map_image.convert_alpha()
 
         # draw the map objects: roads, nodes, and entities
         self.draw_roads(surf, full_size, cull_rect)
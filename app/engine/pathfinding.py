@@ -1,29 +1,93 @@
 import heapq
+from array import array
 
 from app.utilities import utils
 
+class SearchBuffer():
+    """
+    Flat scratch space for a single search over a grid of a given size.
+    Instead of resetting every Node before each search, every search
+    bumps the generation. A tile's entries in g and parent are only
+    valid if its seen stamp matches the current generation.
+    """
+    __slots__ = ['size', 'generation', 'g', 'parent', 'seen', 'closed', 'neighbors']
+
+    def __init__(self, size: int):
+        self.size = size
+        self.g = array('d', bytes(8 * size))
+        self.parent = array('l', [-1]) * size
+        self.seen = array('L', [0]) * size
+        self.closed = array('L', [0]) * size
+        self.generation = 0
+        self.neighbors = {}  # Key: (width, height), Value: adjacent indices of each tile
+
+    def get_neighbors(self, width: int, height: int) -> list:
+        neighbors = self.neighbors.get((width, height))
+        if neighbors is None:
+            neighbors = []
+            for x in range(width):
+                for y in range(height):
+                    idx = x * height + y
+                    # Always in the order: down, right, left, up
+                    adj = []
+                    if y < height - 1:
+                        adj.append(idx + 1)
+                    if x < width - 1:
+                        adj.append(idx + height)
+                    if x > 0:
+                        adj.append(idx - height)
+                    if y > 0:
+                        adj.append(idx - 1)
+                    neighbors.append(tuple(adj))
+            self.neighbors[(width, height)] = neighbors
+        return neighbors
+
+    def next_generation(self) -> int:
+        self.generation += 1
+        if self.generation >= 0xFFFFFFFF:  # Wrap around before the stamps overflow
+            self.seen = array('L', [0]) * self.size
+            self.closed = array('L', [0]) * self.size
+            self.generation = 1
+        return self.generation
+
+# Key: Number of tiles in grid, Value: SearchBuffer
+_buffers = {}
+
+def get_search_buffer(size: int) -> SearchBuffer:
+    buf = _buffers.get(size)
+    if not buf:
+        buf = _buffers[size] = SearchBuffer(size)
+    return buf
+
+def get_heuristic(pos: tuple, start_pos: tuple, goal_pos: tuple) -> float:
+    """
+    h is the approximate distance between pos and the goal
+    """
+    # Get main heuristic
+    dx1 = pos[0] - goal_pos[0]
+    dy1 = pos[1] - goal_pos[1]
+    h = abs(dx1) + abs(dy1)
+    # Are we going in direction of goal?
+    # Slight nudge in direction that lies along path from start to end
+    dx2 = start_pos[0] - goal_pos[0]
+    dy2 = start_pos[1] - goal_pos[1]
+    cross = abs(dx1 * dy2 - dx2 * dy1)
+    return h + cross * .001
+
 class Djikstra():
-    __slots__ = ['open', 'closed', 'cells', 'width', 'height', 'start_pos', 
+    __slots__ = ['cells', 'width', 'height', 'start_pos',
                  'start_cell', 'unit_team', 'pass_through', 'ai_fog_of_war']
 
-    def __init__(self, start_pos: tuple, grid: list, width: int, height: int, 
+    def __init__(self, start_pos: tuple, grid: list, width: int, height: int,
                  unit_team: str, pass_through: bool, ai_fog_of_war: bool):
-        self.open = []
-        heapq.heapify(self.open)
-        self.closed = set()
         self.cells = grid # Must keep order
         self.width, self.height = width, height
-        self.reset_grid()
         self.start_pos = start_pos
         self.start_cell = self.get_cell(start_pos[0], start_pos[1])
         self.unit_team = unit_team
         self.pass_through = pass_through
         self.ai_fog_of_war = ai_fog_of_war
 
-    def reset_grid(self):
-        for cell in self.cells:
-            cell.reset()
-
     def get_cell(self, x, y):
         return self.cells[x * self.height + y]
 
@@ -42,11 +106,6 @@ class Djikstra():
             cells.append(self.get_cell(cell.x, cell.y - 1))
         return cells
 
-    def update_cell(self, adj, cell):
-        # g is true distance between this cell and starting position
-        adj.g = cell.g + adj.cost
-        adj.parent = cell
-
     def _can_move_through(self, game_board, adj) -> bool:
         if self.pass_through:
             return True
@@ -59,39 +118,103 @@ class Djikstra():
         return False
 
     def process(self, game_board: list, movement_left: int) -> set:
-        # add starting cell to open heap queue
-        heapq.heappush(self.open, (self.start_cell.g, self.start_cell))
-        while self.open:
+        cells = self.cells
+        width, height = self.width, self.height
+        buf = get_search_buffer(len(cells))
+        gen = buf.next_generation()
+        g_buf, parent, seen, closed = buf.g, buf.parent, buf.seen, buf.closed
+        neighbors = buf.get_neighbors(width, height)
+        team_grid = game_board.team_grid
+        visited = []  # Every closed cell, in order
+
+        start_idx = self.start_cell.x * height + self.start_cell.y
+        g_buf[start_idx] = 0
+        parent[start_idx] = -1
+        seen[start_idx] = gen
+        # Heap entries are (g, Node) so ties break exactly as they always have
+        open_heap = [(0, self.start_cell)]
+        heappush, heappop = heapq.heappush, heapq.heappop
+        while open_heap:
             # pop cell from heap queue
-            g, cell = heapq.heappop(self.open)
-            # If we've traveled too far -- always g ordered, so leaving at the 
+            g, cell = heappop(open_heap)
+            # If we've traveled too far -- always g ordered, so leaving at the
             # first sign of trouble will always work
             if g > movement_left:
-                return {(cell.x, cell.y) for cell in self.closed}
+                break
+            x, y = cell.x, cell.y
+            idx = x * height + y
+            # Stale entry -- a better path to this cell was already processed
+            if closed[idx] == gen:
+                continue
             # add cell to closed set so we don't process it twice
-            self.closed.add(cell)
-            # get adjacent cells for cell
-            adj_cells = self.get_adjacent_cells(cell)
-            for adj in adj_cells:
-                if adj.reachable and adj not in self.closed:
-                    if self._can_move_through(game_board, adj):
-                        if (adj.g, adj) in self.open:
-                            # if adj cell in open list, check if current path
-                            # is better than the one previously found for this adj cell
-                            if adj.g > cell.g + adj.cost:
-                                self.update_cell(adj, cell)
-                                heapq.heappush(self.open, (adj.g, adj))
-                        else:
-                            self.update_cell(adj, cell)
-                            heapq.heappush(self.open, (adj.g, adj))
+            closed[idx] = gen
+            visited.append((x, y))
+            cell_g = g_buf[idx]
+            for adj_idx in neighbors[idx]:
+                if closed[adj_idx] == gen:
+                    continue
+                adj = cells[adj_idx]
+                if adj.reachable:
+                    # Empty tiles can always be moved through
+                    if not team_grid[adj_idx] or self._can_move_through(game_board, adj):
+                        new_g = cell_g + adj.cost
+                        # Only push if not yet in the open set,
+                        # or if this path is better than the one previously found
+                        if seen[adj_idx] != gen or g_buf[adj_idx] > new_g:
+                            seen[adj_idx] = gen
+                            g_buf[adj_idx] = new_g
+                            parent[adj_idx] = idx
+                            heappush(open_heap, (new_g, adj))
                     else:  # Unit is in the way
                         pass
-        # Sometimes gets here if unit is enclosed
-        return {(cell.x, cell.y) for cell in self.closed}
+        # Also gets here if unit is enclosed
+        return set(visited)
+
+    def get_distance_field(self, game_board, max_distance: float) -> 'DistanceField':
+        """
+        Same search as process, but keeps the cost of reaching every tile
+        within max_distance and the tile it was reached from, so paths to
+        any number of goals can be looked up from the one search.
+        Like AStar, allies can be moved through
+        """
+        cells = self.cells
+        height = self.height
+        neighbors = get_search_buffer(len(cells)).get_neighbors(self.width, height)
+        team_grid = game_board.team_grid
+        # Only tiles that were reached are kept, so a short search
+        # on a large map stays small
+        dist = {}
+        parent = {}
+
+        start_idx = self.start_cell.x * height + self.start_cell.y
+        dist[start_idx] = 0
+        parent[start_idx] = -1
+        closed = set()
+        open_heap = [(0, start_idx)]
+        heappush, heappop = heapq.heappush, heapq.heappop
+        while open_heap:
+            g, idx = heappop(open_heap)
+            # Stale entry -- a better path to this tile was already processed
+            if idx in closed:
+                continue
+            closed.add(idx)
+            for adj_idx in neighbors[idx]:
+                if adj_idx in closed:
+                    continue
+                adj = cells[adj_idx]
+                if adj.reachable:
+                    if not team_grid[adj_idx] or self._can_move_through(game_board, adj):
+                        new_g = g + adj.cost
+                        # Tiles past max_distance are never pushed, so the search ends on its own
+                        if new_g <= max_distance and dist.get(adj_idx, new_g + 1) > new_g:
+                            dist[adj_idx] = new_g
+                            parent[adj_idx] = idx
+                            heappush(open_heap, (new_g, adj_idx))
+        return DistanceField(self.width, height, self.start_pos, dist, parent)
 
 class AStar():
-    def __init__(self, start_pos: tuple, goal_pos: tuple, grid: list, 
-                 width: int, height: int, unit_team: str, 
+    def __init__(self, start_pos: tuple, goal_pos: tuple, grid: list,
+                 width: int, height: int, unit_team: str,
                  pass_through: bool = False, ai_fog_of_war: bool = False):
         self.cells = grid
         self.width = width
@@ -107,38 +230,24 @@ class AStar():
         self.pass_through = pass_through
         self.ai_fog_of_war = ai_fog_of_war
 
-        self.reset()
-
-    def reset_grid(self):
-        for cell in self.cells:
-            cell.reset()
-
     def reset(self):
-        self.open = []
-        heapq.heapify(self.open)
-        self.closed = set()
-        self.reset_grid()
+        """
+        Kept for compatibility -- every call to process already
+        starts from a clean search buffer
+        """
+        pass
 
     def set_goal_pos(self, goal_pos):
         self.goal_pos = goal_pos
         self.end_cell = self.get_cell(goal_pos[0], goal_pos[1])
-        self.adj_end = self.get_adjacent_cells(self.end_cell) 
+        self.adj_end = self.get_adjacent_cells(self.end_cell)
 
     def get_heuristic(self, cell) -> float:
         """
         Compute the heuristic for this cell
         h is the approximate distance between this cell and the goal cell
         """
-        # Get main heuristic
-        dx1 = cell.x - self.end_cell.x
-        dy1 = cell.y - self.end_cell.y
-        h = abs(dx1) + abs(dy1)
-        # Are we going in direction of goal?
-        # Slight nudge in direction that lies along path from start to end
-        dx2 = self.start_cell.x - self.end_cell.x
-        dy2 = self.start_cell.y - self.end_cell.y
-        cross = abs(dx1 * dy2 - dx2 * dy1)
-        return h + cross * .001
+        return get_heuristic((cell.x, cell.y), self.start_pos, self.goal_pos)
 
     def get_cell(self, x, y):
         return self.cells[x * self.height + y]
@@ -155,20 +264,12 @@ class AStar():
             cells.append(self.get_cell(cell.x, cell.y - 1))
         return cells
 
-    def update_cell(self, adj, cell):
-        # h is approximate distance between this cell and the goal
-        # g is true distance between this cell and the starting position
-        # f is simply them added together
-        adj.g = cell.g + adj.cost
-        adj.h = self.get_heuristic(adj)
-        adj.parent = cell
-        adj.f = adj.h + adj.g
-
-    def return_path(self, cell) -> list:
+    def return_path(self, idx: int, parent) -> list:
+        height = self.height
         path = []
-        while cell:
-            path.append((cell.x, cell.y))
-            cell = cell.parent
+        while idx >= 0:
+            path.append(divmod(idx, height))
+            idx = parent[idx]
         return path
 
     def _can_move_through(self, game_board, adj, ally_block) -> bool:
@@ -184,37 +285,122 @@ class AStar():
                 return True
         return False
 
-    def process(self, game_board, adj_good_enough: bool = False, 
+    def process(self, game_board, adj_good_enough: bool = False,
                 ally_block: bool = False, limit: int = None) -> list:
-        # Add starting cell to open queue
-        heapq.heappush(self.open, (self.start_cell.f, self.start_cell))
-        while self.open:
-            f, cell = heapq.heappop(self.open)
+        cells = self.cells
+        width, height = self.width, self.height
+        buf = get_search_buffer(len(cells))
+        gen = buf.next_generation()
+        g_buf, parent, seen, closed = buf.g, buf.parent, buf.seen, buf.closed
+        neighbors = buf.get_neighbors(width, height)
+        team_grid = game_board.team_grid
+        end_cell = self.end_cell
+        adj_end = self.adj_end if adj_good_enough else ()
+        # Anything with a larger f than this is past the limit
+        # limit + 1 to account for diagonal heuristic
+        max_f = limit + 1 if limit is not None else None
+
+        start_idx = self.start_cell.x * height + self.start_cell.y
+        g_buf[start_idx] = 0
+        parent[start_idx] = -1
+        seen[start_idx] = gen
+        # Heap entries are (f, Node) so ties break exactly as they always have
+        open_heap = [(0, self.start_cell)]
+        heappush, heappop = heapq.heappush, heapq.heappop
+        get_heuristic = self.get_heuristic
+        while open_heap:
+            f, cell = heappop(open_heap)
+            idx = cell.x * height + cell.y
             # Make sure we don't process the cell twice
-            self.closed.add(cell)
+            if closed[idx] == gen:
+                continue
+            closed[idx] = gen
             # If this cell is past the limit, just return None
             # Uses f, not g, because g will cut off if first greedy path fails
             # f only cuts off if all cells are bad
-            if limit is not None and cell.f > limit + 1:
-                # limit + 1 to account for diagonal heuristic
+            if max_f is not None and f > max_f:
                 return []
             # if ending cell, display found path
-            if cell is self.end_cell or (adj_good_enough and cell in self.adj_end):
-                return self.return_path(cell)
-            # get adjacent cells for cell
-            adj_cells = self.get_adjacent_cells(cell)
-            for adj in adj_cells:
-                if adj.reachable and adj not in self.closed:
-                    if self._can_move_through(game_board, adj, ally_block):
-                        if (adj.f, adj) in self.open:
-                            # if adj cell in open list, check if current path
-                            # is better than the one previously found for this adj cell
-                            if adj.g > cell.g + adj.cost:
-                                self.update_cell(adj, cell)
-                                heapq.heappush(self.open, (adj.f, adj))
-                        else:
-                            self.update_cell(adj, cell)
-                            heapq.heappush(self.open, (adj.f, adj))
+            if cell is end_cell or cell in adj_end:
+                return self.return_path(idx, parent)
+            cell_g = g_buf[idx]
+            for adj_idx in neighbors[idx]:
+                if closed[adj_idx] == gen:
+                    continue
+                adj = cells[adj_idx]
+                if adj.reachable:
+                    if not team_grid[adj_idx] or self._can_move_through(game_board, adj, ally_block):
+                        new_g = cell_g + adj.cost
+                        # Only push if not yet in the open set,
+                        # or if this path is better than the one previously found
+                        if seen[adj_idx] != gen or g_buf[adj_idx] > new_g:
+                            # h is approximate distance between this cell and the goal
+                            # g is true distance between this cell and the starting position
+                            # f is simply them added together
+                            seen[adj_idx] = gen
+                            g_buf[adj_idx] = new_g
+                            parent[adj_idx] = idx
+                            heappush(open_heap, (get_heuristic(adj) + new_g, adj))
                     else:  # Is blocked
                         pass
         return []
+
+class DistanceField():
+    """
+    Result of Djikstra.get_distance_field. Holds the movement cost from the
+    start to every tile reached and the tile it was reached from
+    """
+    __slots__ = ['width', 'height', 'start_pos', 'dist', 'parent']
+
+    def __init__(self, width: int, height: int, start_pos: tuple, dist: dict, parent: dict):
+        self.width, self.height = width, height
+        self.start_pos = start_pos
+        self.dist = dist
+        self.parent = parent
+
+    def get_distance(self, pos: tuple) -> float:
+        """
+        Returns None if pos was not reached
+        """
+        return self.dist.get(pos[0] * self.height + pos[1])
+
+    def get_path(self, pos: tuple) -> list:
+        """
+        Returns the path from the start to pos,
+        in the same order as AStar (pos first, start last)
+        """
+        idx = pos[0] * self.height + pos[1]
+        if idx not in self.dist:
+            return []
+        path = []
+        while idx >= 0:
+            path.append(divmod(idx, self.height))
+            idx = self.parent[idx]
+        return path
+
+    def get_path_to(self, goal_pos: tuple, adj_good_enough: bool = False, limit: int = None) -> list:
+        """
+        Returns a path as short as the one AStar would find from the start
+        to goal_pos (or next to it, if adj_good_enough), or [] if AStar
+        would find none within the limit. The search must have reached
+        at least limit + 1 for the limit to be kept exactly
+        """
+        x, y = goal_pos
+        ends = [goal_pos]
+        if adj_good_enough:
+            ends += [(a, b) for (a, b) in ((x, y - 1), (x - 1, y), (x + 1, y), (x, y + 1))
+                     if 0 <= a < self.width and 0 <= b < self.height]
+        # Same cutoff as AStar's limit -- the distance travelled
+        # plus the heuristic for where the path ends up
+        max_f = limit + 1 if limit is not None else None
+        best_end, best_f = None, None
+        for end in ends:
+            g = self.get_distance(end)
+            if g is None:
+                continue
+            f = g + get_heuristic(end, self.start_pos, goal_pos)
+            if (max_f is None or f <= max_f) and (best_f is None or (g, f) < best_f):
+                best_end, best_f = end, (g, f)
+        if best_end is None:
+            return []
+        return self.get_path(best_end)
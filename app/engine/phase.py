@@ -8,7 +8,7 @@ from app.utilities import utils
 
 from app.engine.sound import SOUNDTHREAD
 from app.engine import config as cf
-from app.engine import engine, image_mods
+from app.engine import engine, hook_cache, image_mods
 from app.engine.game_state import game
 
 import logging
@@ -90,6 +90,8 @@ class PhaseController():
                     self._next()
         else:
             self.current = 0
+        # Skill conditions can depend on the phase
+        hook_cache.clear()
 
     def slide_in(self):
         self.phase_in[self.current].begin()
@@ -3,7 +3,7 @@ from app.utilities import utils
 from app.engine.sound import SOUNDTHREAD
 from app.engine.state import MapState
 from app.engine.game_state import game
-from app.engine import engine, info_menu, evaluate, target_system, action
+from app.engine import engine, info_menu, evaluate, target_system, action, hook_cache
 
 import logging
 
@@ -114,6 +114,8 @@ class FreeRoamState(MapState):
     def move(self, dx, dy):
         x, y = self.roam_unit.position
         self.roam_unit.position = x + dx, y + dy
+        hook_cache.clear()
+        game.board.reset_los_vision()
         self.roam_unit.sound.play()
         rounded_pos = int(self.roam_unit.position[0]), int(self.roam_unit.position[1])
         game.cursor.set_pos(rounded_pos)
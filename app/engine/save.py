@@ -1,4 +1,4 @@
-import os, shutil, glob, re
+import os, shutil, glob, re, hashlib
 from datetime import datetime
 import threading
 
@@ -21,6 +21,13 @@ SAVE_THREAD = None
 GAME_NID = str(DB.constants.value('game_nid'))
 SUSPEND_LOC = 'saves/' + GAME_NID + '-suspend.pmeta'
 
+# The biggest parts of a save are kept in chunks, named after a hash of
+# their contents, so saves that share a part share the file. The save file
+# itself lists its chunks and holds everything else, which is small and
+# changes every time anyway
+CHUNK_DIR = 'saves/chunks/'
+CHUNK_KEYS = ('units', 'items', 'skills', 'regions', 'level')
+
 class SaveSlot():
     no_name = '--NO DATA--'
 
@@ -66,6 +73,65 @@ def dict_print(d):
         else:
             print("{0} : {1}".format(k, v))
 
+def write_chunks(s_dict) -> dict:
+    """
+    Writes any chunks of the save that don't already exist.
+    Returns which chunk holds each part of the save
+    """
+    os.makedirs(CHUNK_DIR, exist_ok=True)
+    chunks = {}
+    for name in CHUNK_KEYS:
+        if s_dict.get(name) is None:
+            continue
+        data = pickle.dumps(s_dict[name])
+        digest = hashlib.sha1(data).hexdigest()
+        chunk_loc = CHUNK_DIR + digest + '.pchunk'
+        if not os.path.exists(chunk_loc):
+            # Another save could be writing the same chunk right now
+            temp_loc = chunk_loc + '.' + str(threading.get_ident())
+            with open(temp_loc, 'wb') as fp:
+                fp.write(data)
+            os.replace(temp_loc, chunk_loc)
+        chunks[name] = digest
+    return chunks
+
+def read_save(save_loc) -> dict:
+    with open(save_loc, 'rb') as fp:
+        s_dict = pickle.load(fp)
+    # Saves from before chunks were used have everything in the save file
+    if 'chunks' in s_dict:
+        for name, digest in s_dict.pop('chunks').items():
+            with open(CHUNK_DIR + digest + '.pchunk', 'rb') as fp:
+                s_dict[name] = pickle.load(fp)
+    return s_dict
+
+def remove_unused_files():
+    """
+    Deletes the chunks and action log journals no save uses anymore.
+    Nothing can be saving while this runs. If any save can't be read,
+    deletes nothing, since there is no telling what it uses
+    """
+    used = set()
+    for save_loc in glob.glob('saves/*.p'):
+        try:
+            with open(save_loc, 'rb') as fp:
+                s_dict = pickle.load(fp)
+        except Exception as e:
+            logger.warning("Could not read %s, so not removing unused files: %s", save_loc, e)
+            return
+        if not isinstance(s_dict, dict):
+            continue
+        if 'chunks' in s_dict:
+            used.update(CHUNK_DIR + digest + '.pchunk' for digest in s_dict['chunks'].values())
+        # The action log is kept in the save itself, and names its journal
+        action_log = s_dict.get('action_log')
+        if isinstance(action_log, dict):
+            used.add(action_log['journal'])
+    used = {os.path.normpath(fn) for fn in used}
+    for fn in glob.glob(CHUNK_DIR + '*.pchunk') + glob.glob('saves/*-action_log-*.plog'):
+        if os.path.normpath(fn) not in used:
+            os.remove(fn)
+
 def save_io(s_dict, meta_dict, old_slot, slot, force_loc=None, name=None):
     if name:
         save_loc = 'saves/' + name + '.p'
@@ -78,9 +144,11 @@ def save_io(s_dict, meta_dict, old_slot, slot, force_loc=None, name=None):
     logger.info("Saving to %s", save_loc)
 
     with open(save_loc, 'wb') as fp:
-        # pickle.dump(s_dict, fp, -1)
         try:
-            pickle.dump(s_dict, fp)
+            chunks = write_chunks(s_dict)
+            rest = {key: value for key, value in s_dict.items() if key not in chunks}
+            rest['chunks'] = chunks
+            pickle.dump(rest, fp)
         except TypeError as e:
             # There's a surface somewhere in the dictionary of things to save...
             dict_print(s_dict)
@@ -88,6 +156,7 @@ def save_io(s_dict, meta_dict, old_slot, slot, force_loc=None, name=None):
     with open(meta_loc, 'wb') as fp:
         pickle.dump(meta_dict, fp)
 
+    # Copying a save file doesn't copy its chunks, which both saves share
     # For restart
     if not force_loc:
         r_save = 'saves/' + GAME_NID + '-restart' + str(slot) + '.p'
@@ -146,8 +215,7 @@ def load_game(game_state, save_slot):
     """
     save_loc = save_slot.save_loc
     logging.info("Loading from %s", save_loc)
-    with open(save_loc, 'rb') as fp:
-        s_dict = pickle.load(fp)
+    s_dict = read_save(save_loc)
     game_state.build_new()
     game_state.load(s_dict)
     game_state.current_save_slot = save_slot
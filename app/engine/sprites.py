@@ -1,9 +1,64 @@
+import json
+import logging
+import os
+
 from app.sprites import SPRITES
 
 from app.engine import engine
 
+# Optional. Built by utilities/build_sprite_atlas.py, which packs every
+# sprite with per-pixel alpha into one image so they are all decoded at once
+ATLAS_IMAGE = 'sprites/_atlas.png'
+ATLAS_INDEX = 'sprites/_atlas.json'
+
+def get_file_stamp(path) -> list:
+    """
+    The size and last modified time of the file, which the atlas index keeps
+    for each sprite, so a sprite that has been edited since is loaded from its
+    own file again. The size alone would miss edits that happen to keep it
+    """
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+class SpriteAtlas():
+    def __init__(self, image_path, index_path):
+        self.image_path = image_path
+        self.image = None
+        self.index = {}
+        if os.path.exists(image_path) and os.path.exists(index_path):
+            try:
+                with open(index_path) as fp:
+                    self.index = json.load(fp)
+            except (OSError, ValueError) as e:
+                logging.warning("Could not read sprite atlas index %s: %s", index_path, e)
+
+    def get(self, nid, sprite):
+        """
+        Returns the sprite's image out of the atlas, or None if it
+        isn't in the atlas or the sprite's file has changed since
+        """
+        entry = self.index.get(nid)
+        # Indices built before stamps were kept have none, so are never used
+        if not entry or get_file_stamp(sprite.full_path) != entry.get('stamp'):
+            return None
+        if self.image is None:
+            self.image = engine.image_load(self.image_path)
+        return self.image.subsurface(entry['rect'])
+
+ATLAS = SpriteAtlas(ATLAS_IMAGE, ATLAS_INDEX)
+
+def load_image(nid, sprite):
+    image = ATLAS.get(nid, sprite)
+    if image is None:
+        image = engine.image_load(sprite.full_path)
+    return image
+
 def load_images():
-    for sprite in SPRITES.values():
-        sprite.image = engine.image_load(sprite.full_path)
+    """
+    Loads every sprite now, instead of when each is first asked for
+    """
+    for nid, sprite in SPRITES.items():
+        if sprite.image is None:
+            sprite.image = load_image(nid, sprite)
 
-load_images()
+SPRITES.loader = load_image
@@ -1,3 +1,5 @@
+import functools
+
 from app.data.database import DB
 from app.engine import (equations, item_funcs, item_system, line_of_sight,
                         pathfinding, skill_system)
@@ -5,25 +7,56 @@ from app.engine.game_state import game
 from app.utilities import utils
 
 
-# Consider making these sections faster
 def get_shell(valid_moves: set, potential_range: set, width: int, height: int) -> set:
+    radii = _get_radii(potential_range)
     valid_attacks = set()
-    for valid_move in valid_moves:
-        valid_attacks |= find_manhattan_spheres(potential_range, valid_move[0], valid_move[1])
-    return {pos for pos in valid_attacks if 0 <= pos[0] < width and 0 <= pos[1] < height}
+    for x, y in valid_moves:
+        valid_attacks.update(_get_sphere_indices(radii, x, y, width, height))
+    return {divmod(idx, height) for idx in valid_attacks}
 
-# Consider making these sections faster -- use memory?
-def find_manhattan_spheres(rng: set, x: int, y: int) -> set:
-    _range = range
-    _abs = abs
-    main_set = set()
-    for r in rng:
+@functools.lru_cache(maxsize=256)
+def _get_manhattan_offsets(radii: tuple) -> tuple:
+    offsets = set()
+    for r in radii:
         # Finds manhattan spheres of radius r
-        for i in _range(-r, r + 1):
-            magn = _abs(i)
-            main_set.add((x + i, y + r - magn))
-            main_set.add((x + i, y - r + magn))
-    return main_set
+        for i in range(-r, r + 1):
+            magn = abs(i)
+            offsets.add((i, r - magn))
+            offsets.add((i, -r + magn))
+    return tuple(offsets)
+
+def _get_radii(rng) -> tuple:
+    return tuple(sorted(set(rng)))
+
+def find_manhattan_spheres(rng: set, x: int, y: int) -> set:
+    return {(x + dx, y + dy) for dx, dy in _get_manhattan_offsets(_get_radii(rng))}
+
+# Key: (width, height, radii), Value: for each tile, the indices of the tiles
+# within range of it, already clipped to the map. Filled in as tiles are asked for
+_sphere_tables = {}
+
+def _get_sphere_indices(radii: tuple, x: int, y: int, width: int, height: int) -> tuple:
+    if not (0 <= x < width and 0 <= y < height):
+        return tuple((x + dx) * height + y + dy for dx, dy in _get_manhattan_offsets(radii)
+                     if 0 <= x + dx < width and 0 <= y + dy < height)
+    table = _sphere_tables.get((width, height, radii))
+    if table is None:
+        if len(_sphere_tables) > 64:
+            _sphere_tables.clear()
+        table = _sphere_tables[(width, height, radii)] = [None] * (width * height)
+    idx = x * height + y
+    indices = table[idx]
+    if indices is None:
+        indices = table[idx] = tuple((x + dx) * height + y + dy for dx, dy in _get_manhattan_offsets(radii)
+                                     if 0 <= x + dx < width and 0 <= y + dy < height)
+    return indices
+
+def get_sphere_indices(rng: set, x: int, y: int, width: int, height: int) -> tuple:
+    """
+    Same as find_manhattan_spheres, but clipped to the map and as
+    indices (x * height + y) into the map's grids
+    """
+    return _get_sphere_indices(_get_radii(rng), x, y, width, height)
 
 def get_nearest_open_tile(unit, position):
     r = 0
@@ -85,30 +118,34 @@ def get_attacks(unit, item=None, force=False) -> set:
     return attacks
 
 def get_possible_attacks(unit, valid_moves) -> set:
-    attacks = set()
+    potential_range = set()
     max_range = 0
     for item in get_all_weapons(unit):
         item_range = item_funcs.get_range(unit, item)
         max_range = max(max_range, max(item_range))
-        if max_range >= 99:
-            attacks = {(x, y) for x in range(game.tilemap.width) for y in range(game.tilemap.height)}
-        else:
-            attacks |= get_shell(valid_moves, item_range, game.tilemap.width, game.tilemap.height)
+        potential_range |= set(item_range)
+    if max_range >= 99:
+        attacks = {(x, y) for x in range(game.tilemap.width) for y in range(game.tilemap.height)}
+    else:
+        # The shells of every item at once
+        attacks = get_shell(valid_moves, potential_range, game.tilemap.width, game.tilemap.height)
 
     if DB.constants.value('line_of_sight'):
         attacks = set(line_of_sight.line_of_sight(valid_moves, attacks, max_range))
     return attacks
 
 def get_possible_spell_attacks(unit, valid_moves) -> set:
-    attacks = set()
+    potential_range = set()
     max_range = 0
     for item in get_all_spells(unit):
         item_range = item_funcs.get_range(unit, item)
         max_range = max(max_range, max(item_range))
-        if max_range >= 99:
-            attacks = {(x, y) for x in range(game.tilemap.width) for y in range(game.tilemap.height)}
-        else:
-            attacks |= get_shell(valid_moves, item_range, game.tilemap.width, game.tilemap.height)
+        potential_range |= set(item_range)
+    if max_range >= 99:
+        attacks = {(x, y) for x in range(game.tilemap.width) for y in range(game.tilemap.height)}
+    else:
+        # The shells of every item at once
+        attacks = get_shell(valid_moves, potential_range, game.tilemap.width, game.tilemap.height)
 
     if DB.constants.value('line_of_sight'):
         attacks = set(line_of_sight.line_of_sight(valid_moves, attacks, max_range))
@@ -48,6 +48,7 @@ class TitleStartState(State):
         # Wait until saving thread has finished
         if save.SAVE_THREAD:
             save.SAVE_THREAD.join()
+        save.remove_unused_files()
 
         SOUNDTHREAD.clear()
         if DB.constants.value('music_main'):
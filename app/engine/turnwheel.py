@@ -10,7 +10,7 @@ from app.engine.game_state import game
 import app.engine.action as Action
 from app.engine.background import SpriteBackground
 from app.engine.state import MapState
-from app.engine import engine, base_surf, image_mods, gui
+from app.engine import engine, base_surf, image_mods, gui, hook_cache, action_journal
 
 import logging
 
@@ -22,6 +22,8 @@ class ActionLog():
         self.locked = False
         self.record = True  # Whether the action log is currently recording
         self.action_depth = 0
+        # Where the log is saved to, see action_journal
+        self.journal = None
 
         # For playback
         self.current_unit = None
@@ -54,6 +56,9 @@ class ActionLog():
     def run_action_backward(self):
         action = self.actions[self.action_index]
         action.reverse()
+        hook_cache.clear()
+        if self.journal:
+            self.journal.touch(self.action_index)
         self.action_index -= 1
         return action
 
@@ -61,6 +66,41 @@ class ActionLog():
         self.action_index += 1
         action = self.actions[self.action_index]
         action.execute()
+        hook_cache.clear()
+        if self.journal:
+            self.journal.touch(self.action_index)
+        return action
+
+    def rewind_to(self, index):
+        """
+        Runs actions backward until action_index is index.
+        The boundary is only recomputed once, at the end.
+        Returns the last action run
+        """
+        action = None
+        game.boundary.defer()
+        try:
+            while self.action_index > index:
+                action = self.run_action_backward()
+        finally:
+            # So the boundary doesn't stay deferred if an action fails
+            game.boundary.release()
+        return action
+
+    def replay_to(self, index):
+        """
+        Runs actions forward until action_index is index.
+        The boundary is only recomputed once, at the end.
+        Returns the last action run
+        """
+        action = None
+        game.boundary.defer()
+        try:
+            while self.action_index < index:
+                action = self.run_action_forward()
+        finally:
+            # So the boundary doesn't stay deferred if an action fails
+            game.boundary.release()
         return action
 
     def at_far_past(self):
@@ -151,8 +191,7 @@ class ActionLog():
 
         if isinstance(self.current_move, self.Move):
             if self.current_unit:
-                while self.action_index >= self.current_move.begin:
-                    action = self.run_action_backward()
+                action = self.rewind_to(self.current_move.begin - 1)
                 game.cursor.set_pos(self.current_unit.position)
                 self.current_unit = None
                 return []
@@ -161,8 +200,7 @@ class ActionLog():
                     self.hover_off()
                 self.current_unit = self.current_move.unit
                 if self.current_move.end:
-                    while self.action_index > self.current_move.end:
-                        action = self.run_action_backward()
+                    action = self.rewind_to(self.current_move.end)
                     prev_action = None
                     if self.action_index >= 1:
                         prev_action = self.actions[self.action_index]
@@ -179,15 +217,13 @@ class ActionLog():
                     logging.debug("In Backward %s %s %s %s", text_list, self.current_unit.nid, self.current_unit.position, prev_action)
                     return text_list
                 else:
-                    while self.action_index >= self.current_move.begin:
-                        action = self.run_action_backward()
+                    action = self.rewind_to(self.current_move.begin - 1)
                     game.cursor.set_pos(self.current_unit.position)
                     self.hover_on(self.current_unit)
                     return []
 
         elif self.current_move[0] == 'Phase':
-            while self.action_index > self.current_move[1]:
-                action = self.run_action_backward()
+            action = self.rewind_to(self.current_move[1])
             if self.hovered_unit:
                 self.hover_off()
             if self.current_move[2] == 'player':
@@ -195,14 +231,12 @@ class ActionLog():
             return ["Start of %s phase" % self.current_move[2].capitalize()]
 
         elif self.current_move[0] == 'Lock':
-            while self.action_index >= self.current_move[1]:
-                action = self.run_action_backward()
+            action = self.rewind_to(self.current_move[1] - 1)
             self.locked = self.get_last_lock()
             return self.backward()  # Go again
 
         elif self.current_move[0] == 'Extra':
-            while self.action_index >= self.current_move[1]:
-                action = self.run_action_backward()
+            action = self.rewind_to(self.current_move[1] - 1)
             return self.backward()  # Go again
 
     def forward(self):
@@ -216,8 +250,7 @@ class ActionLog():
 
         if isinstance(self.current_move, self.Move):
             if self.current_unit:
-                while self.action_index < self.current_move.end:
-                    action = self.run_action_forward()
+                action = self.replay_to(self.current_move.end)
                 if self.current_unit.position:
                     game.cursor.set_pos(self.current_unit.position)
                 elif isinstance(action, Action.Die):
@@ -235,17 +268,15 @@ class ActionLog():
                 if self.hovered_unit:
                     self.hover_off()
                 self.current_unit = self.current_move.unit
-                while self.action_index < self.current_move.begin - 1:
-                    # Does next action, so -1 is necessary
-                    action = self.run_action_forward()
+                # Does next action, so -1 is necessary
+                action = self.replay_to(self.current_move.begin - 1)
                 game.cursor.set_pos(self.current_unit.position)
                 self.hover_on(self.current_unit)
                 self.current_move_index -= 1  # Make sure we don't skip second half of this
                 return []
 
         elif self.current_move[0] == 'Phase':
-            while self.action_index < self.current_move[1]:
-                action = self.run_action_forward()
+            action = self.replay_to(self.current_move[1])
             if self.hovered_unit:
                 self.hover_off()
             if self.current_move[2] == 'player':
@@ -253,14 +284,12 @@ class ActionLog():
             return ["Start of %s phase" % self.current_move[2].capitalize()]
 
         elif self.current_move[0] == 'Lock':
-            while self.action_index < self.current_move[1]:
-                action = self.run_action_forward()
+            action = self.replay_to(self.current_move[1])
             self.locked = self.current_move[2]
             return self.forward()  # Go again
 
         elif self.current_move[0] == 'Extra':
-            while self.action_index < self.current_move[1]:
-                action = self.run_action_forward()
+            action = self.replay_to(self.current_move[1])
             return []
 
     def finalize(self):
@@ -279,8 +308,7 @@ class ActionLog():
         self.current_unit = None
         if self.hovered_unit:
             self.hover_off()
-        while not self.at_far_future():
-            self.run_action_forward()
+        self.replay_to(len(self.actions) - 1)
 
     def get_last_lock(self):
         cur_index = self.action_index
@@ -338,14 +366,28 @@ class ActionLog():
         self.hovered_unit = None
 
     def save(self):
-        return ([action.save() for action in self.actions], self.first_free_action)
+        """
+        Writes any actions that are new since the last save to the journal
+        """
+        if not self.journal:
+            self.journal = action_journal.ActionJournal(action_journal.get_journal_name())
+        size = self.journal.write(self.actions)
+        return {'journal': self.journal.fn, 'size': size, 'first_free_action': self.first_free_action}
 
     @classmethod
     def restore(cls, serial):
         self = cls()
-        actions, first_free_action = serial
-        for name, action in actions:
-            self.append(getattr(Action, name).restore(action))
+        if isinstance(serial, dict):
+            self.journal, actions = action_journal.ActionJournal.read(serial['journal'], serial['size'])
+            for action in actions:
+                self.append(action)
+            # If the journal went missing, so did the actions first_free_action refers to
+            first_free_action = min(serial['first_free_action'], len(actions) - 1)
+        else:
+            # Saved before the action log had its own journal
+            actions, first_free_action = serial
+            for name, action in actions:
+                self.append(getattr(Action, name).restore(action))
         self.first_free_action = first_free_action
         return self
 
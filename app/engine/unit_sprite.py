@@ -1,4 +1,5 @@
 from app.engine.game_counters import ANIMATION_COUNTERS
+from collections import OrderedDict
 import math
 
 from app.constants import TILEWIDTH, TILEHEIGHT, COLORKEY
@@ -70,6 +71,79 @@ class MapSprite():
             engine.set_colorkey(img, COLORKEY, rleaccel=True)
         return imgs
 
+def _make_translucent(image, t):
+    return image_mods.make_translucent(image.convert_alpha(), t)
+
+def _add_tint(image, color):
+    return image_mods.add_tint(image.convert_alpha(), color)
+
+def _sub_tint(image, color):
+    return image_mods.sub_tint(image.convert_alpha(), color)
+
+def _change_color(image, color):
+    return image_mods.change_color(image.convert_alpha(), color)
+
+class TintCache():
+    """
+    Holds map sprite frames with translucency and tints applied, keyed by
+    the frame they were made from and the (quantized) effects applied to it,
+    so flickering and tinted units don't make new surfaces every frame.
+    Least recently used images are thrown out first.
+    """
+    max_size = 512
+    color_step = 4  # Tints are rounded to the nearest multiple of this
+    alpha_steps = 64  # Translucency is rounded to the nearest 1/alpha_steps
+
+    def __init__(self):
+        self.images = OrderedDict()
+        # Debug counters
+        self.hits = 0
+        self.misses = 0
+        self.allocated = 0  # Surfaces made so far this frame
+        self.last_allocated = 0  # Surfaces made last frame
+
+    def clear(self):
+        self.images.clear()
+
+    def start_frame(self):
+        self.last_allocated = self.allocated
+        self.allocated = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+    def quantize_color(self, color) -> tuple:
+        step = self.color_step
+        return tuple(utils.clamp(int(round(c / step)) * step, -255, 255) for c in color)
+
+    def quantize_alpha(self, t) -> float:
+        return round(utils.clamp(t, 0, 1) * self.alpha_steps) / self.alpha_steps
+
+    def apply(self, image, key, func, arg) -> tuple:
+        """
+        Returns func(image, arg) and the key it is stored under.
+        A key of None means the image is not stored here (it was stretched or
+        otherwise made just for this frame), so neither is the result
+        """
+        if key is None:
+            self.allocated += 1
+            return func(image, arg), None
+        key = (key, func, arg)
+        new_image = self.images.get(key)
+        if new_image is None:
+            self.misses += 1
+            self.allocated += 1
+            new_image = self.images[key] = func(image, arg)
+            if len(self.images) > self.max_size:
+                self.images.popitem(last=False)
+        else:
+            self.hits += 1
+            self.images.move_to_end(key)
+        return new_image, key
+
+TINT_CACHE = TintCache()
+
 def load_map_sprite(unit, team='player'):
     klass = DB.classes.get(unit.klass)
     nid = klass.map_sprite_nid
@@ -355,25 +429,30 @@ class UnitSprite():
 
     def select_frame(self, image, state):
         if self.unit.is_dying:
-            return image[0].copy()
+            return image[0]
         elif state == 'passive' or state == 'gray':
-            return image[ANIMATION_COUNTERS.passive_sprite_counter.count].copy()
+            return image[ANIMATION_COUNTERS.passive_sprite_counter.count]
         elif state == 'active':
-            return image[ANIMATION_COUNTERS.active_sprite_counter.count].copy()
+            return image[ANIMATION_COUNTERS.active_sprite_counter.count]
         elif state == 'combat_anim':
-            return image[ANIMATION_COUNTERS.fast_move_sprite_counter.count].copy()
+            return image[ANIMATION_COUNTERS.fast_move_sprite_counter.count]
         else:
-            return image[ANIMATION_COUNTERS.move_sprite_counter.count].copy()
+            return image[ANIMATION_COUNTERS.move_sprite_counter.count]
 
-    def create_image(self, state):
+    def get_frame(self, state):
+        """
+        The map sprite's own frame, not a copy, so don't draw on it
+        """
         if not self.map_sprite:  # This shouldn't happen, but if it does...
             res = RESOURCES.map_sprites[0]
             self.map_sprite = MapSprite(res, self.unit.team)
         if self.transition_state == 'swoosh_in':
             state = 'down'
         image = getattr(self.map_sprite, state)
-        image = self.select_frame(image, state)
-        return image
+        return self.select_frame(image, state)
+
+    def create_image(self, state):
+        return self.get_frame(state).copy()
 
     def get_topleft(self, cull_rect):
         if self.fake_position:
@@ -386,7 +465,9 @@ class UnitSprite():
 
     def draw(self, surf, cull_rect):
         current_time = engine.get_time()
-        image = self.create_image(self.image_state)
+        image = self.get_frame(self.image_state)
+        # Images made from the frame are kept in the TINT_CACHE under this key
+        key = image
         left, top = self.get_topleft(cull_rect)
 
         anim_top = top
@@ -409,8 +490,9 @@ class UnitSprite():
                 new_width, new_height = cur_width, int(cur_height * (max(0, progress - 0.4) * 3 + 1))
                 extra_height = new_height - cur_height
                 image = engine.transform_scale(image, (new_width, new_height))
+                key = None
                 top -= extra_height
-            image = image_mods.make_translucent(image.convert_alpha(), progress)
+            image, key = TINT_CACHE.apply(image, key, _make_translucent, TINT_CACHE.quantize_alpha(progress))
 
         elif self.transition_state in ('fade_in', 'warp_in', 'swoosh_in'):
             progress = utils.clamp((self.transition_time - self.transition_counter) / self.transition_time, 0, 1)
@@ -421,8 +503,9 @@ class UnitSprite():
                 new_width, new_height = cur_width, int(cur_height * (max(0, progress - 0.4) * 3 + 1))
                 extra_height = new_height - cur_height
                 image = engine.transform_scale(image, (new_width, new_height))
+                key = None
                 top -= extra_height
-            image = image_mods.make_translucent(image.convert_alpha(), progress)
+            image, key = TINT_CACHE.apply(image, key, _make_translucent, TINT_CACHE.quantize_alpha(progress))
 
         for flicker in self.flicker[:]:
             starting_time, total_time, color, direction, fade_out = flicker
@@ -434,12 +517,12 @@ class UnitSprite():
                     time_passed = engine.get_time() - starting_time
                     color = tuple((total_time - time_passed) * float(c) // total_time for c in color)
                 if direction == 'add':
-                    image = image_mods.add_tint(image.convert_alpha(), color)
+                    image, key = TINT_CACHE.apply(image, key, _add_tint, TINT_CACHE.quantize_color(color))
                 elif direction == 'sub':
-                    image = image_mods.sub_tint(image.convert_alpha(), color)
+                    image, key = TINT_CACHE.apply(image, key, _sub_tint, TINT_CACHE.quantize_color(color))
 
         if not self.flicker and game.boundary.draw_flag and self.unit.nid in game.boundary.displaying_units:
-            image = image_mods.change_color(image.convert_alpha(), (60, 0, 0))
+            image, key = TINT_CACHE.apply(image, key, _change_color, (60, 0, 0))
 
         if game.action_log.hovered_unit is self.unit:
             length = 200
@@ -449,14 +532,14 @@ class UnitSprite():
                     diff = length - diff
                 diff = utils.clamp(255. * diff / length * 2, 0, 255)
                 color = (0, int(diff * .5), 0)  # Tint image green at magnitude depending on diff
-                image = image_mods.change_color(image.convert_alpha(), color)
+                image, key = TINT_CACHE.apply(image, key, _change_color, TINT_CACHE.quantize_color(color))
 
         for flicker_tint in self.flicker_tint:
             color, period, width = flicker_tint
             diff = utils.model_wave(current_time, period, width)
             diff = utils.clamp(diff, 0, 1)
             color = tuple([int(c * diff) for c in color])
-            image = image_mods.add_tint(image.convert_alpha(), color)
+            image, key = TINT_CACHE.apply(image, key, _add_tint, TINT_CACHE.quantize_color(color))
 
         # Each image has (self.image.get_width() - 32)//2 buggers on the
         # left and right of it, to handle any off tile spriting
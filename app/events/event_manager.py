@@ -1,4 +1,5 @@
 from app.data.database import DB
+from app.events import event_validators
 from app.events.event import Event
 from app.engine.game_state import game
 from app.engine import action, evaluate
@@ -10,6 +11,10 @@ class EventManager():
         self.all_events = []  # Keeps all events, both in use and not yet used
         self.event_stack = []  # A stack of events that haven't been used yet
 
+        # Parse every condition now, rather than the first time it is checked
+        for condition in event_validators.precompile_conditions(DB.events.values()):
+            logging.warning("Condition {%s} is not a valid Python expression" % condition)
+
     def trigger(self, trigger, unit=None, unit2=None, item=None, position=None, region=None, level_nid=None):
         unit1 = unit  # noqa: F841
         triggered_events = []
@@ -1,4 +1,7 @@
+from typing import Dict, List, Tuple
+
 from app.utilities.data import Data, Prefab
+from app.utilities.typing import NID
 from app.events import event_commands
 
 class Trigger(object):
@@ -77,11 +80,108 @@ class EventPrefab(Prefab):
         return cls('None')
 
 class EventCatalog(Data[EventPrefab]):
+    """
+    Keeps an index of events by trigger, so that looking up which events
+    a trigger could fire does not need to scan every event in the project.
+    If you change an event's trigger or level_nid directly, call reindex
+    """
     datatype = EventPrefab
 
-    def get(self, trigger, level_nid):
-        return [event for event in self._list if event.trigger == trigger and
-                (not event.level_nid or event.level_nid == level_nid)]
+    def __init__(self, vals: List[EventPrefab] = None):
+        super().__init__(vals)
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        # Key: trigger, Value: events with that trigger, in catalog order
+        self._trigger_index: Dict[str, List[EventPrefab]] = {}
+        # Key: (trigger, level_nid), Value: results of get
+        self._lookup_cache: Dict[Tuple[str, str], List[EventPrefab]] = {}
+        for event in self._list:
+            self._trigger_index.setdefault(event.trigger, []).append(event)
+
+    def _clear_lookups(self, trigger):
+        for key in [key for key in self._lookup_cache if key[0] == trigger]:
+            del self._lookup_cache[key]
+
+    def _unindex(self, event: EventPrefab):
+        for trigger, events in self._trigger_index.items():
+            if event in events:
+                events.remove(event)
+                self._clear_lookups(trigger)
+                break
+
+    def _index(self, event: EventPrefab):
+        events = self._trigger_index.setdefault(event.trigger, [])
+        if self._list and self._list[-1] is event:
+            events.append(event)  # Most common case, just appended
+        else:  # Find its place in catalog order
+            self._trigger_index[event.trigger] = \
+                [e for e in self._list if e.trigger == event.trigger]
+        self._clear_lookups(event.trigger)
+
+    def reindex(self, event: EventPrefab):
+        """
+        Call whenever an event's trigger or level_nid changes
+        """
+        self._unindex(event)
+        if event in self._list:
+            self._index(event)
+
+    def get(self, trigger, level_nid) -> List[EventPrefab]:
+        """
+        Returns every event that could fire on this trigger in this level,
+        in catalog order. Do not modify the returned list
+        """
+        key = (trigger, level_nid)
+        events = self._lookup_cache.get(key)
+        if events is None:
+            events = [event for event in self._trigger_index.get(trigger, [])
+                      if not event.level_nid or event.level_nid == level_nid]
+            self._lookup_cache[key] = events
+        return events
 
     def get_from_nid(self, key, fallback=None):
         return self._dict.get(key, fallback)
+
+    def update_nid(self, val: EventPrefab, nid: NID, set_nid=True):
+        super().update_nid(val, nid, set_nid)
+        self.reindex(val)  # Nid changes along with level_nid
+
+    def change_key(self, old_key: NID, new_key: NID):
+        super().change_key(old_key, new_key)
+        if new_key in self._dict:
+            self.reindex(self._dict[new_key])
+
+    def append(self, val: EventPrefab):
+        already_present = val.nid in self._dict
+        super().append(val)
+        if not already_present:
+            self._index(val)
+
+    def delete(self, val: EventPrefab):
+        super().delete(val)
+        self._unindex(val)
+
+    def remove_key(self, key: NID):
+        val = self._dict[key]
+        super().remove_key(key)
+        self._unindex(val)
+
+    def pop(self, idx: int = None):
+        val = self._list[-1 if idx is None else idx]
+        super().pop(idx)
+        if val not in self._list:
+            self._unindex(val)
+
+    def insert(self, idx: int, val: EventPrefab):
+        super().insert(idx, val)
+        self._unindex(val)
+        self._index(val)
+
+    def move_index(self, old_index: int, new_index: int):
+        super().move_index(old_index, new_index)
+        self._rebuild_index()
+
+    def clear(self):
+        super().clear()
+        self._rebuild_index()
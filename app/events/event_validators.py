@@ -62,9 +62,26 @@ class EventFunction(Validator):
         valids = [(None, command.nid) for command in event_commands.get_commands()]
         return valids
 
+@lru_cache(maxsize=4096)
+def compile_condition(text: str):
+    """
+    Compiles a condition so it can be passed straight to eval.
+    Cached by source text, so each condition is only parsed once
+    no matter how many times it is evaluated
+    """
+    # eval also ignores leading spaces and tabs
+    return compile(text.lstrip(' \t'), '<condition>', 'eval')
+
 class Condition(Validator):
     desc = "must be a valid Python expression to evaluate."
 
+    def validate(self, text, level):
+        try:
+            compile_condition(text)
+        except (SyntaxError, ValueError):
+            return None
+        return text
+
 class Nid(Validator):
     """
     Any nid will do, because we cannot know what
@@ -769,6 +786,32 @@ class OverworldLocation(Validator):
 validators = {validator.__name__: validator for validator in Validator.__subclasses__()}
 option_validators = {validator.__name__: validator for validator in OptionValidator.__subclasses__()}
 
+def precompile_conditions(events) -> list:
+    """
+    Compiles the trigger condition of every event and every
+    condition used by their commands ahead of time
+
+    Returns:
+        List[str]: The conditions that are not valid Python expressions
+    """
+    conditions = []
+    for event in events:
+        if event.condition:
+            conditions.append(event.condition)
+        for command in event.commands:
+            if 'Condition' not in command.keywords and 'Condition' not in command.optional_keywords:
+                continue
+            values, _ = event_commands.parse(command)
+            for keyword, value in zip(command.keywords + command.optional_keywords, values):
+                if keyword == 'Condition':
+                    conditions.append(value)
+
+    invalid = []
+    for condition in conditions:
+        if Condition().validate(condition, None) is None:
+            invalid.append(condition)
+    return invalid
+
 def validate(var_type, text, level):
     validator = validators.get(var_type)
     if validator:
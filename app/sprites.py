@@ -8,15 +8,22 @@ class BasicSprite(object):
     image: str = None
 
 class SpriteDict(dict):
+    # Set by app.engine.sprites, so images are only loaded when they are first asked for
+    loader = None
+
     def get(self, val):
         if val in self:
-            return self[val].image
+            sprite = self[val]
+            if sprite.image is None and self.loader:
+                sprite.image = self.loader(val, sprite)
+            return sprite.image
         return None
 
 def load_sprites(root):
     for root, dirs, files in os.walk(root):
         for name in files:
-            if name.endswith('.png'):
+            # Files starting with _ (such as the sprite atlas) are not sprites
+            if name.endswith('.png') and not name.startswith('_'):
                 full_name = os.path.join(root, name)
                 SPRITES[name[:-4]] = BasicSprite(full_name)
 
@@ -1,4 +1,4 @@
-import os, sys
+import logging, os, sys, time
 
 from app.constants import VERSION
 from app.resources.resources import RESOURCES
@@ -9,20 +9,35 @@ from app.engine import driver
 from app.engine import game_state
 from app.engine.component_system_compiler import source_generator
 
+def log_startup(phase: str, start: float) -> float:
+    now = time.perf_counter()
+    logging.info("Startup: %s took %d ms", phase, (now - start) * 1000)
+    return now
+
 def main(name: str):
+    start = time.perf_counter()
     RESOURCES.load(name + '.ltproj')
+    start = log_startup('Loading resources', start)
     DB.load(name + '.ltproj')
+    start = log_startup('Loading database', start)
     title = DB.constants.value('title')
     driver.start(title)
+    start = log_startup('Starting engine', start)
     game = game_state.start_game()
+    log_startup('Starting game', start)
     driver.run(game)
 
 def test_play(name: str):
+    start = time.perf_counter()
     RESOURCES.load(name + '.ltproj')
+    start = log_startup('Loading resources', start)
     DB.load(name + '.ltproj')
+    start = log_startup('Loading database', start)
     title = DB.constants.value('title')
     driver.start(title, from_editor=True)
+    start = log_startup('Starting engine', start)
     game = game_state.start_level('DEBUG')
+    log_startup('Starting level', start)
     driver.run(game)
 
 def inform_error():
@@ -42,7 +57,7 @@ def find_and_run_project():
                 main(name)
 
 if __name__ == '__main__':
-    import logging, traceback
+    import traceback
     from app import lt_log
     success = lt_log.create_logger()
     if not success:
@@ -50,7 +65,9 @@ if __name__ == '__main__':
 
     # compile necessary files
     if not hasattr(sys, 'frozen'):
+        start = time.perf_counter()
         source_generator.generate_component_system_source()
+        log_startup('Compiling component system', start)
 
     try:
         find_and_run_project()
@@ -0,0 +1,134 @@
+import glob
+import os
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+# Resources are loaded relative to the repository root
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Scripts to be run by hand, which do their work as soon as they are imported
+collect_ignore = ['test_audio.py', 'test_binomial.py', 'test_dynamic_growths.py']
+
+# Passive skills from the default project, handed out by give_skills
+PASSIVE_SKILLS = ('Sword Hit +10', 'Strength +5', 'Defense +5', 'Speed +5', 'Skill +5',
+                  'Luck +5', 'Resistance +5', 'Crit +15', 'Anticrit', 'Avoid5')
+
+def give_skills(game, num_skills):
+    """
+    Gives every unit in the game num_skills more passive skills,
+    so there is more for the engine to work through
+    """
+    from app.data.database import DB
+    from app.engine import item_funcs
+    skill_nids = [nid for nid in PASSIVE_SKILLS if DB.skills.get(nid)]
+    for unit in game.units:
+        for i in range(num_skills):
+            unit.skills.append(item_funcs.create_skill(unit, skill_nids[i % len(skill_nids)]))
+
+@pytest.fixture(scope='session')
+def default_project():
+    from app.engine import engine  # Must be imported first
+    from app.data.database import DB
+    from app.resources.resources import RESOURCES
+    RESOURCES.load('default.ltproj')
+    DB.load('default.ltproj')
+    # Only the engine itself is under test
+    DB.events.clear()
+    from app.engine import driver
+    driver.start('Tests', from_editor=True)
+    saves = set(glob.glob('saves/**', recursive=True))
+    yield DB
+    # Whatever the game saved while being tested, such as action log journals
+    for fn in sorted(set(glob.glob('saves/**', recursive=True)) - saves, reverse=True):
+        if os.path.isdir(fn):
+            os.rmdir(fn)
+        else:
+            os.remove(fn)
+
+@pytest.fixture
+def start_level(default_project):
+    """
+    Starts the default project's level with the given nid,
+    and returns the game
+    """
+    from app.engine import game_state
+    return game_state.start_level
+
+@pytest.fixture(scope='session')
+def qapp():
+    """
+    The QApplication the editor's Qt code needs, drawing offscreen
+    """
+    pytest.importorskip('PyQt5')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+@pytest.fixture
+def max_difference():
+    """
+    The most any channel of any pixel differs between two surfaces
+    """
+    def max_difference(surf1, surf2) -> int:
+        diff = 0
+        for x in range(surf1.get_width()):
+            for y in range(surf1.get_height()):
+                c1, c2 = surf1.get_at((x, y)), surf2.get_at((x, y))
+                diff = max(diff, *(abs(a - b) for a, b in zip(c1, c2)))
+        return diff
+    return max_difference
+
+@pytest.fixture
+def surface_bytes():
+    """
+    The pixels of a surface, to check two surfaces are exactly the same
+    """
+    def surface_bytes(surf, format='RGBA') -> bytes:
+        import pygame
+        return pygame.image.tostring(surf, format)
+    return surface_bytes
+
+@pytest.fixture
+def qt_image_bytes(qapp):
+    """
+    The pixels of a QImage or QPixmap, whatever format it was drawn in
+    """
+    def qt_image_bytes(image) -> bytes:
+        from PyQt5.QtGui import QImage, QPixmap
+        if isinstance(image, QPixmap):
+            image = image.toImage()
+        image = image.convertToFormat(QImage.Format_ARGB32)
+        return image.constBits().asstring(image.byteCount())
+    return qt_image_bytes
+
+@pytest.fixture(name='give_skills')
+def give_skills_fixture(default_project):
+    return give_skills
+
+@pytest.fixture
+def play():
+    """
+    Plays the game until turn num_turns is over, clicking through any
+    dialog and skipping the player phase, so only the AI moves.
+    Calls check(game) after every frame, if given
+    """
+    def play(game, num_turns, check=None, max_frames=100000):
+        from app.constants import WINWIDTH, WINHEIGHT
+        from app.engine import engine
+        surf = engine.create_surface((WINWIDTH, WINHEIGHT))
+        for frame in range(max_frames):
+            engine.constants['last_time'] = engine.constants['current_time']
+            engine.constants['current_time'] = frame * 16
+            event = ['SELECT'] if frame % 3 == 0 else []
+            surf, repeat = game.state.update(event, surf)
+            while repeat:
+                surf, repeat = game.state.update([], surf)
+            if check:
+                check(game)
+            if game.state.current() == 'free':
+                game.state.change('turn_change')
+            if game.turncount > num_turns:
+                break
+    return play
@@ -0,0 +1,69 @@
+import logging
+
+def legacy_save(log) -> tuple:
+    return ([action.save() for action in log.actions], log.first_free_action)
+
+def check(serial, expected):
+    """
+    Restores the action log from serial and checks it matches expected,
+    the log saved the previous way. Returns the restored log
+    """
+    from app.engine.turnwheel import ActionLog
+    restored = ActionLog.restore(serial)
+    assert legacy_save(restored) == expected, "Restored different actions"
+    return restored
+
+def test_journal_restores_the_same_actions(start_level, play):
+    """
+    Saving the action log at the end of every turn, into its journal,
+    gives back the same actions as saving every one of them in full,
+    including after the turnwheel has gone back, and an older save still
+    loads but starts a journal of its own
+    """
+    game = start_level('4')
+    log = game.action_log
+    saves = []
+    turncount = game.turncount
+    def save_every_turn(game):
+        nonlocal turncount
+        if game.turncount != turncount:
+            turncount = game.turncount
+            legacy_serial = legacy_save(log)
+            serial = log.save()
+            check(serial, legacy_serial)
+            check(legacy_serial, legacy_serial)
+            saves.append((serial, legacy_serial))
+    play(game, 4, save_every_turn)
+    assert len(saves) >= 3
+
+    # Turn the wheel back a few turns and forward a bit, use it there, and save
+    log.record = False
+    log.set_up()
+    for _ in range(len(log.unique_moves) // 2):
+        log.backward()
+    for _ in range(3):
+        log.forward()
+    log.finalize()
+    log.record = True
+    assert check(log.save(), legacy_save(log)).journal, "Latest save should keep adding to its journal"
+
+    # An older save still loads, but starts a journal of its own
+    serial, legacy_serial = saves[1]
+    old_log = check(serial, legacy_serial)
+    assert not old_log.journal
+    old_serial = old_log.save()
+    assert old_serial['journal'] != serial['journal']
+    check(old_serial, legacy_serial)
+
+def test_empty_journal_restores(default_project, caplog):
+    """
+    A log saved before any actions, whose journal was never written,
+    restores with a journal of its own and no error
+    """
+    from app.engine.turnwheel import ActionLog
+    serial = ActionLog().save()
+    assert serial['size'] == 0
+    with caplog.at_level(logging.ERROR):
+        restored = check(serial, ([], -1))
+    assert restored.journal
+    assert not caplog.records
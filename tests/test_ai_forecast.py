@@ -0,0 +1,295 @@
+import logging
+
+import pytest
+
+from app.utilities import utils
+
+class LegacyPrimaryAI():
+    """
+    The previous PrimaryAI methods. Goes in front of PrimaryAI in the
+    test, since ai_controller can only be imported once the engine has started
+    """
+    def item_setup(self):
+        if self.item_index < len(self.items):
+            logging.info("Testing %s" % self.items[self.item_index])
+            self.unit.equip(self.items[self.item_index])
+            self.get_all_valid_targets()
+            self.possible_moves = self.get_possible_moves()
+            logging.info(self.possible_moves)
+
+    def run(self):
+        from app.data.database import DB
+        from app.engine import item_funcs, line_of_sight, skill_system
+        from app.engine.game_state import game
+        if self.item_index >= len(self.items):
+            self.quick_move(self.orig_pos)
+            if self.orig_item:
+                self.unit.equip(self.orig_item)
+            return (True, self.best_target, self.best_position, self.best_item)
+
+        elif self.target_index >= len(self.valid_targets):
+            self.target_index = 0
+            self.item_index += 1
+            self.item_setup()
+
+        elif self.move_index >= len(self.possible_moves):
+            self.move_index = 0
+            self.target_index += 1
+            self.possible_moves = self.get_possible_moves()
+
+        else:
+            target = self.valid_targets[self.target_index]
+            item = self.items[self.item_index]
+            # If too many legal targets, just try for the best move first
+            # Otherwise it spends way too long trying every possible position to strike from
+            if len(self.valid_targets) > 10:
+                enemy_positions = {u.position for u in game.units if u.position and skill_system.check_enemy(self.unit, u)}
+                move = utils.farthest_away_pos(self.orig_pos, self.possible_moves, enemy_positions)
+            else:
+                move = self.possible_moves[self.move_index]
+
+            if self.unit.position != move:
+                self.quick_move(move)
+
+            # Check line of sight
+            line_of_sight_flag = True
+            if DB.constants.value('line_of_sight'):
+                max_item_range = max(item_funcs.get_range(self.unit, item))
+                valid_targets = line_of_sight.line_of_sight([move], [target], max_item_range)
+                if not valid_targets:
+                    line_of_sight_flag = False
+
+            if line_of_sight_flag:
+                self.determine_utility(move, target, item)
+            self.move_index += 1
+            # If too many legal targets, do not bother with every possible move
+            if len(self.valid_targets) > 10:
+                self.move_index = len(self.possible_moves)
+
+        # Not done yet
+        return (False, self.best_target, self.best_position, self.best_item)
+
+    def determine_utility(self, move, target, item):
+        from app.engine import item_system
+        from app.engine.game_state import game
+        tp = 0
+        main_target_pos, splash = item_system.splash(self.unit, item, target)
+        if item_system.target_restrict(self.unit, item, main_target_pos, splash):
+            tp = self.compute_priority(main_target_pos, splash, move, item)
+
+        unit = game.board.get_unit(target)
+        # Don't target self if I've already moved and I'm not targeting my new position
+        if unit is self.unit and target != self.unit.position:
+            return
+        if unit:
+            name = unit.nid
+        else:
+            name = '--'
+
+        logging.info("Choice %.5f - Weapon: %s, Position: %s, Target: %s, Target Position: %s", tp, item, move, name, target)
+        if tp > self.max_tp:
+            self.best_target = target
+            self.best_position = move
+            self.best_item = item
+            self.max_tp = tp
+
+    def compute_priority(self, main_target_pos, splash, move, item) -> float:
+        from app.engine import combat_calcs, item_system, skill_system
+        from app.engine.game_state import game
+        tp = 0
+        main_target = game.board.get_unit(main_target_pos)
+        # Only count main target if it's one of the legal targets
+        if main_target and main_target_pos in self.behaviour_targets:
+            ai_priority = item_system.ai_priority(self.unit, item, main_target, move)
+            # If no ai priority hook defined
+            if ai_priority is None:
+                pass
+            else:
+                tp += ai_priority
+
+            if item_system.damage(self.unit, item) is not None and \
+                    skill_system.check_enemy(self.unit, main_target):
+                ai_priority = self.default_priority(main_target, item, move)
+                tp += ai_priority
+
+        for splash_pos in splash:
+            target = game.board.get_unit(splash_pos)
+            # Only count splash target if it's one of the legal targets
+            if not target or splash_pos not in self.behaviour_targets:
+                continue
+            ai_priority = item_system.ai_priority(self.unit, item, main_target, move)
+            if ai_priority is None:
+                pass
+            else:
+                tp += ai_priority
+
+            if item_system.damage(self.unit, item):
+                accuracy = utils.clamp(combat_calcs.compute_hit(self.unit, target, item, target.get_weapon(), "attack")/100., 0, 1)
+                raw_damage = combat_calcs.compute_damage(self.unit, target, item, target.get_weapon(), "attack")
+                lethality = utils.clamp(raw_damage / float(target.get_hp()), 0, 1)
+                ai_priority = 3 if lethality * accuracy >= 1 else lethality * accuracy
+                if skill_system.check_enemy(self.unit, target):
+                    tp += ai_priority
+                elif skill_system.check_ally(self.unit, target):
+                    tp -= ai_priority
+        return tp
+
+    def default_priority(self, main_target, item, move):
+        from app.data.database import DB
+        from app.engine import combat_calcs, equations
+        # Default method
+        terms = []
+        offense_term = 0
+        defense_term = 1
+
+        raw_damage = combat_calcs.compute_damage(self.unit, main_target, item, main_target.get_weapon(), "attack")
+        crit_damage = combat_calcs.compute_damage(self.unit, main_target, item, main_target.get_weapon(), "attack", crit=True)
+
+        # Damage I do compared to target's current hp
+        lethality = utils.clamp(raw_damage / float(main_target.get_hp()), 0, 1)
+        crit_lethality = utils.clamp(crit_damage / float(main_target.get_hp()), 0, 1)
+        # Accuracy
+        hit_comp = combat_calcs.compute_hit(self.unit, main_target, item, main_target.get_weapon(), "attack")
+        if hit_comp:
+            accuracy = utils.clamp(hit_comp/100., 0, 1)
+        else:
+            accuracy = 0
+        crit_comp = combat_calcs.compute_crit(self.unit, main_target, item, main_target.get_weapon(), "attack")
+        if crit_comp:
+            crit_accuracy = utils.clamp(crit_comp/100., 0, 1)
+        else:
+            crit_accuracy = 0
+
+        # Determine if I would get countered
+        # Even if I wouldn't get countered, check anyway how much damage I would take
+        target_weapon = main_target.get_weapon()
+        target_damage = combat_calcs.compute_damage(main_target, self.unit, target_weapon, item, "defense")
+        if not target_damage:
+            target_damage = 0
+        target_damage = utils.clamp(target_damage/main_target.get_hp(), 0, 1)
+        target_accuracy = combat_calcs.compute_hit(main_target, self.unit, target_weapon, item, "defense")
+        if not target_accuracy:
+            target_accuracy = 0
+        target_accuracy = utils.clamp(target_accuracy/100., 0, 1)
+        # If I wouldn't get counterattacked, much less important, so multiply by 10 %
+        if not combat_calcs.can_counterattack(self.unit, item, main_target, target_weapon):
+            target_damage *= 0.3
+            target_accuracy *= 0.3
+
+        num_attacks = combat_calcs.outspeed(self.unit, main_target, item, target_weapon, "attack")
+        first_strike = lethality * accuracy if lethality >= 1 else 0
+
+        if num_attacks > 1 and target_damage >= 1:
+            # Calculate chance I actually get to strike more than once
+            num_attacks -= (target_accuracy * (1 - first_strike))
+
+        offense_term += 3 if lethality * accuracy >= 1 else lethality * accuracy * num_attacks
+        crit_term = (crit_lethality - lethality) * crit_accuracy * accuracy * num_attacks
+        offense_term += crit_term
+        defense_term -= target_damage * target_accuracy * (1 - first_strike)
+        if offense_term <= 0:
+            if lethality > 0 and DB.constants.value('attack_zero_hit'):
+                logging.info("Accuracy is bad, but continuing with stupid AI")
+            elif accuracy > 0 and DB.constants.value('attack_zero_dam'):
+                logging.info("Zero Damage, but continuing with stupid AI")
+            else:
+                logging.info("Offense: %.2f, Defense: %.2f", offense_term, defense_term)
+                return 0
+
+        # Only here to break ties
+        # Tries to minimize how far the unit should move
+        max_distance = equations.parser.movement(self.unit)
+        if max_distance > 0:
+            distance_term = (max_distance - utils.calculate_distance(move, self.orig_pos)) / float(max_distance)
+        else:
+            distance_term = 1
+
+        logging.info("Damage: %.2f, Accuracy: %.2f, Crit Accuracy: %.2f", lethality, accuracy, crit_accuracy)
+        logging.info("Offense: %.2f, Defense: %.2f, Distance: %.2f", offense_term, defense_term, distance_term)
+        ai_prefab = DB.ai.get(self.unit.ai)
+        offense_bias = ai_prefab.offense_bias
+        offense_weight = offense_bias * (1 / (offense_bias + 1))
+        defense_weight = 1 - offense_weight
+        terms.append((offense_term, offense_weight))
+        terms.append((defense_term, defense_weight))
+        terms.append((distance_term, .0001))
+
+        return utils.process_terms(terms)
+
+def legacy_forecast(unit, item, targets) -> list:
+    """
+    What combat_calcs.forecast works out, one target and one number at a time
+    """
+    from app.engine import combat_calcs
+    results = []
+    for target in targets:
+        def_item = target.get_weapon()
+        results.append((combat_calcs.compute_damage(unit, target, item, def_item, 'attack'),
+                        combat_calcs.compute_damage(unit, target, item, def_item, 'attack', crit=True),
+                        combat_calcs.compute_hit(unit, target, item, def_item, 'attack'),
+                        combat_calcs.compute_crit(unit, target, item, def_item, 'attack'),
+                        combat_calcs.outspeed(unit, target, item, def_item, 'attack'),
+                        combat_calcs.compute_damage(target, unit, def_item, item, 'defense'),
+                        combat_calcs.compute_hit(target, unit, def_item, item, 'defense')))
+    return results
+
+def decide(unit) -> tuple:
+    """
+    Thinks for unit a frame at a time.
+    Returns what it decided on
+    """
+    from app.engine.game_state import game
+    game.ai.load_unit(unit)
+    while not game.ai.think():
+        pass
+    item = game.ai.goal_item
+    return (game.ai.goal_position, game.ai.goal_target, item.uid if item else None)
+
+def run(game, units, primary_ai) -> tuple:
+    """
+    Returns the decisions, and the number of test moves it made
+    """
+    quick_moves = 0
+    quick_move = primary_ai.quick_move
+    def counted_quick_move(self, move):
+        nonlocal quick_moves
+        quick_moves += 1
+        quick_move(self, move)
+    primary_ai.quick_move = counted_quick_move
+    build_primary = game.ai.build_primary
+    game.ai.build_primary = lambda: primary_ai(game.ai.unit, list(build_primary().valid_moves), game.ai.behaviour)
+    try:
+        decisions = [decide(unit) for unit in units]
+    finally:
+        del game.ai.build_primary
+        primary_ai.quick_move = quick_move
+    return decisions, quick_moves
+
+@pytest.mark.parametrize('num_turns', [0, 1])
+def test_primary_ai_decides_like_legacy(start_level, play, num_turns):
+    """
+    Every unit with an AI decides on the same thing as with the previous
+    PrimaryAI, with no more test moves, and combat_calcs.forecast comes
+    out the same as working out each number on its own
+    """
+    from app.engine import combat_calcs, item_funcs
+    from app.engine.ai_controller import PrimaryAI
+    game = start_level('4')
+    if num_turns:
+        # So the two sides have closed in
+        play(game, num_turns)
+    legacy_ai = type('LegacyPrimaryAI', (LegacyPrimaryAI, PrimaryAI), {})
+    # Every unit with an AI, whichever side it is on
+    units = [unit for unit in game.units if unit.position and unit.ai]
+
+    expected, legacy_moves = run(game, units, legacy_ai)
+    actual, quick_moves = run(game, units, PrimaryAI)
+    assert actual == expected, "AI decided differently"
+    assert quick_moves <= legacy_moves
+
+    on_map = [unit for unit in game.units if unit.position]
+    for unit in on_map:
+        targets = [other for other in on_map if other is not unit]
+        for item in item_funcs.get_all_items(unit):
+            assert combat_calcs.forecast(unit, item, targets) == legacy_forecast(unit, item, targets), \
+                "Forecast of %s with %s came out differently" % (unit.nid, item.nid)
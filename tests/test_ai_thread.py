@@ -0,0 +1,66 @@
+import random
+import time
+
+import pytest
+
+def play(game, num_turns, max_frames=100000) -> list:
+    """
+    Plays until turn num_turns is over, the way the main loop does,
+    leaving a little time between frames for the AI thread.
+    Returns what every AI unit decided
+    """
+    from app.constants import WINWIDTH, WINHEIGHT
+    from app.engine import engine
+    from app.engine.ai_thread import AI_THREAD
+    decisions = []
+    think = game.ai.think
+    def recorded_think():
+        done = think()
+        if done:
+            item = game.ai.goal_item
+            decisions.append((game.ai.unit.nid, game.ai.goal_position, game.ai.goal_target,
+                              item.nid if item else None))
+        return done
+    game.ai.think = recorded_think
+
+    surf = engine.create_surface((WINWIDTH, WINHEIGHT))
+    for frame in range(max_frames):
+        engine.constants['last_time'] = engine.constants['current_time']
+        engine.constants['current_time'] = frame * 16
+        # Click through any level ups and dialog
+        event = ['SELECT'] if frame % 3 == 0 else []
+        with AI_THREAD.frame():
+            surf, repeat = game.state.update(event, surf)
+            while repeat:
+                surf, repeat = game.state.update([], surf)
+            if game.state.current() == 'free':
+                game.state.change('turn_change')
+        if game.turncount > num_turns:
+            break
+        time.sleep(0.001)
+    del game.ai.think
+    return decisions
+
+@pytest.fixture
+def ai_thread_constant(default_project):
+    constant = default_project.constants.get('ai_thread')
+    old_value = constant.value
+    yield constant
+    constant.set_value(old_value)
+
+def test_ai_thread_decides_the_same(start_level, give_skills, ai_thread_constant, monkeypatch):
+    """
+    Every AI unit decides on the same thing whether the AI thinks
+    on the main thread or on its own
+    """
+    from app.engine import config as cf
+    monkeypatch.setitem(cf.SETTINGS, 'random_seed', 0)
+    results = {}
+    for threaded in (False, True):
+        ai_thread_constant.set_value(threaded)
+        random.seed(0)
+        game = start_level('4')
+        give_skills(game, 3)
+        results[threaded] = play(game, 1)
+    assert results[False], "No AI decisions to compare"
+    assert results[True] == results[False], "AI decided differently on its own thread"
@@ -0,0 +1,52 @@
+def legacy_apply_palette(anim_prefab, palette) -> dict:
+    from app.engine import engine, image_mods
+    image_directory = {}
+    colors = palette.colors
+    conversion_dict = {(0, coord[0], coord[1]): (color[0], color[1], color[2]) for coord, color in colors.items()}
+    for frame in anim_prefab.frames:
+        converted_image = image_mods.color_convert(engine.copy_surface(frame.image), conversion_dict)
+        image_directory[frame.nid] = converted_image
+    return image_directory
+
+def legacy_get_image(image_directory, frame_nid, right):
+    from app.engine import engine
+    image = image_directory[frame_nid].copy()
+    if not right:
+        image = engine.flip_horiz(image)
+    return image
+
+def get_anims(game) -> list:
+    """
+    The battle animation of every unit on the level with its weapon
+    """
+    from app.engine import battle_animation
+    anims = []
+    for unit in game.units:
+        if unit.position:
+            anim = battle_animation.get_battle_anim(unit, unit.get_weapon())
+            if anim:
+                anims.append(anim)
+    return anims
+
+def test_frames_match_legacy(start_level, surface_bytes):
+    """
+    Every frame of every unit's battle animation comes out the same facing
+    either way as palette swapping it the previous way, including when
+    the animation is set up again for another fight from the frame cache
+    """
+    from app.engine import battle_animation
+    game = start_level('4')
+    anims = get_anims(game)
+    assert anims
+    setups = [(anim.anim_prefab, anim.palette_name, anim.current_palette, anim.unit, anim.item) for anim in anims]
+    again = [battle_animation.BattleAnimation(*setup) for setup in setups]
+
+    for anim in anims + again:
+        legacy_directory = legacy_apply_palette(anim.anim_prefab, anim.current_palette)
+        for frame in anim.anim_prefab.frames:
+            for right in (True, False):
+                assert surface_bytes(anim.frames.get(frame.nid, right)) == \
+                    surface_bytes(legacy_get_image(legacy_directory, frame.nid, right)), \
+                    "Frame %s of %s comes out differently" % (frame.nid, anim.anim_prefab.nid)
+    for anim, other in zip(anims, again):
+        assert anim.frames is other.frames
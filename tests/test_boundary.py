@@ -0,0 +1,197 @@
+import random
+
+import pytest
+
+from app.constants import TILEWIDTH, TILEHEIGHT, WINWIDTH, WINHEIGHT
+
+class LegacyBoundary():
+    """
+    Keeps the nids of every unit threatening each tile. Its own updates
+    only recomputed enemies whose movement area touched the tile that
+    changed, which could miss some, so it is always built from scratch
+    """
+    enemy_teams = ('enemy', 'enemy2')
+
+    def __init__(self, game):
+        self.height = game.tilemap.height
+        size = game.tilemap.width * self.height
+        self.grids = {'attack': [set() for _ in range(size)],
+                      'spell': [set() for _ in range(size)]}
+        self.dictionaries = {'attack': {}, 'spell': {}}
+        for unit in game.units:
+            if unit.position and unit.team in self.enemy_teams:
+                self._add_unit(unit)
+
+    def _set(self, positions, mode, nid):
+        grid = self.grids[mode]
+        self.dictionaries[mode][nid] = set()
+        for pos in positions:
+            grid[pos[0] * self.height + pos[1]].add(nid)
+            self.dictionaries[mode][nid].add(pos)
+
+    def _add_unit(self, unit):
+        from app.data.database import DB
+        from app.engine import target_system
+        valid_moves = target_system.get_valid_moves(unit, force=True)
+        if DB.constants.value('zero_move') and unit.ai and not unit.ai_group_active:
+            if DB.ai.get(unit.ai).guard_ai():
+                valid_moves = {unit.position}
+        self._set(target_system.get_possible_attacks(unit, valid_moves), 'attack', unit.nid)
+        self._set(target_system.get_possible_spell_attacks(unit, valid_moves), 'spell', unit.nid)
+
+def legacy_edges(boundary, grid, x, y, red):
+    edges = []
+    for pos in ((x, y - 1), (x - 1, y), (x + 1, y), (x, y + 1)):
+        if not boundary.check_bounds(pos):
+            edges.append(False)
+        elif red:
+            edges.append(any(nid in boundary.displaying_units for nid in grid[pos[0] * boundary.height + pos[1]]))
+        else:
+            edges.append(bool(grid[pos[0] * boundary.height + pos[1]]))
+    top, left, right, bottom = edges
+    return top*8 + left*4 + right*2 + bottom
+
+def legacy_draw(boundary, game, full_size):
+    """
+    Rebuilds the whole boundary surface from grids of unit nids
+    """
+    from app.engine import engine
+    grids = {}
+    for mode in ('attack', 'spell'):
+        grid = [set() for _ in range(boundary.width * boundary.height)]
+        for nid, threat in boundary.threats.items():
+            for idx in getattr(threat, mode):
+                grid[idx].add(nid)
+        grids[mode] = grid
+
+    surf = engine.create_surface(full_size, transparent=True)
+    for grid_name in boundary.draw_order:
+        if grid_name in ('attack', 'spell') and not boundary.displaying_units:
+            continue
+        elif grid_name in ('all_attack', 'all_spell') and not boundary.all_on_flag:
+            continue
+        grid = grids['attack'] if grid_name in ('all_attack', 'attack') else grids['spell']
+        if game.level_vars.get('_fog_of_war'):
+            grid = [{nid for nid in cell if game.board.in_vision(game.get_unit(nid).position)} for cell in grid]
+        for y in range(boundary.height):
+            for x in range(boundary.width):
+                cell = grid[x * boundary.height + y]
+                if not cell:
+                    continue
+                red_display = any(nid in boundary.displaying_units for nid in cell)
+                if grid_name in ('all_attack', 'all_spell') and red_display:
+                    continue
+                if grid_name in ('attack', 'spell') and not red_display:
+                    continue
+                idx = legacy_edges(boundary, grid, x, y, grid_name in ('attack', 'spell'))
+                surf.blit(boundary.create_image(grid_name, idx), (x * TILEWIDTH, y * TILEHEIGHT))
+    return surf
+
+def legacy_draw_fog_of_war(boundary, game, full_size):
+    from app.engine import engine
+    surf = engine.create_surface(full_size, transparent=True)
+    for y in range(boundary.height):
+        for x in range(boundary.width):
+            if not game.board.in_vision((x, y)):
+                if game.level_vars['_fog_of_war'] == 2:
+                    image = boundary.fog_of_war_tile2
+                else:
+                    image = boundary.fog_of_war_tile1
+                surf.blit(image, (x * TILEWIDTH, y * TILEHEIGHT))
+    return surf
+
+def compose(layers, full_size):
+    from app.engine import engine
+    surf = engine.create_surface(full_size)
+    surf.fill((64, 128, 64))
+    surf = surf.convert_alpha()
+    for layer in layers:
+        if layer:
+            surf.blit(layer, (0, 0))
+    return surf
+
+def check(game, boundary):
+    boundary.update()
+    legacy = LegacyBoundary(game)
+    assert set(boundary.threats) == set(legacy.dictionaries['attack']), "Wrong units in boundary"
+    for mode in ('attack', 'spell'):
+        for nid, positions in legacy.dictionaries[mode].items():
+            assert boundary.get_positions(mode, nid) == positions, "%s range of %s differs" % (mode, nid)
+        assert list(boundary.grids[mode]) == [len(nids) for nids in legacy.grids[mode]], "%s counts differ" % mode
+
+@pytest.mark.parametrize('level_nid', ['0', '4'])
+def test_boundary_matches_legacy(start_level, level_nid):
+    """
+    Shuffles units around the level, checking the incremental boundary
+    against the previous one after every move, and after the map changes
+    """
+    from app.engine import target_system
+    game = start_level(level_nid)
+    boundary = game.boundary
+    check(game, boundary)
+
+    rng = random.Random(0)
+    for _ in range(100):
+        # Move somewhere the unit could actually walk to
+        unit = rng.choice([unit for unit in game.units if unit.position])
+        valid_moves = sorted(pos for pos in target_system.get_valid_moves(unit, force=True)
+                             if not game.board.get_unit(pos))
+        if not valid_moves:
+            continue
+        game.leave(unit)
+        unit.position = rng.choice(valid_moves)
+        game.arrive(unit)
+        check(game, boundary)
+
+    game.board.reset_grid(game.tilemap)
+    boundary.reset()
+    check(game, boundary)
+
+@pytest.mark.parametrize('fog_of_war', [0, 2])
+def test_boundary_draws_like_legacy(start_level, max_difference, fog_of_war):
+    """
+    Toggles the enemy ranges shown and moves units around, checking the
+    incrementally drawn boundary and fog of war against redrawing
+    them from scratch the previous way
+    """
+    from app.engine import action, engine, target_system
+    game = start_level('4')
+    if fog_of_war:
+        game.level_vars['_fog_of_war'] = fog_of_war
+        for unit in game.units:
+            if unit.position:
+                action.UpdateFogOfWar(unit).execute()
+    boundary = game.boundary
+    boundary.show()
+    full_size = game.tilemap.width * TILEWIDTH, game.tilemap.height * TILEHEIGHT
+    cull_rect = (0, 0, min(WINWIDTH, full_size[0]), min(WINHEIGHT, full_size[1]))
+    enemies = [unit for unit in game.units if unit.position and unit.team in boundary.enemy_teams]
+
+    rng = random.Random(0)
+    for step in range(12):
+        if step % 2 == 0:
+            boundary.toggle_all_enemy_attacks()
+        if step % 3 == 0 and enemies:
+            boundary.toggle_unit(rng.choice(enemies))
+        if step % 4 == 0:
+            # Move somewhere the unit could actually walk to
+            unit = rng.choice([unit for unit in game.units if unit.position])
+            valid_moves = sorted(pos for pos in target_system.get_valid_moves(unit, force=True)
+                                 if not game.board.get_unit(pos))
+            if valid_moves:
+                game.leave(unit)
+                unit.position = rng.choice(valid_moves)
+                game.arrive(unit)
+                if fog_of_war:
+                    action.UpdateFogOfWar(unit).execute()
+
+        surf = engine.create_surface((WINWIDTH, WINHEIGHT), transparent=True)
+        boundary.draw(surf, full_size, cull_rect)
+        boundary.draw_fog_of_war(surf, full_size, cull_rect)
+        layers = [boundary.surfs['all'] if boundary.all_on_flag else None,
+                  boundary.surfs['unit'] if boundary.displaying_units else None,
+                  boundary.fog_of_war_surf if fog_of_war else None]
+        legacy_layers = [legacy_draw(boundary, game, full_size),
+                         legacy_draw_fog_of_war(boundary, game, full_size) if fog_of_war else None]
+        assert max_difference(compose(layers, full_size), compose(legacy_layers, full_size)) <= 2, \
+            "Drew something different at step %d" % step
@@ -0,0 +1,89 @@
+def unload():
+    """
+    Forgets every loaded combat animation and effect sheet,
+    once any prefetch still going has finished
+    """
+    from app.engine import battle_animation
+    from app.resources.resources import RESOURCES
+    battle_animation.FRAME_CACHE.finish_prefetch()
+    battle_animation.FRAME_CACHE.clear()
+    prefabs = [weapon_anim for combat_anim in RESOURCES.combat_anims for weapon_anim in combat_anim.weapon_anims]
+    for prefab in prefabs + list(RESOURCES.combat_effects):
+        prefab.image = None
+        for frame in prefab.frames:
+            frame.image = None
+
+def start_fight(attacker, defender) -> list:
+    """
+    What the fight would set up, loading whatever isn't loaded yet
+    """
+    from app.engine import battle_animation
+    anims = []
+    for unit in (attacker, defender):
+        anim = battle_animation.get_battle_anim(unit, unit.get_weapon(), get_distance(attacker, defender))
+        anims.append(anim)
+        for effect, palette in battle_animation.get_effects(anim.anim_prefab, anim.palette_name,
+                                                            anim.current_palette, unit, unit.get_weapon()):
+            anims.append(battle_animation.BattleAnimation.get_effect_anim(
+                effect, anim.palette_name, palette, unit, unit.get_weapon()))
+    return anims
+
+def get_distance(attacker, defender) -> int:
+    from app.utilities import utils
+    return utils.calculate_distance(attacker.position, defender.position)
+
+def get_frames(anims, surface_bytes) -> list:
+    return [(anim.anim_prefab.nid, nid, surface_bytes(image))
+            for anim in anims for nid, image in anim.frames.images.items()]
+
+def test_prefetched_fights_match(start_level, surface_bytes, monkeypatch):
+    """
+    Every fight between a player unit and an enemy comes out the same
+    when its animations were prefetched while the forecast was up,
+    whether the prefetch had finished or was still going, and a prefetch
+    cancelled right away, or replaced by a fight with nothing to load,
+    doesn't hold up the next fight
+    """
+    from app.engine import battle_animation
+    game = start_level('4')
+    units = [unit for unit in game.units if unit.position and unit.get_weapon()]
+    fights = []
+    for attacker in units:
+        for defender in units:
+            if attacker.team == 'player' and defender.team != 'player' and \
+                    battle_animation.get_battle_anim_prefab(attacker, attacker.get_weapon(), get_distance(attacker, defender)) and \
+                    battle_animation.get_battle_anim_prefab(defender, defender.get_weapon(), get_distance(attacker, defender)):
+                fights.append((attacker, defender))
+    assert fights
+
+    for idx, (attacker, defender) in enumerate(fights):
+        unload()
+        expected = get_frames(start_fight(attacker, defender), surface_bytes)
+        unload()
+        battle_animation.prefetch(attacker, attacker.get_weapon(), defender, defender.get_weapon(),
+                                  get_distance(attacker, defender))
+        if idx % 2 == 0:
+            battle_animation.FRAME_CACHE.finish_prefetch()
+        actual = get_frames(start_fight(attacker, defender), surface_bytes)
+        assert actual == expected, "%s against %s comes out differently" % (attacker.nid, defender.nid)
+
+    # Backing out of the forecast right away
+    attacker, defender = fights[0]
+    unload()
+    battle_animation.prefetch(attacker, attacker.get_weapon(), defender, defender.get_weapon(),
+                              get_distance(attacker, defender))
+    battle_animation.cancel_prefetch()
+    battle_animation.FRAME_CACHE.finish_prefetch()
+    assert len(battle_animation.FRAME_CACHE.frames) <= 1, "Kept loading after it was cancelled"
+
+    # Moving on to a target with no animation to fight
+    unload()
+    battle_animation.prefetch(attacker, attacker.get_weapon(), defender, defender.get_weapon(),
+                              get_distance(attacker, defender))
+    get_prefab = battle_animation.get_battle_anim_prefab
+    monkeypatch.setattr(battle_animation, 'get_battle_anim_prefab',
+                        lambda unit, *args: None if unit is defender else get_prefab(unit, *args))
+    battle_animation.prefetch(attacker, attacker.get_weapon(), defender, defender.get_weapon(),
+                              get_distance(attacker, defender))
+    battle_animation.FRAME_CACHE.finish_prefetch()
+    assert len(battle_animation.FRAME_CACHE.frames) <= 1, "Kept loading the fight before"
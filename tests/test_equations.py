@@ -0,0 +1,93 @@
+import re
+
+import pytest
+
+# Built on the project's combat formulas, so equations using other
+# equations (and ones only using them sometimes) are covered too
+EXTRA_EQUATIONS = (
+    ('TEST_ATTACK', 'DAMAGE + HIT//10 + CRIT_HIT'),
+    ('TEST_DEFENSE', 'DEFENSE + AVOID//10 + CRIT_AVOID'),
+    ('TEST_POWER', 'TEST_ATTACK * ATTACK_SPEED + TEST_DEFENSE * DEFENSE_SPEED + '
+                   '(HITPOINTS if HITPOINTS > 20 else TEST_ATTACK)'),
+    ('TEST_SCORE', 'TEST_POWER + TEST_ATTACK - TEST_DEFENSE + RATING'),
+    ('TEST_LOOP', 'TEST_LOOP if HITPOINTS < 0 else TEST_ATTACK'),
+)
+
+EXPRESSIONS = ('HIT + 10', 'DAMAGE * 2 - DEFENSE', 'max(STR, MAG) + SKL//2', 'TEST_SCORE // 2')
+
+class LegacyParser():
+    def __init__(self):
+        from app.data.database import DB
+        self.equations = {}
+        for equation in DB.equations.values():
+            if equation.expression:
+                self.equations[equation.nid] = self.tokenize(equation.expression)
+
+        self.replacement_dict = self.create_replacement_dict()
+
+        for nid in list(self.equations.keys()):
+            expression = self.equations[nid]
+            self.fix(nid, expression, self.replacement_dict)
+
+    def tokenize(self, s: str) -> str:
+        return re.split('([^a-zA-Z_])', s)
+
+    def create_replacement_dict(self):
+        from app.data.database import DB
+        dic = {}
+        for stat in DB.stats:
+            dic[stat.nid] = ("(unit.stats['%s'] + unit.stat_bonus('%s'))" % (stat.nid, stat.nid))
+        for nid in self.equations.keys():
+            dic[nid] = ("equations['%s'](equations, unit)" % nid)
+        return dic
+
+    def fix(self, lhs, rhs, dic):
+        rhs = [dic.get(n, n) for n in rhs]
+        rhs = ''.join(rhs)
+        rhs = 'int(%s)' % rhs
+        exec("def %s(equations, unit): return %s" % (lhs, rhs), self.equations)
+
+    def get(self, lhs, unit):
+        if lhs in self.equations:
+            return self.equations[lhs](self.equations, unit)
+        return 0
+
+    def get_expression(self, expr, unit):
+        expr = self.tokenize(expr)
+        expr = [self.replacement_dict.get(n, n) for n in expr]
+        expr = ''.join(expr)
+        expr = 'int(%s)' % expr
+        equations = self.equations
+        return eval(expr)
+
+@pytest.fixture
+def extra_equations(default_project):
+    from app.data.equations import Equation
+    for nid, expression in EXTRA_EQUATIONS:
+        default_project.equations.append(Equation(nid, expression))
+    yield
+    for nid, expression in EXTRA_EQUATIONS:
+        default_project.equations.remove_key(nid)
+
+def test_parser_matches_legacy(start_level, extra_equations):
+    """
+    Every equation and expression comes out the same for every unit
+    as calling into each equation every time it comes up
+    """
+    from app.data.database import DB
+    from app.engine import equations
+    game = start_level('4')
+    units = list(game.units)
+    legacy = LegacyParser()
+    parser = equations.Parser()
+
+    nids = [nid for nid in DB.equations.keys() if nid in legacy.equations]
+    assert 'TEST_LOOP' in nids
+    for nid in nids:
+        assert [parser.get(nid, unit) for unit in units] == [legacy.get(nid, unit) for unit in units], \
+            "%s came out differently" % nid
+    for expr in EXPRESSIONS:
+        # Twice, as the second time it is already compiled
+        for _ in range(2):
+            assert [parser.get_expression(expr, unit) for unit in units] == \
+                [legacy.get_expression(expr, unit) for unit in units], "%s came out differently" % expr
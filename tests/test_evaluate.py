@@ -0,0 +1,141 @@
+import pytest
+
+CONDITIONS = (
+    'unit.team', 'target.team', 'unit1 is unit and unit2 is target', 'item.nid if item else None',
+    'position', 'region', "mode == 'attack'", 'skill.nid if skill else None', 'unit.get_hp() > 10',
+    'game.turncount', "DB.constants.value('line_of_sight')", 'len(game.units)',
+    # Leading spaces and tabs
+    ' unit.team', '\ttarget.team', ' \t unit.nid', '\t\tTrue',
+    # Names a condition can't use
+    'not_a_name', '[u for u in game.units if u.team == unit.team]',
+)
+
+TEXTS = (
+    'True', 'unit.team == "player"', ' unit.team', '\tgame.turncount > 2', ' \t check_pair("A", "B")',
+    '', ' ', 'unit.team ==', 'if True: pass', 'x = 1', 'True\nFalse', '\nTrue', 'True\n', 'un it', 'a\0b',
+)
+
+def legacy_evaluate(string: str, unit1=None, unit2=None, item=None, position=None, region=None, mode=None, skill=None):
+    """
+    The previous evaluate, which gave eval the string and every local
+    """
+    from app.engine import evaluate
+    unit = unit1
+    target = unit2
+
+    def check_pair(s1: str, s2: str) -> bool:
+        if not unit1 or not unit2:
+            return False
+        return (unit1.nid == s1 and unit2.nid == s2) or (unit1.nid == s2 and unit2.nid == s1)
+
+    def check_default(s1: str, t1: tuple) -> bool:
+        if not unit1 or not unit2:
+            return False
+        elif unit1.nid == s1 and unit2.team == 'player':
+            return unit2.nid not in t1
+        elif unit2.nid == s1 and unit1.team == 'player':
+            return unit1.nid not in t1
+        else:
+            return False
+
+    return eval(string, vars(evaluate), locals())
+
+def outcome(func, *args):
+    """
+    What func returns, or the type of error it raises
+    """
+    try:
+        return func(*args)
+    except Exception as e:
+        return type(e)
+
+def legacy_is_valid(text) -> bool:
+    """
+    Whether eval could parse the text, even if it then failed
+    """
+    try:
+        eval(text, {}, {})
+    except (SyntaxError, ValueError):
+        return False
+    except Exception:
+        pass
+    return True
+
+def test_evaluate_matches_legacy(start_level):
+    """
+    Every condition comes out the same, or raises the same error, as
+    handing it to eval with all of evaluate's locals, for each way the
+    game calls evaluate
+    """
+    from app.engine import evaluate
+    game = start_level('4')
+    player = next(unit for unit in game.units if unit.position and unit.team == 'player')
+    enemy = next(unit for unit in game.units if unit.position and unit.team == 'enemy')
+    skill = next((skill for unit in game.units for skill in unit.skills), None)
+    region = game.level.regions[0] if game.level.regions else None
+    calls = [
+        (),
+        (player,),
+        (player, enemy),
+        (enemy, player, enemy.get_weapon(), enemy.position, region, 'defense', skill),
+        (player, enemy, player.get_weapon(), player.position, region, 'attack', skill),
+        (None, enemy),
+    ]
+    conditions = list(CONDITIONS)
+    for unit1, unit2 in ((player, enemy), (enemy, player)):
+        conditions += ['check_pair(%r, %r)' % (unit1.nid, unit2.nid), 'check_pair(%r, %r)' % (unit1.nid, unit1.nid),
+                       "check_pair(%r, 'Nobody')" % unit1.nid,
+                       'check_default(%r, ())' % unit1.nid, 'check_default(%r, (%r,))' % (unit1.nid, unit2.nid),
+                       'check_pair(%r, %r) and unit.team' % (unit1.nid, unit2.nid)]
+
+    for args in calls:
+        for condition in conditions:
+            # Twice, as the second time it is already compiled
+            for _ in range(2):
+                assert outcome(evaluate.evaluate, condition, *args) == outcome(legacy_evaluate, condition, *args), \
+                    "%r came out differently" % condition
+
+def test_get_bindings(default_project):
+    """
+    Only the locals and helpers a condition refers to are bound,
+    each to the argument of evaluate it stands for
+    """
+    from app.engine import evaluate
+    from app.events.event_validators import compile_condition
+    args, helpers = evaluate.get_bindings(compile_condition('unit.team == target.team and item and mode'))
+    assert dict(args) == {'unit': 0, 'target': 1, 'item': 2, 'mode': 5}
+    assert not helpers
+    args, helpers = evaluate.get_bindings(compile_condition('unit1 and unit2 and position and region and skill'))
+    assert dict(args) == {'unit1': 0, 'unit2': 1, 'position': 3, 'region': 4, 'skill': 6}
+    args, helpers = evaluate.get_bindings(compile_condition("check_pair('A', 'B') or check_default('A', ())"))
+    assert not args
+    assert dict(helpers) == {'check_pair': evaluate._check_pair, 'check_default': evaluate._check_default}
+    assert evaluate.get_bindings(compile_condition('game.turncount > 2')) == ((), ())
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_condition_validates_like_eval(default_project, text):
+    """
+    The Condition validator only turns down text that eval couldn't parse
+    """
+    from app.events import event_validators
+    valid = event_validators.Condition().validate(text, None) is not None
+    assert valid == legacy_is_valid(text)
+    if valid:
+        assert event_validators.compile_condition(text) is event_validators.compile_condition(text)
+
+def test_precompile_conditions_reports_invalid(default_project):
+    """
+    Every trigger condition and command condition that can't be
+    parsed is reported, and only those
+    """
+    from app.events import event_commands, event_validators
+    from app.events.event_prefab import EventPrefab
+    first, second = EventPrefab('First'), EventPrefab('Second')
+    first.condition = 'unit.team =='
+    first.commands = [event_commands.parse_text(line) for line in
+                      ('if;game.turncount >', 'speak;Eirika;Hello', 'elif;\tunit.team', 'end')]
+    second.condition = ' \tgame.turncount > 2'
+    second.commands = [event_commands.parse_text(line) for line in ('if;x = 1', 'end')]
+    assert event_validators.precompile_conditions([first, second]) == \
+        ['unit.team ==', 'game.turncount >', 'x = 1']
+    assert event_validators.precompile_conditions([]) == []
@@ -0,0 +1,48 @@
+import random
+
+from app.events.event_prefab import EventCatalog, EventPrefab, all_triggers
+
+def linear_get(catalog, trigger, level_nid):
+    return [event for event in catalog.values() if event.trigger == trigger and
+            (not event.level_nid or event.level_nid == level_nid)]
+
+def build_catalog(num_events, num_levels, seed=0):
+    rng = random.Random(seed)
+    triggers = [trigger.nid for trigger in all_triggers] + ['custom_%d' % i for i in range(20)]
+    levels = [None] + [str(i) for i in range(num_levels)]
+    catalog = EventCatalog()
+    for i in range(num_events):
+        event = EventPrefab('Event %d' % i)
+        event.trigger = rng.choice(triggers)
+        event.level_nid = rng.choice(levels)
+        catalog.append(event)
+    return catalog, triggers, levels[1:]
+
+def check(catalog, triggers, levels):
+    for trigger in triggers + [None]:
+        for level_nid in levels:
+            assert catalog.get(trigger, level_nid) == linear_get(catalog, trigger, level_nid), \
+                "Mismatch for %s in %s" % (trigger, level_nid)
+
+def test_trigger_index_matches_linear_scan():
+    """
+    The trigger index finds the same events as looking through all of
+    them, and stays up to date as the catalog is edited
+    """
+    catalog, triggers, levels = build_catalog(1000, 20)
+    check(catalog, triggers, levels)
+
+    rng = random.Random(1)
+    for num in range(50):
+        event = rng.choice(catalog.values())
+        event.trigger = rng.choice(triggers)
+        catalog.reindex(event)
+        event = rng.choice(catalog.values())
+        event.level_nid = rng.choice(levels)
+        catalog.update_nid(event, event.nid, set_nid=False)
+        catalog.delete(rng.choice(catalog.values()))
+        catalog.move_index(rng.randrange(len(catalog)), rng.randrange(len(catalog)))
+        new_event = EventPrefab('New Event %d' % num)
+        new_event.trigger = rng.choice(triggers)
+        catalog.insert(rng.randrange(len(catalog)), new_event)
+    check(catalog, triggers, levels)
@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+class LegacyFogOfWar():
+    def __init__(self, game):
+        from app.data.database import DB
+        self.game = game
+        self.width, self.height = game.tilemap.width, game.tilemap.height
+        self.grids = {team: [set() for _ in range(self.width * self.height)] for team in DB.teams}
+
+    def update_fow(self, pos, unit, sight_range):
+        from app.engine import target_system
+        grid = self.grids[unit.team]
+        for cell in grid:
+            cell.discard(unit.nid)
+        if pos:
+            positions = target_system.find_manhattan_spheres(range(sight_range + 1), pos[0], pos[1])
+            for x, y in positions:
+                if 0 <= x < self.width and 0 <= y < self.height:
+                    grid[x * self.height + y].add(unit.nid)
+
+    def in_vision(self, pos, team='player') -> bool:
+        from app.data.database import DB
+        from app.engine import line_of_sight
+        game = self.game
+        idx = pos[0] * self.height + pos[1]
+        if team == 'player':
+            if DB.constants.value('fog_los'):
+                if not line_of_sight.simple_check(pos, 'player', game.level_vars.get('_fog_of_war_radius', 0)):
+                    return False
+            return bool(self.grids['player'][idx] or self.grids['other'][idx])
+        else:
+            if DB.constants.value('fog_los'):
+                fog_of_war_radius = game.level_vars.get('_ai_fog_of_war_radius', game.level_vars.get('_fog_of_war_radius', 0))
+                if not line_of_sight.simple_check(pos, team, fog_of_war_radius):
+                    return False
+            return bool(self.grids[team][idx])
+
+def all_vision(board, teams):
+    return [board.in_vision((x, y), team) for team in teams
+            for x in range(board.width) for y in range(board.height)]
+
+@pytest.fixture
+def fog_los(default_project):
+    constant = default_project.constants.get('fog_los')
+    old_value = constant.value
+    constant.set_value(True)
+    yield
+    constant.set_value(old_value)
+
+def test_vision_matches_legacy(start_level, fog_los, monkeypatch):
+    """
+    Moves units around under fog of war with line of sight, checking
+    every tile's vision for every team against the previous way after
+    every move
+    """
+    from app.data.database import DB
+    from app.engine import action, target_system
+    game = start_level('4')
+    game.level_vars['_fog_of_war'] = 1
+    game.level_vars['_fog_of_war_radius'] = 2
+
+    legacy = LegacyFogOfWar(game)
+    update_fow = game.board.update_fow
+    def both_update_fow(pos, unit, sight_range):
+        legacy.update_fow(pos, unit, sight_range)
+        update_fow(pos, unit, sight_range)
+    monkeypatch.setattr(game.board, 'update_fow', both_update_fow)
+    for unit in game.units:
+        if unit.position:
+            action.UpdateFogOfWar(unit).execute()
+
+    teams = list(DB.teams)
+    rng = random.Random(0)
+    for _ in range(50):
+        unit = rng.choice([unit for unit in game.units if unit.position])
+        valid_moves = sorted(pos for pos in target_system.get_valid_moves(unit, force=True)
+                             if not game.board.get_unit(pos))
+        if not valid_moves:
+            continue
+        game.leave(unit)
+        unit.position = rng.choice(valid_moves)
+        game.arrive(unit)
+        action.UpdateFogOfWar(unit).execute()
+        assert all_vision(game.board, teams) == all_vision(legacy, teams), \
+            "Vision differs after %s moved to %s" % (unit.nid, unit.position)
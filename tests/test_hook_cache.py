@@ -0,0 +1,34 @@
+import pytest
+
+def decide(game, unit, think) -> tuple:
+    game.ai.load_unit(unit)
+    while not think():
+        pass
+    target = game.ai.goal_target
+    item = game.ai.goal_item
+    return (game.ai.goal_position, target, item.uid if item else None)
+
+@pytest.fixture
+def ai_hook_cache(default_project):
+    constant = default_project.constants.get('ai_hook_cache')
+    old_value = constant.value
+    constant.set_value(True)
+    yield
+    constant.set_value(old_value)
+
+@pytest.mark.parametrize('num_skills', [0, 5])
+def test_ai_decides_the_same_with_hook_cache(start_level, give_skills, ai_hook_cache, num_skills):
+    """
+    Every enemy decides on the same thing with the hook cache as without,
+    and the cache is actually used
+    """
+    from app.engine import engine, hook_cache
+    game = start_level('4')
+    give_skills(game, num_skills)
+    units = [unit for unit in game.units if unit.position and unit.ai and unit.team in ('enemy', 'enemy2')]
+    hook_cache.reset_counts()
+    # _think is think_for without hook_cache
+    expected = [decide(game, unit, lambda: game.ai._think(engine.get_time())) for unit in units]
+    actual = [decide(game, unit, lambda: game.ai.think_for(engine.get_time())) for unit in units]
+    assert actual == expected, "AI decided differently with the hook cache"
+    assert any(hits for name, hits, misses in hook_cache.get_counts())
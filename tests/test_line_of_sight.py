@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from app.utilities import utils
+
+def legacy_line_of_sight(source_pos, dest_pos, max_range) -> list:
+    from app.engine import line_of_sight
+    all_tiles = {}
+    for pos in dest_pos:
+        all_tiles[pos] = 'lit' if pos in source_pos else 'unknown'
+    for pos, vis in all_tiles.items():
+        if vis == 'unknown':
+            for s_pos in source_pos:
+                if utils.calculate_distance(pos, s_pos) <= max_range and line_of_sight.trace_line(s_pos, pos):
+                    all_tiles[pos] = 'lit'
+                    break
+            else:
+                all_tiles[pos] = 'dark'
+    return [pos for pos in dest_pos if all_tiles[pos] != 'dark']
+
+def check(board, max_range):
+    from app.engine import line_of_sight
+    positions = [(x, y) for x in range(board.width) for y in range(board.height)]
+    for start in positions:
+        for end in positions:
+            if utils.calculate_distance(start, end) <= max_range:
+                assert line_of_sight.get_line(start, end) == line_of_sight.trace_line(start, end), \
+                    "Line from %s to %s differs" % (start, end)
+
+def get_searches(game, enemies, max_range) -> list:
+    """
+    What get_possible_attacks checks for a weapon with a range of 1 to max_range
+    """
+    from app.engine import target_system
+    searches = []
+    for unit in enemies:
+        valid_moves = target_system.get_valid_moves(unit, force=True)
+        attacks = target_system.get_shell(valid_moves, range(1, max_range + 1), game.tilemap.width, game.tilemap.height)
+        searches.append((valid_moves, attacks))
+    return searches
+
+@pytest.fixture
+def line_of_sight_on(default_project):
+    constant = default_project.constants.get('line_of_sight')
+    old_value = constant.value
+    constant.set_value(True)
+    yield
+    constant.set_value(old_value)
+
+def test_line_of_sight_matches_legacy(start_level, line_of_sight_on):
+    """
+    The memoized lines are the same as tracing every line, before and
+    after the map's opacity changes, and so is what each enemy can see
+    """
+    from app.data.database import DB
+    from app.engine import line_of_sight
+    game = start_level('4')
+    max_range = 6
+
+    # Make sure there is something to block the lines
+    rng = random.Random(0)
+    opaque = [terrain.nid for terrain in DB.terrain if terrain.opaque]
+    clear = [terrain.nid for terrain in DB.terrain if not terrain.opaque]
+    layer = game.tilemap.layers[0]
+    if opaque:
+        for pos in rng.sample(sorted(layer.terrain), len(layer.terrain) // 8):
+            layer.terrain[pos] = rng.choice(opaque)
+    game.board.reset_grid(game.tilemap)
+    check(game.board, max_range)
+
+    # Changing the map's opacity invalidates the cache
+    for pos in rng.sample(sorted(layer.terrain), len(layer.terrain) // 8):
+        layer.terrain[pos] = rng.choice(opaque + clear)
+    game.board.reset_grid(game.tilemap)
+    check(game.board, max_range)
+
+    enemies = [unit for unit in game.units if unit.position and unit.team in ('enemy', 'enemy2')]
+    for valid_moves, attacks in get_searches(game, enemies, max_range):
+        assert line_of_sight.line_of_sight(valid_moves, attacks, max_range) == \
+            legacy_line_of_sight(valid_moves, attacks, max_range)
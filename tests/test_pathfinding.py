@@ -0,0 +1,195 @@
+import heapq
+import random
+
+import pytest
+
+from app.engine import pathfinding
+from app.utilities import utils
+
+class Node():
+    __slots__ = ['reachable', 'cost', 'x', 'y', 'parent', 'g', 'h', 'f']
+
+    def __init__(self, x: int, y: int, reachable: bool, cost: float):
+        self.reachable = reachable
+        self.cost = cost
+        self.x = x
+        self.y = y
+        self.reset()
+
+    def reset(self):
+        self.parent = None
+        self.g = 0
+        self.h = 0
+        self.f = 0
+
+    def __gt__(self, n):
+        return self.cost > n
+
+    def __lt__(self, n):
+        return self.cost < n
+
+def _adjacent(cells, cell, width, height):
+    adj = []
+    if cell.y < height - 1:
+        adj.append(cells[cell.x * height + cell.y + 1])
+    if cell.x < width - 1:
+        adj.append(cells[(cell.x + 1) * height + cell.y])
+    if cell.x > 0:
+        adj.append(cells[(cell.x - 1) * height + cell.y])
+    if cell.y > 0:
+        adj.append(cells[cell.x * height + cell.y - 1])
+    return adj
+
+def _can_move_through(board, adj, height, unit_team, ally_block=False):
+    other_team = next(iter(board.team_grid[adj.x * height + adj.y]), None)
+    if not other_team:
+        return True
+    if not ally_block and utils.compare_teams(unit_team, other_team):
+        return True
+    return False
+
+def legacy_djikstra(start_pos, cells, width, height, unit_team, board, movement_left):
+    for cell in cells:
+        cell.reset()
+    open_heap, closed = [], set()
+    start_cell = cells[start_pos[0] * height + start_pos[1]]
+    heapq.heappush(open_heap, (start_cell.g, start_cell))
+    while open_heap:
+        g, cell = heapq.heappop(open_heap)
+        if g > movement_left:
+            return {(c.x, c.y) for c in closed}
+        closed.add(cell)
+        for adj in _adjacent(cells, cell, width, height):
+            if adj.reachable and adj not in closed:
+                if _can_move_through(board, adj, height, unit_team):
+                    if (adj.g, adj) in open_heap:
+                        if adj.g > cell.g + adj.cost:
+                            adj.g = cell.g + adj.cost
+                            adj.parent = cell
+                            heapq.heappush(open_heap, (adj.g, adj))
+                    else:
+                        adj.g = cell.g + adj.cost
+                        adj.parent = cell
+                        heapq.heappush(open_heap, (adj.g, adj))
+    return {(c.x, c.y) for c in closed}
+
+def legacy_astar(start_pos, goal_pos, cells, width, height, unit_team, board,
+                 adj_good_enough=False, ally_block=False, limit=None):
+    for cell in cells:
+        cell.reset()
+    open_heap, closed = [], set()
+    start_cell = cells[start_pos[0] * height + start_pos[1]]
+    end_cell = cells[goal_pos[0] * height + goal_pos[1]]
+    adj_end = _adjacent(cells, end_cell, width, height)
+
+    def heuristic(cell):
+        dx1 = cell.x - end_cell.x
+        dy1 = cell.y - end_cell.y
+        dx2 = start_cell.x - end_cell.x
+        dy2 = start_cell.y - end_cell.y
+        return abs(dx1) + abs(dy1) + abs(dx1 * dy2 - dx2 * dy1) * .001
+
+    def update(adj, cell):
+        adj.g = cell.g + adj.cost
+        adj.h = heuristic(adj)
+        adj.parent = cell
+        adj.f = adj.h + adj.g
+
+    heapq.heappush(open_heap, (start_cell.f, start_cell))
+    while open_heap:
+        f, cell = heapq.heappop(open_heap)
+        closed.add(cell)
+        if limit is not None and cell.f > limit + 1:
+            return []
+        if cell is end_cell or (adj_good_enough and cell in adj_end):
+            path = []
+            while cell:
+                path.append((cell.x, cell.y))
+                cell = cell.parent
+            return path
+        for adj in _adjacent(cells, cell, width, height):
+            if adj.reachable and adj not in closed:
+                if _can_move_through(board, adj, height, unit_team, ally_block):
+                    if (adj.f, adj) in open_heap:
+                        if adj.g > cell.g + adj.cost:
+                            update(adj, cell)
+                            heapq.heappush(open_heap, (adj.f, adj))
+                    else:
+                        update(adj, cell)
+                        heapq.heappush(open_heap, (adj.f, adj))
+    return []
+
+class SyntheticBoard():
+    def __init__(self, width, height, num_units, seed):
+        rng = random.Random(seed)
+        self.width, self.height = width, height
+        # Mostly plains, some rough terrain, some walls
+        self.grid = []
+        for x in range(width):
+            for y in range(height):
+                cost = rng.choices((1, 2, 3, 99), weights=(70, 15, 5, 10))[0]
+                self.grid.append(Node(x, y, cost < 99, cost))
+        self.team_grid = [[] for _ in range(width * height)]
+        self.units = []
+        open_tiles = [(n.x, n.y) for n in self.grid if n.reachable]
+        for pos in rng.sample(open_tiles, num_units):
+            team = rng.choice(('player', 'enemy', 'other'))
+            self.team_grid[pos[0] * height + pos[1]].append(team)
+            self.units.append((pos, team))
+
+    def in_vision(self, pos, team='player') -> bool:
+        return True
+
+@pytest.mark.parametrize('width, height, num_units, movement', [
+    (20, 20, 10, 5), (40, 40, 25, 6), (64, 64, 40, 8), (64, 64, 40, 99)])
+def test_search_matches_legacy(width, height, num_units, movement):
+    """
+    Djikstra and AStar find the same move sets and paths as before
+    """
+    board = SyntheticBoard(width, height, num_units, seed=0)
+    grid = board.grid
+    rng = random.Random(0)
+    open_tiles = [(n.x, n.y) for n in grid if n.reachable]
+    for pos, team in board.units:
+        goal = rng.choice(open_tiles)
+        old = legacy_djikstra(pos, grid, width, height, team, board, movement)
+        new = pathfinding.Djikstra(pos, grid, width, height, team, False, False).process(board, movement)
+        assert old == new, "Move sets differ from %s" % (pos,)
+        for adj_good_enough, ally_block, limit in ((False, False, None), (True, False, None), (True, True, 2 * movement)):
+            old = legacy_astar(pos, goal, grid, width, height, team, board, adj_good_enough, ally_block, limit)
+            new = pathfinding.AStar(pos, goal, grid, width, height, team).process(
+                board, adj_good_enough=adj_good_enough, ally_block=ally_block, limit=limit)
+            assert old == new, "Paths differ from %s to %s" % (pos, goal)
+
+def path_cost(board, path) -> float:
+    # The start tile is never paid for
+    return sum(board.grid[x * board.height + y].cost for x, y in path[:-1])
+
+@pytest.mark.parametrize('width, height, num_units, limit', [
+    (20, 20, 10, 5), (40, 40, 50, 12), (40, 40, 50, 99), (64, 64, 40, 8)])
+def test_distance_field_matches_astar(width, height, num_units, limit):
+    """
+    Every target's path from the one distance field is as short as what
+    AStar finds for that target alone. AStar's limit cuts off on the tiles
+    along the way as well as where the path ends up, so at the very edge
+    of the limit it sometimes gives up on a path the field still finds
+    """
+    board = SyntheticBoard(width, height, num_units, seed=width + limit)
+    for pos, team in board.units:
+        pathfinder = pathfinding.Djikstra(pos, board.grid, width, height, team, False, False)
+        field = pathfinder.get_distance_field(board, limit + 1)
+        reached = {divmod(idx, height) for idx in field.dist}
+        assert reached == pathfinder.process(board, limit + 1)
+        for goal, _ in board.units:
+            for adj_good_enough in (False, True):
+                expected = pathfinding.AStar(pos, goal, board.grid, width, height, team) \
+                    .process(board, adj_good_enough=adj_good_enough, ally_block=False, limit=limit)
+                path = field.get_path_to(goal, adj_good_enough, limit)
+                if expected:
+                    assert path, "No path from %s to %s" % (pos, goal)
+                    assert path_cost(board, path) == path_cost(board, expected), "From %s to %s" % (pos, goal)
+                if path:
+                    assert path[-1] == pos
+                    assert path[0] == goal or (adj_good_enough and utils.calculate_distance(path[0], goal) == 1)
+                    assert path_cost(board, path) == field.get_distance(path[0])
+                    assert path_cost(board, path) <= limit + 1
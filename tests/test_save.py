@@ -0,0 +1,96 @@
+import os
+import pickle
+
+def test_remove_unused_files(default_project, tmp_path, monkeypatch):
+    """
+    Chunks and action log journals no save refers to are deleted
+    """
+    from app.engine import save
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(save.CHUNK_DIR)
+    files = {
+        'used_chunk': save.CHUNK_DIR + 'used.pchunk',
+        'unused_chunk': save.CHUNK_DIR + 'unused.pchunk',
+        'used_journal': 'saves/LT-action_log-0.plog',
+        'old_save_journal': 'saves/LT-action_log-1.plog',
+        'unused_journal': 'saves/LT-action_log-2.plog',
+    }
+    for fn in files.values():
+        with open(fn, 'wb') as fp:
+            fp.write(b'data')
+    saves = {
+        'saves/LT-0.p': {'chunks': {'units': 'used'},
+                         'action_log': {'journal': files['used_journal'], 'size': 4, 'first_free_action': -1}},
+        # Saved before chunks were used
+        'saves/LT-1.p': {'action_log': {'journal': files['old_save_journal'], 'size': 4, 'first_free_action': -1}},
+        # Saved before the action log had its own journal
+        'saves/LT-2.p': {'action_log': ([], -1)},
+    }
+    for save_loc, s_dict in saves.items():
+        with open(save_loc, 'wb') as fp:
+            pickle.dump(s_dict, fp)
+
+    save.remove_unused_files()
+    remaining = {name for name, fn in files.items() if os.path.exists(fn)}
+    assert remaining == {'used_chunk', 'used_journal', 'old_save_journal'}
+
+def test_unreadable_save_keeps_files(default_project, tmp_path, monkeypatch):
+    """
+    Nothing is deleted when a save can't be read, since it could be using any of it
+    """
+    from app.engine import save
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(save.CHUNK_DIR)
+    files = [save.CHUNK_DIR + 'unknown.pchunk', 'saves/LT-action_log-0.plog']
+    for fn in files:
+        with open(fn, 'wb') as fp:
+            fp.write(b'data')
+    with open('saves/LT-0.p', 'wb') as fp:
+        fp.write(b'not a pickle')
+
+    save.remove_unused_files()
+    assert all(os.path.exists(fn) for fn in files)
+
+def test_saves_load_back_the_same(start_level, play, tmp_path, monkeypatch):
+    """
+    Every save the game makes over a few turns, written again into an
+    empty saves folder, loads back the same, and the saves share chunks
+    """
+    from app.engine import save
+    game = start_level('4')
+    # Keep a copy of every save the game makes, as it was at the time
+    saves = []
+    def record(s_dict, meta_dict, old_slot, slot, force_loc=None, name=None):
+        s_dict = pickle.loads(pickle.dumps(s_dict))
+        if name:
+            save_loc = 'saves/' + name + '.p'
+        elif force_loc:
+            save_loc = 'saves/' + save.GAME_NID + '-' + force_loc + '.p'
+        else:
+            save_loc = 'saves/' + save.GAME_NID + '-' + str(slot) + '.p'
+        saves.append(((s_dict, meta_dict, old_slot, slot, force_loc, name), save_loc))
+    save_io = save.save_io
+    monkeypatch.setattr(save, 'save_io', record)
+
+    save.suspend_game(game, 'start', slot=0)
+    save.SAVE_THREAD.join()
+    turncount = game.turncount
+    def suspend_every_turn(game):
+        nonlocal turncount
+        if game.turncount != turncount:
+            turncount = game.turncount
+            save.suspend_game(game, 'suspend')
+            save.SAVE_THREAD.join()
+    play(game, 2, suspend_every_turn)
+    assert len(saves) > 2
+
+    monkeypatch.chdir(tmp_path)
+    os.mkdir('saves')
+    for args, save_loc in saves:
+        save_io(*args)
+        assert save.read_save(save_loc) == args[0], "%s loads differently" % save_loc
+    # The restart and preload saves are copies of the start
+    start_save = saves[0][0][0]
+    assert save.read_save('saves/%s-restart0.p' % save.GAME_NID) == start_save
+    assert save.read_save('saves/%s-preload-4-0.p' % save.GAME_NID) == start_save
+    assert len(os.listdir(save.CHUNK_DIR)) < len(saves) * len(save.CHUNK_KEYS)
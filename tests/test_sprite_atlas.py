@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+
+import pygame
+
+def test_sprites_come_out_unchanged(default_project, surface_bytes, tmp_path):
+    """
+    Every sprite packed into the atlas comes back out of it unchanged
+    """
+    from app.engine import engine
+    from app.sprites import SPRITES
+    from utilities.build_sprite_atlas import build
+
+    atlas_image, index = build(SPRITES)
+    assert index
+    image_path = str(tmp_path / '_atlas.png')
+    engine.save_surface(atlas_image, image_path)
+    atlas_image = pygame.image.load(image_path)
+    for nid, entry in index.items():
+        original = pygame.image.load(SPRITES[nid].full_path)
+        packed = atlas_image.subsurface(entry['rect'])
+        assert surface_bytes(original) == surface_bytes(packed), \
+            "%s changed in the atlas" % nid
+
+def test_atlas_skips_edited_sprites(default_project, surface_bytes, tmp_path):
+    """
+    Sprites come out of the atlas unchanged, until their file is edited,
+    even if the edit keeps it the same size
+    """
+    from app.engine import engine, sprites
+    from app.sprites import SPRITES, BasicSprite
+    from utilities.build_sprite_atlas import build
+
+    nid = 'menu_bg_base'
+    path = str(tmp_path / (nid + '.png'))
+    # Keeps the modified time, so it matches the original's stamp
+    shutil.copy2(SPRITES[nid].full_path, path)
+    sprite = BasicSprite(path)
+    atlas_image, index = build({nid: sprite})
+    assert nid in index
+    image_path, index_path = str(tmp_path / '_atlas.png'), str(tmp_path / '_atlas.json')
+    engine.save_surface(atlas_image, image_path)
+    with open(index_path, 'w') as fp:
+        json.dump(index, fp)
+
+    atlas = sprites.SpriteAtlas(image_path, index_path)
+    image = atlas.get(nid, sprite)
+    assert image is not None
+    assert surface_bytes(image) == surface_bytes(engine.image_load(path))
+
+    size = os.path.getsize(path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert os.path.getsize(path) == size
+    assert atlas.get(nid, sprite) is None
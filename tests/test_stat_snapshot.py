@@ -0,0 +1,118 @@
+import itertools
+
+import pytest
+
+def check(game):
+    """
+    Every unit's stat bonus snapshot matches the uncached path,
+    and so does every equation
+    """
+    from app.data.database import DB
+    from app.engine import equations, skill_system
+    from app.engine.objects.unit import UnitObject
+    for unit in game.units:
+        for stat_nid in DB.stats.keys():
+            assert unit.stat_bonus(stat_nid) == skill_system._stat_change(unit, stat_nid), \
+                "%s has a different %s bonus" % (unit.nid, stat_nid)
+
+    parser = equations.parser
+    nids = [nid for nid in parser.equations if not nid.startswith('__')]
+    actual = [parser.get(nid, unit) for unit in game.units for nid in nids]
+    stat_bonus, get_stat = UnitObject.stat_bonus, UnitObject.get_stat
+    UnitObject.stat_bonus = skill_system._stat_change
+    UnitObject.get_stat = lambda self, stat_nid: self.stats.get(stat_nid, 0) + skill_system._stat_change(self, stat_nid)
+    try:
+        expected = [parser.get(nid, unit) for unit in game.units for nid in nids]
+    finally:
+        UnitObject.stat_bonus, UnitObject.get_stat = stat_bonus, get_stat
+    assert actual == expected, "Equations came out differently"
+
+def forecast(game) -> list:
+    """
+    What the combat forecast would show for every enemy attacking every player unit
+    """
+    from app.engine import combat_calcs
+    results = []
+    units = [unit for unit in game.units if unit.position]
+    for unit in units:
+        if unit.team not in ('enemy', 'enemy2') or not unit.get_weapon():
+            continue
+        item = unit.get_weapon()
+        for target in units:
+            if target.team != 'player':
+                continue
+            def_item = target.get_weapon()
+            results.append((combat_calcs.compute_hit(unit, target, item, def_item, 'attack'),
+                            combat_calcs.compute_crit(unit, target, item, def_item, 'attack'),
+                            combat_calcs.compute_damage(unit, target, item, def_item, 'attack'),
+                            combat_calcs.outspeed(unit, target, item, def_item, 'attack')))
+    return results
+
+@pytest.mark.parametrize('num_skills, num_turns, every', [(0, 2, 1), (5, 1, 10)])
+def test_snapshot_matches_uncached_during_play(start_level, give_skills, play, num_skills, num_turns, every):
+    """
+    Checked after every frame (or every few, with many skills to work
+    through), so in the middle of moves and combat too, and the combat
+    forecast comes out the same either way at the end
+    """
+    from app.engine import skill_system
+    from app.engine.objects.unit import UnitObject
+    game = start_level('4')
+    give_skills(game, num_skills)
+    frames = itertools.count()
+    def check_every(game):
+        if next(frames) % every == 0:
+            check(game)
+    play(game, num_turns, check_every)
+
+    actual = forecast(game)
+    stat_bonus, get_stat = UnitObject.stat_bonus, UnitObject.get_stat
+    UnitObject.stat_bonus = skill_system._stat_change
+    UnitObject.get_stat = lambda self, stat_nid: self.stats.get(stat_nid, 0) + skill_system._stat_change(self, stat_nid)
+    try:
+        expected = forecast(game)
+    finally:
+        UnitObject.stat_bonus, UnitObject.get_stat = stat_bonus, get_stat
+    assert actual == expected, "Combat forecast came out differently"
+
+@pytest.fixture
+def position_skill(default_project):
+    """
+    A skill that gives +5 STR while its unit stands on an even column
+    """
+    from app.data.skills import SkillPrefab
+    prefab = SkillPrefab.restore({
+        'nid': '_Test_Even_Column', 'name': 'Even Column', 'desc': '',
+        'icon_nid': None, 'icon_index': (0, 0),
+        'components': [('stat_change', [['STR', 5]]),
+                       ('condition', 'unit.position and unit.position[0] % 2 == 0')]})
+    default_project.skills.append(prefab)
+    yield prefab.nid
+    default_project.skills.remove_key(prefab.nid)
+
+def test_snapshot_follows_each_step(start_level, position_skill):
+    """
+    Moving a step at a time, the position dependent bonus changes with every step
+    """
+    from app.engine import engine, item_funcs, skill_system, target_system
+    game = start_level('4')
+    unit = next(unit for unit in game.units if unit.team == 'player' and unit.position)
+    unit.skills.append(item_funcs.create_skill(unit, position_skill))
+    x, y = unit.position
+    # Along a row, so every step changes the column
+    goal = max((pos for pos in target_system.get_valid_moves(unit, force=True) if pos[1] == y),
+               key=lambda pos: abs(pos[0] - x))
+    path = target_system.get_path(unit, goal)
+    assert len(path) > 2
+
+    game.movement.begin_move(unit, path)
+    bonuses = set()
+    time = engine.constants['current_time']
+    while game.movement.moving_units.get(unit.nid):
+        time += 1000
+        engine.constants['current_time'] = time
+        game.movement.update()
+        assert unit.stat_bonus('STR') == skill_system._stat_change(unit, 'STR'), \
+            "Stale STR bonus at %s" % (unit.position, )
+        bonuses.add(unit.stat_bonus('STR'))
+    assert len(bonuses) == 2
@@ -0,0 +1,61 @@
+import random
+
+def legacy_find_manhattan_spheres(rng, x, y) -> set:
+    main_set = set()
+    for r in rng:
+        for i in range(-r, r + 1):
+            magn = abs(i)
+            main_set.add((x + i, y + r - magn))
+            main_set.add((x + i, y - r + magn))
+    return main_set
+
+def legacy_get_shell(valid_moves, potential_range, width, height) -> set:
+    valid_attacks = set()
+    for valid_move in valid_moves:
+        valid_attacks |= legacy_find_manhattan_spheres(potential_range, valid_move[0], valid_move[1])
+    return {pos for pos in valid_attacks if 0 <= pos[0] < width and 0 <= pos[1] < height}
+
+def legacy_get_possible_attacks(unit, valid_moves) -> set:
+    from app.data.database import DB
+    from app.engine import item_funcs, line_of_sight, target_system
+    from app.engine.game_state import game
+    attacks = set()
+    max_range = 0
+    for item in target_system.get_all_weapons(unit):
+        item_range = item_funcs.get_range(unit, item)
+        max_range = max(max_range, max(item_range))
+        if max_range >= 99:
+            attacks = {(x, y) for x in range(game.tilemap.width) for y in range(game.tilemap.height)}
+        else:
+            attacks |= legacy_get_shell(valid_moves, item_range, game.tilemap.width, game.tilemap.height)
+    if DB.constants.value('line_of_sight'):
+        attacks = set(line_of_sight.line_of_sight(valid_moves, attacks, max_range))
+    return attacks
+
+def check(rng, width, height, num_checks=2000):
+    from app.engine import target_system
+    for _ in range(num_checks):
+        # Include ranges of 0 and positions off the map
+        potential_range = set(rng.sample(range(0, 8), rng.randint(1, 4)))
+        x, y = rng.randint(-3, width + 2), rng.randint(-3, height + 2)
+        assert target_system.find_manhattan_spheres(potential_range, x, y) == \
+            legacy_find_manhattan_spheres(potential_range, x, y)
+        valid_moves = {(rng.randint(-2, width + 1), rng.randint(-2, height + 1)) for _ in range(rng.randint(0, 30))}
+        assert target_system.get_shell(valid_moves, potential_range, width, height) == \
+            legacy_get_shell(valid_moves, potential_range, width, height), \
+            "Shell of range %s differs" % potential_range
+
+def test_target_system_matches_legacy(start_level):
+    """
+    Shells and manhattan spheres from the memoized tables are the same as
+    building every sphere from scratch, and so is what each enemy can attack
+    """
+    from app.engine import target_system
+    game = start_level('4')
+    check(random.Random(0), game.tilemap.width, game.tilemap.height)
+
+    for unit in game.units:
+        if unit.position and unit.team in ('enemy', 'enemy2'):
+            valid_moves = target_system.get_valid_moves(unit, force=True)
+            assert target_system.get_possible_attacks(unit, valid_moves) == \
+                legacy_get_possible_attacks(unit, valid_moves), "Attacks of %s differ" % unit.nid
@@ -0,0 +1,137 @@
+import os
+import shutil
+import time
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+def legacy_icons(tile_model, map_sprite_model, editor_utilities) -> dict:
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QPixmap
+    from app.constants import WINWIDTH, WINHEIGHT
+    from app.resources.resources import RESOURCES
+    icons = {}
+    for tilemap in RESOURCES.tilemaps:
+        icons[('tilemap', tilemap.nid)] = tile_model.create_tilemap_pixmap(tilemap) \
+            .scaled(96, 96, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    for map_sprite in RESOURCES.map_sprites:
+        pixmap = QPixmap(map_sprite.stand_full_path)
+        icons[('map_sprite', map_sprite.nid)] = map_sprite_model.get_basic_icon(pixmap, 0)
+    for portrait in RESOURCES.portraits:
+        chibi = QPixmap(portrait.full_path).copy(96, 16, 32, 32)
+        icons[('portrait', portrait.nid)] = QPixmap.fromImage(editor_utilities.convert_colorkey(chibi.toImage()))
+    for panorama in RESOURCES.panoramas:
+        for num, path in enumerate(panorama.get_all_paths()):
+            pixmap = QPixmap(path)
+            if pixmap.width() > WINWIDTH or pixmap.height() > WINHEIGHT:
+                pixmap = pixmap.scaled(WINWIDTH, WINHEIGHT, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            icons[('panorama', (panorama.nid, num))] = pixmap
+    return icons
+
+def thumbnails(tile_model, map_sprite_model, portrait_model, panorama_model) -> dict:
+    from app.resources.resources import RESOURCES
+    icons = {}
+    for tilemap in RESOURCES.tilemaps:
+        icons[('tilemap', tilemap.nid)] = tile_model.get_tilemap_thumbnail(tilemap)
+    for map_sprite in RESOURCES.map_sprites:
+        icons[('map_sprite', map_sprite.nid)] = map_sprite_model.get_map_sprite_thumbnail(map_sprite, 0)
+    for portrait in RESOURCES.portraits:
+        icons[('portrait', portrait.nid)] = portrait_model.get_chibi_thumbnail(portrait)
+    for panorama in RESOURCES.panoramas:
+        for num in range(len(panorama.get_all_paths())):
+            icons[('panorama', (panorama.nid, num))] = panorama_model.get_panorama_thumbnail(panorama, num)
+    return icons
+
+def make_pixmap(num):
+    from PyQt5.QtGui import QColor, QPixmap
+    pixmap = QPixmap(32, 32)
+    pixmap.fill(QColor(num % 256, num // 256, 0))
+    return pixmap
+
+def test_thumbnail_cache_stays_under_max_size(qapp, tmp_path):
+    """
+    Old thumbnails are deleted once the directory grows too large, the
+    ones read from disk most recently staying
+    """
+    from app.editor.thumbnails import ThumbnailCache
+    cache = ThumbnailCache(str(tmp_path))
+    cache.get('portrait', 'used', 'used', lambda: make_pixmap(0))
+    file_size = cache.get_size()
+    cache.max_size = file_size * 20
+    used_path = next(path for _, _, path in cache.get_files())
+    os.utime(used_path, ns=(0, 0))
+
+    for num in range(1, 50):
+        # Modified times are only so precise
+        time.sleep(0.01)
+        cache.get('portrait', str(num), str(num), lambda: make_pixmap(num))
+        if num % 5 == 0:
+            # Asked for again by a newly opened editor
+            cache.memory.clear()
+            cache.get('portrait', 'used', 'used', lambda: make_pixmap(0))
+            assert cache.counts['disk'] == num // 5
+        assert cache.get_size() <= cache.max_size
+        assert cache.size == cache.get_size()
+    assert os.path.exists(used_path)
+    # The first ones made haven't been used since
+    cache.memory.clear()
+    cache.counts.clear()
+    cache.get('portrait', '1', '1', lambda: make_pixmap(1))
+    assert cache.counts['made'] == 1
+
+def test_thumbnails_match_legacy_icons(default_project, qt_image_bytes, tmp_path, monkeypatch):
+    """
+    The thumbnails of every tilemap, map sprite, portrait and panorama
+    come out the same as the icons drawn from their source every time,
+    made, read back from disk by a newly opened editor, or from memory,
+    and changing a source file makes a new thumbnail
+    """
+    from PyQt5.QtGui import QImageReader
+    import app.editor.utilities as editor_utilities
+    from app.constants import WINWIDTH, WINHEIGHT
+    from app.editor import thumbnails as thumbnails_module
+    from app.editor.tile_editor import tile_model
+    from app.editor.map_sprite_editor import map_sprite_model
+    from app.editor.portrait_editor import portrait_model
+    from app.editor.panorama_editor import panorama_model
+    from app.resources.resources import RESOURCES
+    models = tile_model, map_sprite_model, portrait_model, panorama_model
+    cache = thumbnails_module.ThumbnailCache(str(tmp_path))
+    monkeypatch.setattr(thumbnails_module, 'THUMBNAILS', cache)
+    for model in models:
+        if hasattr(model, 'THUMBNAILS'):
+            monkeypatch.setattr(model, 'THUMBNAILS', cache)
+    tile_model.forget_tilemap_thumbnails()
+
+    expected = legacy_icons(tile_model, map_sprite_model, editor_utilities)
+    # Panoramas that don't need scaling down are only kept in memory
+    memory_only = sum(1 for panorama in RESOURCES.panoramas for path in panorama.get_all_paths()
+                      if QImageReader(path).size().width() <= WINWIDTH and
+                      QImageReader(path).size().height() <= WINHEIGHT)
+    for name in ('made', 'disk', 'memory'):
+        if name == 'disk':
+            # A newly opened editor
+            cache.memory.clear()
+            tile_model.forget_tilemap_thumbnails()
+        cache.counts.clear()
+        icons = thumbnails(*models)
+        if name == 'made':
+            assert not cache.counts['memory']
+        elif name == 'disk':
+            assert cache.counts['disk'] == len(expected) - memory_only
+        elif name == 'memory':
+            assert cache.counts['memory'] == len(expected)
+        for key, pixmap in expected.items():
+            assert qt_image_bytes(icons[key]) == qt_image_bytes(pixmap), "%s %s comes out differently from %s" % (key[0], key[1], name)
+
+    # Changing a portrait's image makes a new thumbnail
+    portrait = RESOURCES.portraits[0]
+    path = str(tmp_path / 'portrait.png')
+    shutil.copy(portrait.full_path, path)
+    monkeypatch.setattr(portrait, 'full_path', path)
+    portrait_model.get_chibi_thumbnail(portrait)
+    cache.counts.clear()
+    os.utime(path, ns=(0, 0))
+    portrait_model.get_chibi_thumbnail(portrait)
+    assert cache.counts['made'] == 1, "Changed portrait wasn't remade"
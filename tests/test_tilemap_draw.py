@@ -0,0 +1,70 @@
+import random
+
+from app.constants import TILEWIDTH, TILEHEIGHT, WINWIDTH, WINHEIGHT, COLORKEY
+
+FRAME_TIME = 16
+CAMERA_SPEED = 4  # Pixels a frame
+
+def legacy_get_full_image(tilemap, cull_rect):
+    from app.engine import engine
+    image = engine.create_surface((cull_rect[2], cull_rect[3]))
+    engine.set_colorkey(image, COLORKEY)
+    for layer in tilemap.layers:
+        if (layer.visible or layer.state == 'fade_out') and \
+                layer.should_draw(cull_rect):
+            main_image = layer.get_image(cull_rect)
+            image.blit(main_image, (0, 0))
+            autotile_image = layer.get_autotile_image(cull_rect)
+            if autotile_image:
+                image.blit(autotile_image, (0, 0))
+    return image
+
+def camera_path(tilemap, num_frames, rng) -> list:
+    """
+    Where the camera is each frame, panning from one tile to the next
+    and sometimes waiting there
+    """
+    max_x = max(0, tilemap.width * TILEWIDTH - WINWIDTH)
+    max_y = max(0, tilemap.height * TILEHEIGHT - WINHEIGHT)
+    x = y = 0
+    path = []
+    while len(path) < num_frames:
+        target_x = min(max_x, rng.randint(0, tilemap.width) * TILEWIDTH)
+        target_y = min(max_y, rng.randint(0, tilemap.height) * TILEHEIGHT)
+        while (x, y) != (target_x, target_y):
+            x += max(-CAMERA_SPEED, min(CAMERA_SPEED, target_x - x))
+            y += max(-CAMERA_SPEED, min(CAMERA_SPEED, target_y - y))
+            path.append((x, y))
+        path += [(x, y)] * rng.randint(0, 60)
+    return path[:num_frames]
+
+def test_full_image_matches_legacy(default_project, surface_bytes):
+    """
+    While the camera pans around, the autotiles animate and layers are
+    shown and hidden, every frame comes out the same as compositing
+    every layer onto a new surface, and most frames reuse the last one
+    """
+    from app.engine import engine
+    from app.engine.objects import tilemap as tilemap_module
+    from app.resources.resources import RESOURCES
+    tilemap = tilemap_module.TileMapObject.from_prefab(RESOURCES.tilemaps.get('Chapter 4'))
+    rng = random.Random(0)
+    path = camera_path(tilemap, 600, rng)
+    other_layers = [layer for layer in tilemap.layers if layer.nid != 'base']
+
+    tilemap_module.reset_draw_counts()
+    for frame, (x, y) in enumerate(path):
+        engine.constants['current_time'] = frame * FRAME_TIME
+        if other_layers and frame % 90 == 0:
+            layer = rng.choice(other_layers)
+            if layer.visible:
+                layer.hide()
+            else:
+                layer.show()
+        tilemap.update()
+        cull_rect = x, y, WINWIDTH, WINHEIGHT
+        legacy_surf = engine.copy_surface(legacy_get_full_image(tilemap, cull_rect)).convert_alpha()
+        surf = tilemap.get_full_image(cull_rect).convert_alpha()
+        assert surface_bytes(surf, 'RGB') == surface_bytes(legacy_surf, 'RGB'), "Frame %d at %s comes out differently" % (frame, (x, y))
+    counts = tilemap_module.get_draw_counts()
+    assert counts['scrolled'] and counts['reused']
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from app.resources.tiles import TileMapPrefab, LayerGrid
+
+TICK_TIME = 33
+
+class Clock():
+    """
+    Stands in for QDateTime, so both draw the same autotile frame
+    """
+    ms = 0
+
+    @classmethod
+    def currentMSecsSinceEpoch(cls):
+        return cls.ms
+
+def tile_map(prefab, width, height) -> TileMapPrefab:
+    """
+    The tilemap repeated across a map of width by height
+    """
+    tilemap = TileMapPrefab(prefab.nid)
+    tilemap.width, tilemap.height = width, height
+    tilemap.autotile_fps = prefab.autotile_fps
+    tilemap.tilesets = prefab.tilesets
+    tilemap.layers.clear()
+    for layer in prefab.layers:
+        new_layer = LayerGrid(layer.nid, tilemap)
+        new_layer.visible = layer.visible
+        for x in range(width):
+            for y in range(height):
+                tile_sprite = layer.sprite_grid.get((x % prefab.width, y % prefab.height))
+                if tile_sprite:
+                    new_layer.set_sprite((x, y), tile_sprite.tileset_nid, tile_sprite.tileset_position)
+        tilemap.layers.append(new_layer)
+    return tilemap
+
+def test_layer_cache_matches_draw_tilemap(default_project, qt_image_bytes, monkeypatch):
+    """
+    While tiles are painted and erased, layers hidden and autotiles
+    animate, the layer cache draws the same as drawing the whole tilemap
+    again, which the editor previously did every tick
+    """
+    from app.editor import tilemap_editor
+    from app.resources.resources import RESOURCES
+    monkeypatch.setattr(tilemap_editor, 'QDateTime', Clock)
+    tilemap = tile_map(RESOURCES.tilemaps.get('Chapter 4'), 30, 30)
+    rng = random.Random(0)
+    tiles = sorted({(tile_sprite.tileset_nid, tile_sprite.tileset_position)
+                    for layer in tilemap.layers for tile_sprite in layer.sprite_grid.values()})
+
+    cache = tilemap_editor.LayerCache()
+    cache.set_tilemap(tilemap)
+    for tick in range(100):
+        Clock.ms = tick * TICK_TIME
+        # A brush stroke drags a few tiles a tick
+        layer = rng.choice(tilemap.layers)
+        x, y = rng.randrange(tilemap.width), rng.randrange(tilemap.height)
+        for _ in range(rng.randint(0, 4)):
+            x = min(tilemap.width - 1, max(0, x + rng.randint(-1, 1)))
+            y = min(tilemap.height - 1, max(0, y + rng.randint(-1, 1)))
+            if rng.random() < .2:
+                layer.erase_sprite((x, y))
+            else:
+                layer.set_sprite((x, y), *rng.choice(tiles))
+            cache.dirty_tiles(layer, [(x, y)])
+        if tick % 25 == 24 and len(tilemap.layers) > 1:
+            layer = rng.choice(tilemap.layers[1:])
+            layer.visible = not layer.visible
+        assert qt_image_bytes(cache.get_image(tilemap.autotile_fps)) == \
+            qt_image_bytes(tilemap_editor.draw_tilemap(tilemap, autotile_fps=tilemap.autotile_fps)), \
+            "Tick %d comes out differently" % tick
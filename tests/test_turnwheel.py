@@ -0,0 +1,95 @@
+import pytest
+
+def test_failed_action_releases_boundary(start_level):
+    """
+    The boundary is only deferred while the turnwheel runs actions,
+    even if one of them fails
+    """
+    import app.engine.action as Action
+    from app.engine.turnwheel import ActionLog
+
+    class BrokenAction(Action.Action):
+        def execute(self):
+            raise RuntimeError("Broken")
+
+        def reverse(self):
+            raise RuntimeError("Broken")
+
+    game = start_level('0')
+    log = ActionLog()
+    log.append(BrokenAction())
+    with pytest.raises(RuntimeError):
+        log.rewind_to(-1)
+    assert not game.boundary.deferred
+    log.action_index = -1
+    with pytest.raises(RuntimeError):
+        log.replay_to(0)
+    assert not game.boundary.deferred
+
+def check(game, boundary):
+    """
+    The boundary matches one built from scratch
+    """
+    from app.engine.boundary import BoundaryInterface
+    boundary.update()
+    fresh = BoundaryInterface(game.tilemap.width, game.tilemap.height)
+    fresh.reset()
+    for mode in ('attack', 'spell'):
+        assert bytes(boundary.grids[mode]) == bytes(fresh.grids[mode]), "%s counts differ" % mode
+
+def get_state(game) -> tuple:
+    units = sorted((unit.nid, unit.team, unit.position, unit.get_hp(), unit.finished) for unit in game.units)
+    grids = tuple(bytes(game.boundary.grids[mode]) for mode in ('attack', 'spell'))
+    return units, grids
+
+def use_legacy_boundary(boundary, legacy: bool):
+    """
+    The previous ActionLog ran every action with the boundary recomputing
+    threats as it went, which is what a boundary that is never deferred does
+    """
+    if legacy:
+        boundary.defer = boundary.release = lambda: None
+    else:
+        del boundary.defer, boundary.release
+
+def rewind(game, target_index):
+    """
+    Moves the turnwheel back a step at a time, like the player holding left
+    """
+    log = game.action_log
+    log.set_up()
+    while log.action_index > target_index and log.backward() is not None:
+        pass
+
+def test_deferred_boundary_matches_legacy(start_level, play):
+    """
+    Rewinding the turnwheel a few turns and backing out again ends up the
+    same with the boundary deferred as with it recomputed after every action
+    """
+    from app.engine.action import MarkPhase
+    game = start_level('4')
+    num_turns = 3
+    play(game, num_turns)
+
+    log = game.action_log
+    log.record = False
+    end_state = get_state(game)
+    end_index = log.action_index
+    # The start of the player phase num_turns turns ago
+    player_phases = [idx for idx, action in enumerate(log.actions)
+                     if isinstance(action, MarkPhase) and action.phase_name == 'player']
+    target_index = player_phases[max(0, len(player_phases) - 1 - num_turns)]
+
+    rewound_state = None
+    for legacy in (True, False):
+        use_legacy_boundary(game.boundary, legacy)
+        rewind(game, target_index)
+        check(game, game.boundary)
+        state = get_state(game)
+        rewound_state = rewound_state or state
+        assert state == rewound_state, "Rewound to a different state"
+
+        log.reset()
+        check(game, game.boundary)
+        assert get_state(game) == end_state, "Backed out to a different state"
+        assert log.action_index == end_index
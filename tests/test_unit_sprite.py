@@ -0,0 +1,97 @@
+from app.constants import TILEWIDTH, TILEHEIGHT
+from app.utilities import utils
+
+def legacy_draw(sprite, surf, cull_rect) -> int:
+    """
+    The image part of the old UnitSprite.draw. Returns how many surfaces it made
+    """
+    from app.engine import engine, image_mods
+    from app.engine.game_state import game
+    current_time = engine.get_time()
+    image = sprite.create_image(sprite.image_state)
+    allocated = 1
+    left, top = sprite.get_topleft(cull_rect)
+
+    if sprite.transition_state in ('fade_out', 'warp_out', 'fade_move', 'warp_move'):
+        progress = utils.clamp((sprite.transition_time - sprite.transition_counter) / sprite.transition_time, 0, 1)
+        image = image_mods.make_translucent(image.convert_alpha(), progress)
+        allocated += 2
+
+    for flicker in sprite.flicker:
+        starting_time, total_time, color, direction, fade_out = flicker
+        if starting_time <= current_time <= starting_time + total_time:
+            if fade_out:
+                time_passed = current_time - starting_time
+                color = tuple((total_time - time_passed) * float(c) // total_time for c in color)
+            if direction == 'add':
+                image = image_mods.add_tint(image.convert_alpha(), color)
+            elif direction == 'sub':
+                image = image_mods.sub_tint(image.convert_alpha(), color)
+            allocated += 2
+
+    if not sprite.flicker and game.boundary.draw_flag and sprite.unit.nid in game.boundary.displaying_units:
+        image = image_mods.change_color(image.convert_alpha(), (60, 0, 0))
+        allocated += 2
+
+    for flicker_tint in sprite.flicker_tint:
+        color, period, width = flicker_tint
+        diff = utils.model_wave(current_time, period, width)
+        diff = utils.clamp(diff, 0, 1)
+        color = tuple([int(c * diff) for c in color])
+        image = image_mods.add_tint(image.convert_alpha(), color)
+        allocated += 2
+
+    topleft = left - max(0, (image.get_width() - 16)//2), top - 24
+    surf.blit(image, topleft)
+    return allocated
+
+def test_unit_sprites_draw_like_legacy(start_level, max_difference):
+    """
+    Every unit drawn with flicker tints, fading flickers, enemy range
+    highlights and fade transitions on looks the same, within the tint
+    cache's rounding, as making new surfaces for every effect every frame,
+    and the tint cache makes fewer surfaces
+    """
+    from app.engine import engine, unit_sprite
+    game = start_level('4')
+    TINT_CACHE = unit_sprite.TINT_CACHE
+    num_frames = 300
+
+    units = [unit for unit in game.units if unit.position]
+    game.boundary.show()
+    # Give every unit something to do
+    for idx, unit in enumerate(units):
+        sprite = unit.sprite
+        if idx % 2 == 0:
+            sprite.add_flicker_tint((80, 0, 120), 900, 300)
+        if idx % 3 == 0:
+            sprite.flicker.append((0, 10 ** 9, (100, 100, 100), 'add', False))
+        elif idx % 3 == 1:
+            game.boundary.toggle_unit(unit)
+        if idx % 5 == 0:
+            sprite.transition_state = 'fade_out'
+            sprite.transition_time = num_frames * 16
+        if idx % 7 == 0:
+            sprite.add_flicker_tint((0, 120, 0), 400, 200)
+
+    full_size = game.tilemap.width * TILEWIDTH, game.tilemap.height * TILEHEIGHT + 24
+    cull_rect = (0, -24)
+    allocated = legacy_allocated = 0
+    for frame in range(num_frames):
+        engine.constants['current_time'] = frame * 16
+        for unit in units:
+            if unit.sprite.transition_state == 'fade_out':
+                unit.sprite.transition_counter = num_frames * 16 - frame * 16
+
+        surf = engine.create_surface(full_size, transparent=True)
+        TINT_CACHE.start_frame()
+        for unit in units:
+            unit.sprite.draw(surf, cull_rect)
+        allocated += TINT_CACHE.allocated
+
+        legacy_surf = engine.create_surface(full_size, transparent=True)
+        legacy_allocated += sum(legacy_draw(unit.sprite, legacy_surf, cull_rect) for unit in units)
+
+        if frame % 50 == 0:
+            assert max_difference(surf, legacy_surf) <= 4, "Frame %d looks different" % frame
+    assert allocated < legacy_allocated
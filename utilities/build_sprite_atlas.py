@@ -0,0 +1,65 @@
+"""
+Packs every sprite in sprites/ that has per-pixel alpha into one image
+(app.engine.sprites.ATLAS_IMAGE) with an index of where each one is
+(ATLAS_INDEX), so the engine decodes one file instead of hundreds.
+Sprites without per-pixel alpha (colorkeyed and 24-bit images) keep being
+loaded from their own files, since the atlas would change their format.
+Run again whenever the sprites change; until then, sprites edited since
+are loaded from their own files.
+Run from the repository root:
+    python -m utilities.build_sprite_atlas [width]
+"""
+import json
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+def pack(images: dict, width: int) -> dict:
+    """
+    Places images on shelves, tallest first. Returns nid -> rect
+    """
+    rects = {}
+    x = y = shelf_height = 0
+    for nid, image in sorted(images.items(), key=lambda kv: (-kv[1].get_height(), kv[0])):
+        w, h = image.get_size()
+        if x + w > width:
+            x, y = 0, y + shelf_height
+            shelf_height = 0
+        rects[nid] = (x, y, w, h)
+        x += w
+        shelf_height = max(shelf_height, h)
+    return rects
+
+def build(sprites, width=1024) -> tuple:
+    from app.engine.sprites import get_file_stamp
+    images = {}
+    for nid, sprite in sprites.items():
+        image = pygame.image.load(sprite.full_path)
+        if image.get_bitsize() == 32 and image.get_flags() & pygame.SRCALPHA and image.get_width() <= width:
+            images[nid] = image
+    rects = pack(images, width)
+    height = max(y + h for x, y, w, h in rects.values())
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    for nid, image in images.items():
+        # Copy the pixels exactly, rather than blending them onto the empty atlas
+        atlas.blit(image, rects[nid][:2], special_flags=pygame.BLEND_RGBA_MAX)
+    index = {nid: {'rect': rects[nid], 'stamp': get_file_stamp(sprites[nid].full_path)} for nid in images}
+    return atlas, index
+
+def main(width=1024):
+    from app.sprites import SPRITES
+    from app.engine import engine, sprites
+    engine.init()
+    atlas, index = build(SPRITES, int(width))
+    engine.save_surface(atlas, sprites.ATLAS_IMAGE)
+    with open(sprites.ATLAS_INDEX, 'w') as fp:
+        json.dump(index, fp)
+    print("Packed %d of %d sprites into a %dx%d atlas" %
+          (len(index), len(SPRITES), atlas.get_width(), atlas.get_height()))
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,403 @@
+"""
+Plays whole chapters with no window and no sound (SDL's dummy video and
+audio drivers, and no level music), a frame at a time through game.state
+with a fake clock, as fast as the engine can go. Each level is played for
+num_turns turns. With autoplay, the player's units are given an AI of
+their own and play the player phase too; otherwise the player phase is
+skipped, so only the other teams move. Events are skipped through (their
+commands still run), the preparations screen goes straight to the fight,
+and level ups are clicked through. Other scripted inputs can be given to
+play().
+
+Reports chapters per second, how much space the saves made take up in
+saves/ and saves/chunks, and for every phase (player, enemy, ...)
+how many frames it ran for and how long they took, and the calls to and
+time spent in each part of the engine listed in get_probes (AI thinking,
+pathfinding, the boundary, drawing, saving, ...). Each of these is timed
+by itself, so AI thinking includes the pathfinding and combat calcs it
+did. With json_path, writes the results there too, so runs can be
+compared between commits. Run from the repository root:
+    python -m utilities.headless_simulation [project] [level_nids] [num_turns] [autoplay] [json_path] [extra_skills]
+
+level_nids is a comma separated list of levels, each played as its own chapter.
+extra_skills gives every unit that many more passive skills, to see how
+the engine does in a project where units have lots of skills.
+
+That each faster path does the same as before is checked in tests/.
+compare times one of them against the previous implementation kept
+there, on inputs larger than the tests use:
+    python -m utilities.headless_simulation compare <name> [args]
+
+where name is one of COMPARISONS.
+"""
+import collections
+import functools
+import glob
+import json
+import os
+import pickle
+import random
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from app.engine import engine  # Must be imported first
+from app.data.database import DB
+from app.resources.resources import RESOURCES
+from tests.conftest import give_skills
+
+FRAME_TIME = 16
+AUTOPLAY_AI = 'Pursue'
+# Width and height, number of units and movement of each synthetic map
+PATHFINDING_MAPS = [(40, 25, 6), (64, 40, 8), (64, 40, 99)]
+# Hitpoints, movement, the combat formulas, and some built on them from test_equations
+TIMED_EQUATIONS = ('HITPOINTS', 'MOVEMENT', 'HIT', 'AVOID', 'CRIT_HIT', 'CRIT_AVOID',
+                   'DAMAGE', 'DEFENSE', 'ATTACK_SPEED', 'DEFENSE_SPEED',
+                   'TEST_ATTACK', 'TEST_POWER', 'TEST_SCORE')
+
+def get_probes() -> dict:
+    """
+    The functions to count and time, by what they are counted under
+    """
+    from app.engine import ai_controller, battle_animation, boundary, combat_calcs, equations, \
+        line_of_sight, pathfinding, save, target_system, turnwheel, unit_sprite
+    from app.engine.objects.tilemap import TileMapObject
+    from app.engine.objects.unit import UnitObject
+    from app.events import event, event_prefab
+    calcs = [(combat_calcs, name) for name, func in vars(combat_calcs).items()
+             if callable(func) and getattr(func, '__module__', None) == combat_calcs.__name__]
+    return {
+        'AI think': [(ai_controller.AIController, 'think')],
+        'Pathfinding': [(pathfinding.Djikstra, 'process'), (pathfinding.AStar, 'process'),
+                        (pathfinding.Djikstra, 'get_distance_field')],
+        'Targeting': [(target_system, 'get_valid_moves'), (target_system, 'get_possible_attacks'),
+                      (target_system, 'get_shell')],
+        'Line of sight': [(line_of_sight, 'line_of_sight')],
+        'Boundary': [(boundary.BoundaryInterface, 'update'), (boundary.BoundaryInterface, 'draw'),
+                     (boundary.BoundaryInterface, 'draw_fog_of_war')],
+        'Combat calcs': calcs,
+        'Stat bonuses': [(UnitObject, 'stat_bonus')],
+        'Equations': [(equations.Parser, 'get'), (equations.Parser, 'get_expression')],
+        'Map drawing': [(TileMapObject, 'get_full_image')],
+        'Unit sprites': [(unit_sprite.UnitSprite, 'draw')],
+        'Battle animations': [(battle_animation, 'get_battle_anim')],
+        # Writing the files happens on a thread of its own
+        'Saving': [(save, 'suspend_game'), (turnwheel.ActionLog, 'save')],
+        'Save files': [(save, 'save_io')],
+        'Event triggers': [(event_prefab.EventCatalog, 'get')],
+        'Event commands': [(event.Event, 'run_command')],
+    }
+
+class Profiler():
+    def __init__(self):
+        self.phase = None
+        # Phase -> [frames, time]
+        self.frames = collections.defaultdict(lambda: [0, 0.])
+        # Phase -> probe -> [calls, time]
+        self.calls = collections.defaultdict(lambda: collections.defaultdict(lambda: [0, 0.]))
+        self.depth = collections.Counter()
+        self.originals = []
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def probe(*args, **kwargs):
+            counts = self.calls[self.phase][name]
+            counts[0] += 1
+            # Only the outermost call is timed, so calls within calls aren't counted twice
+            if self.depth[name]:
+                return func(*args, **kwargs)
+            self.depth[name] += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                counts[1] += time.perf_counter() - start
+                self.depth[name] -= 1
+        return probe
+
+    def install(self):
+        for name, targets in get_probes().items():
+            for owner, attr in targets:
+                func = vars(owner)[attr]
+                self.originals.append((owner, attr, func))
+                setattr(owner, attr, self.wrap(name, func))
+
+    def uninstall(self):
+        for owner, attr, func in reversed(self.originals):
+            setattr(owner, attr, func)
+        self.originals.clear()
+
+    def add_frame(self, elapsed):
+        frames = self.frames[self.phase]
+        frames[0] += 1
+        frames[1] += elapsed
+
+    def results(self) -> dict:
+        return {phase: {'frames': frames, 'time': elapsed,
+                        'calls': {name: {'calls': calls, 'time': t}
+                                  for name, (calls, t) in sorted(self.calls[phase].items())}}
+                for phase, (frames, elapsed) in self.frames.items()}
+
+def click_through(game, frame) -> str:
+    """
+    Skips ahead through events, goes straight to the fight from the
+    preparations screen, and clicks through everything else
+    """
+    state = game.state.current()
+    if state == 'free':
+        return None  # Left to the AI, or skipped
+    elif state == 'event':
+        return 'START' if frame % 7 == 0 else None
+    elif state == 'prep_main':
+        menu = game.state.state[-1].menu
+        if menu:
+            menu.set_selection('Fight')
+            return 'SELECT'
+    return 'SELECT' if frame % 3 == 0 else None
+
+def play(game, num_turns, profiler, autoplay=False, inputs=click_through, max_frames=100000) -> int:
+    """
+    Plays until turn num_turns is over, or the game is.
+    inputs gives the input for each frame.
+    Returns how many frames it took
+    """
+    from app.constants import WINWIDTH, WINHEIGHT
+    surf = engine.create_surface((WINWIDTH, WINHEIGHT))
+    for frame in range(max_frames):
+        engine.constants['last_time'] = engine.constants['current_time']
+        engine.constants['current_time'] = frame * FRAME_TIME
+        engine.constants['delta_t'] = FRAME_TIME
+        profiler.phase = game.phase.get_current()
+        start = time.perf_counter()
+        surf, repeat = game.state.update(inputs(game, frame), surf)
+        while repeat:
+            surf, repeat = game.state.update(None, surf)
+        if game.state.current() == 'free':
+            game.state.change('ai' if autoplay else 'turn_change')
+        profiler.add_frame(time.perf_counter() - start)
+        if game.turncount > num_turns or game.state.current() in ('game_over', 'title_start'):
+            break
+    return frame + 1
+
+def file_size(fn) -> tuple:
+    """
+    The size of the file, and how many bytes it takes up on disk
+    """
+    stat = os.stat(fn)
+    return stat.st_size, getattr(stat, 'st_blocks', 0) * 512 or stat.st_size
+
+def get_saves_usage(since) -> dict:
+    """
+    How much space the saves written since then take up, their chunks
+    included, and how much the chunks would if no two saves shared one
+    """
+    from app.engine import save
+    saves = [fn for fn in glob.glob('saves/*') if os.path.isfile(fn) and os.path.getmtime(fn) >= since]
+    chunk_refs = []
+    for fn in saves:
+        if fn.endswith('.p'):
+            with open(fn, 'rb') as fp:
+                s_dict = pickle.load(fp)
+            chunk_refs += [save.CHUNK_DIR + digest + '.pchunk' for digest in s_dict.get('chunks', {}).values()]
+    chunks = set(chunk_refs)
+    return {'files': len(saves), 'size': sum(file_size(fn)[0] for fn in saves),
+            'disk': sum(file_size(fn)[1] for fn in saves),
+            'chunks': len(chunks), 'chunk_size': sum(file_size(fn)[0] for fn in chunks),
+            'chunk_disk': sum(file_size(fn)[1] for fn in chunks),
+            'unshared_chunk_size': sum(file_size(fn)[0] for fn in chunk_refs)}
+
+def print_results(results):
+    for phase, result in results.items():
+        print("    %-18s %8d frames %9.1f ms" % (phase, result['frames'], result['time'] * 1000))
+        for name, calls in result['calls'].items():
+            print("      %-16s %8d calls  %9.1f ms" % (name, calls['calls'], calls['time'] * 1000))
+
+def load_project(project):
+    RESOURCES.load(project + '.ltproj')
+    DB.load(project + '.ltproj')
+    from app.engine import driver
+    driver.start('Headless Simulation', from_editor=True)
+
+def main(project='default', level_nids='4', num_turns=5, autoplay=0, json_path=None, extra_skills=0):
+    load_project(project)
+    from app.engine import config as cf
+    from app.engine import game_state
+    num_turns, autoplay, extra_skills = int(num_turns), bool(int(autoplay)), int(extra_skills)
+    cf.SETTINGS['random_seed'] = 0
+
+    chapters = []
+    saves_since = time.time()
+    total_start = time.perf_counter()
+    for level_nid in level_nids.split(','):
+        level = DB.levels.get(level_nid)
+        level.music = {key: None for key in level.music}
+        random.seed(0)
+        game = game_state.start_level(level_nid)
+        give_skills(game, extra_skills)
+        if autoplay:
+            for unit in game.units:
+                if unit.team == 'player':
+                    unit.ai = AUTOPLAY_AI
+        profiler = Profiler()
+        profiler.install()
+        start = time.perf_counter()
+        try:
+            frames = play(game, num_turns, profiler, autoplay)
+        finally:
+            profiler.uninstall()
+        chapters.append({'level': level_nid, 'frames': frames, 'turns': min(game.turncount, num_turns),
+                         'time': time.perf_counter() - start, 'phases': profiler.results()})
+    total_time = time.perf_counter() - total_start
+    from app.engine import save
+    if save.SAVE_THREAD:
+        save.SAVE_THREAD.join()
+    saves = get_saves_usage(saves_since)
+
+    print("%s: %d chapters of %d turns%s with %d extra skills in %.2f s, %.2f chapters per second" %
+          (project, len(chapters), num_turns, ' (autoplay)' if autoplay else '', extra_skills,
+           total_time, len(chapters) / total_time))
+    for chapter in chapters:
+        print("  Level %s: %d turns, %d frames in %.2f s (%.0f frames per second)" %
+              (chapter['level'], chapter['turns'], chapter['frames'], chapter['time'], chapter['frames'] / chapter['time']))
+        print_results(chapter['phases'])
+    print("  Saves: %d files, %.1f KB (%.1f KB on disk)" % (saves['files'], saves['size'] / 1024, saves['disk'] / 1024))
+    print("  Chunks: %d files, %.1f KB (%.1f KB on disk), %.1f KB if every save had its own" %
+          (saves['chunks'], saves['chunk_size'] / 1024, saves['chunk_disk'] / 1024, saves['unshared_chunk_size'] / 1024))
+
+    if json_path:
+        with open(json_path, 'w') as fp:
+            json.dump({'project': project, 'num_turns': num_turns, 'autoplay': autoplay,
+                       'extra_skills': extra_skills, 'time': total_time, 'saves': saves,
+                       'chapters': chapters}, fp, indent=4)
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def print_comparison(name, old_time, new_time):
+    print("    %-16s %9.3f ms -> %9.3f ms (%.1fx)" %
+          (name, old_time * 1000, new_time * 1000, old_time / new_time))
+
+def print_frame_times(name, times):
+    times = sorted(times)
+    print("    %-16s mean %6.3f ms, 99th percentile %6.3f ms, max %6.3f ms" %
+          (name, 1000 * sum(times) / len(times), 1000 * times[int(len(times) * .99)], 1000 * times[-1]))
+
+def compare_pathfinding():
+    """
+    Djikstra and AStar from every unit on synthetic maps of mostly plains,
+    some rough terrain and some walls
+    """
+    from app.engine import pathfinding
+    from tests.test_pathfinding import SyntheticBoard, legacy_astar, legacy_djikstra
+    for size, num_units, movement in PATHFINDING_MAPS:
+        board = SyntheticBoard(size, size, num_units, seed=0)
+        grid = board.grid
+        rng = random.Random(0)
+        open_tiles = [(n.x, n.y) for n in grid if n.reachable]
+        searches = [(pos, team, rng.choice(open_tiles)) for pos, team in board.units]
+        print("%dx%d map, %d units, movement %d" % (size, size, num_units, movement))
+        print_comparison('Djikstra', timed(lambda: [
+            legacy_djikstra(pos, grid, size, size, team, board, movement) for pos, team, goal in searches]),
+            timed(lambda: [pathfinding.Djikstra(pos, grid, size, size, team, False, False).process(board, movement)
+                           for pos, team, goal in searches]))
+        print_comparison('AStar', timed(lambda: [
+            legacy_astar(pos, goal, grid, size, size, team, board, True) for pos, team, goal in searches]),
+            timed(lambda: [pathfinding.AStar(pos, goal, grid, size, size, team).process(board, adj_good_enough=True)
+                           for pos, team, goal in searches]))
+
+def compare_boundary(project='default', level_nid='4', tilemap_nid='Chapter 14B', num_frames=300):
+    """
+    Frame times of drawing the boundary while "show all enemy attacks" is
+    toggled every half second, on a level moved onto a larger tilemap.
+    The previous implementation redrew the whole boundary whenever it changed
+    """
+    from app.constants import TILEWIDTH, TILEHEIGHT, WINWIDTH, WINHEIGHT
+    from app.engine import game_state
+    from tests.test_boundary import legacy_draw
+    load_project(project)
+    DB.events.clear()
+    DB.levels.get(level_nid).tilemap = tilemap_nid
+    game = game_state.start_level(level_nid)
+    boundary = game.boundary
+    boundary.show()
+    full_size = game.tilemap.width * TILEWIDTH, game.tilemap.height * TILEHEIGHT
+    cull_rect = (0, 0, min(WINWIDTH, full_size[0]), min(WINHEIGHT, full_size[1]))
+
+    frame_times, legacy_frame_times = [], []
+    legacy_surf = None
+    for frame in range(int(num_frames)):
+        changed = frame % 30 == 0
+        if changed:
+            boundary.toggle_all_enemy_attacks()
+        surf = engine.create_surface((WINWIDTH, WINHEIGHT), transparent=True)
+        frame_times.append(timed(lambda: boundary.draw(surf, full_size, cull_rect)))
+
+        start = time.perf_counter()
+        if changed or not legacy_surf:
+            legacy_surf = legacy_draw(boundary, game, full_size)
+        surf.blit(engine.subsurface(legacy_surf, cull_rect), (0, 0))
+        legacy_frame_times.append(time.perf_counter() - start)
+
+    print("%s level %s on %s: %dx%d map, %d frames" %
+          (project, level_nid, tilemap_nid, game.tilemap.width, game.tilemap.height, len(frame_times)))
+    print_frame_times('Full redraw', legacy_frame_times)
+    print_frame_times('Incremental', frame_times)
+
+def compare_event_triggers(num_events=1000, num_levels=20, num_fires=20000):
+    """
+    Firing triggers against a catalog of synthetic events, looked up in
+    the trigger index, or by looking through every event as before
+    """
+    from tests.test_event_catalog import build_catalog, linear_get
+    catalog, triggers, levels = build_catalog(int(num_events), int(num_levels))
+    rng = random.Random(0)
+    fires = [(rng.choice(triggers), rng.choice(levels)) for _ in range(int(num_fires))]
+    print("%d events in %d levels, %d triggers fired" % (len(catalog), len(levels), len(fires)))
+    print_comparison('Triggers', timed(lambda: [linear_get(catalog, trigger, level_nid) for trigger, level_nid in fires]),
+                     timed(lambda: [catalog.get(trigger, level_nid) for trigger, level_nid in fires]))
+
+def compare_equations(project='default', level_nid='4', repeats=20):
+    """
+    Each equation, and some one-off expressions, worked out for every unit
+    on the level, best of repeats. The previous parser called into each
+    equation every time it came up, and evaluated expressions from scratch
+    """
+    from app.data.equations import Equation
+    from tests.test_equations import EXPRESSIONS, EXTRA_EQUATIONS, LegacyParser
+    load_project(project)
+    DB.events.clear()
+    for nid, expression in EXTRA_EQUATIONS:
+        DB.equations.append(Equation(nid, expression))
+    # The parser is made when the module is first imported
+    from app.engine import equations, game_state
+    game = game_state.start_level(level_nid)
+    units = list(game.units)
+    legacy = LegacyParser()
+    parser = equations.Parser()
+
+    def best(func):
+        return min(timed(lambda: [func(unit) for unit in units]) for _ in range(int(repeats)))
+    print("%s level %s: %d units, best of %s" % (project, level_nid, len(units), repeats))
+    for nid in TIMED_EQUATIONS:
+        if nid in legacy.equations:
+            print_comparison(nid, best(lambda unit: legacy.get(nid, unit)), best(lambda unit: parser.get(nid, unit)))
+    for expr in EXPRESSIONS:
+        print_comparison(expr[:16], best(lambda unit: legacy.get_expression(expr, unit)),
+                         best(lambda unit: parser.get_expression(expr, unit)))
+
+COMPARISONS = {
+    'pathfinding': compare_pathfinding,
+    'boundary': compare_boundary,
+    'event_triggers': compare_event_triggers,
+    'equations': compare_equations,
+}
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['compare']:
+        COMPARISONS[sys.argv[2]](*sys.argv[3:])
+    else:
+        main(*sys.argv[1:])